@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+服务启动导入耗时分析
+
+ovos_supervisor.py --profile-startup 为每个服务设置 PYTHONPROFILEIMPORTTIME=1
+（等价于 python -X importtime），解释器把每个模块的导入耗时写到 stderr；
+LogMux 把这些行从服务日志中分出来，写入 logs/importtime/<服务>.log。本脚本解析这些文件：
+
+- 按顶层包汇总两种耗时：self 为包内所有模块自身导入耗时之和；inclusive 为从外部
+  进入该包的导入的累计耗时（包括它触发的其他包的导入），即把该包改为延迟导入最多能省下的时间
+- 通过 engine 包索引（package_index.py 记录的顶层模块）把顶层包映射到 engine 下的包目录，
+  区分本地包/插件与第三方库、标准库
+- 输出排名报告，并写出 flamegraph 折叠栈文件（服务;模块;子模块 耗时us），
+  可直接交给 flamegraph.pl 或 speedscope
+
+同一个日志文件中有多次启动（服务被重启）时只分析最后一次。
+
+用法:
+  python3 ovos_importtime.py [--dir logs/importtime] [--top 15] [--folded FILE] [服务 ...]
+"""
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+ENGINE_DIR = PROJECT_ROOT / 'engine'
+DEFAULT_DIR = PROJECT_ROOT / 'logs' / 'importtime'
+FOLDED_FILE = 'startup.folded'
+
+# 导入耗时输出的行前缀；LogMux 按它把这些行分流到单独的文件
+LINE_PREFIX = b'import time:'
+_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)')
+
+# Colors
+BLUE = '\033[0;34m'
+GREEN = '\033[0;32m'
+NC = '\033[0m'
+
+
+class ImportNode:
+    """一次模块导入：自身耗时、累计耗时（us）和它触发的导入"""
+
+    __slots__ = ('name', 'self_us', 'cumulative_us', 'children')
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, children: List['ImportNode']):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children
+
+    @property
+    def top_level(self) -> str:
+        return self.name.split('.', 1)[0]
+
+
+def parse_importtime(lines) -> List[ImportNode]:
+    """
+    把 -X importtime 输出解析为导入树，返回顶层导入
+
+    输出是后序的：子模块先于触发它的模块完成并输出，缩进表示嵌套深度。
+    遇到表头（解释器重新启动）时丢弃之前的结果。
+    """
+    pending: Dict[int, List[ImportNode]] = {}
+    for line in lines:
+        if 'self [us]' in line:
+            pending = {}
+            continue
+        m = _LINE_RE.match(line)
+        if not m:
+            continue
+        depth = (len(m.group(3)) - 1) // 2
+        node = ImportNode(m.group(4), int(m.group(1)), int(m.group(2)), pending.pop(depth + 1, []))
+        pending.setdefault(depth, []).append(node)
+    # 进程在导入过程中退出时，未完成的外层导入不会输出，把已完成的子树也作为顶层
+    return [node for depth in sorted(pending) for node in pending[depth]]
+
+
+def aggregate(roots: List[ImportNode]) -> Dict[str, Dict]:
+    """按顶层包汇总 {包: {'self': us, 'inclusive': us, 'modules': 模块数}}"""
+    totals: Dict[str, Dict] = {}
+
+    def visit(node: ImportNode, entered: frozenset):
+        pkg = node.top_level
+        stats = totals.setdefault(pkg, {'self': 0, 'inclusive': 0, 'modules': 0})
+        stats['self'] += node.self_us
+        stats['modules'] += 1
+        if pkg not in entered:
+            stats['inclusive'] += node.cumulative_us
+            entered = entered | {pkg}
+        for child in node.children:
+            visit(child, entered)
+
+    for root in roots:
+        visit(root, frozenset())
+    return totals
+
+
+def folded_stacks(service: str, roots: List[ImportNode]) -> Iterator[str]:
+    """flamegraph 折叠栈格式的行，每个模块的自身耗时计在其完整导入链上"""
+    stack = [(root, service) for root in reversed(roots)]
+    while stack:
+        node, prefix = stack.pop()
+        frames = f"{prefix};{node.name}"
+        if node.self_us:
+            yield f"{frames} {node.self_us}"
+        stack.extend((child, frames) for child in reversed(node.children))
+
+
+def engine_modules(engine_dir: Path = ENGINE_DIR) -> Dict[str, str]:
+    """{顶层模块名: engine 下的包目录}；索引不可用时返回空表"""
+    sys.path.insert(0, str(engine_dir))
+    try:
+        from package_index import load_index
+        index = load_index(engine_dir)
+    except Exception as e:
+        print(f"⚠ package index unavailable ({e}), local packages cannot be identified", file=sys.stderr)
+        return {}
+    finally:
+        sys.path.remove(str(engine_dir))
+    return {module: entry['path'] for module, entry in index.by_module().items()}
+
+
+def load_profiles(profile_dir: Path, services: Optional[List[str]] = None) -> Dict[str, List[ImportNode]]:
+    """读取 profile_dir 下每个服务的导入耗时日志"""
+    profiles = {}
+    for log in sorted(profile_dir.glob('*.log')):
+        if services and log.stem not in services:
+            continue
+        with open(log, errors='replace') as f:
+            roots = parse_importtime(f)
+        if roots:
+            profiles[log.stem] = roots
+    return profiles
+
+
+def print_report(profiles: Dict[str, List[ImportNode]], modules: Dict[str, str], top: int = 15,
+                 folded: Optional[Path] = None):
+    """输出每个服务按 inclusive 排名的顶层包，并写出折叠栈文件"""
+    if not profiles:
+        print("No import-time profiles found")
+        return
+
+    for service, roots in profiles.items():
+        totals = aggregate(roots)
+        total_us = sum(root.cumulative_us for root in roots)
+        local_us = sum(stats['self'] for pkg, stats in totals.items() if pkg in modules)
+        print(f"\n{BLUE}{service}{NC}: {total_us / 1e6:.2f}s importing {sum(s['modules'] for s in totals.values())} "
+              f"modules, {local_us / 1e6:.2f}s of it in engine packages")
+        print(f"  {'inclusive':>9}  {'self':>8}  {'modules':>7}  {'package':32} engine dir")
+        ranked = sorted(totals.items(), key=lambda item: item[1]['inclusive'], reverse=True)
+        for pkg, stats in ranked[:top]:
+            where = modules.get(pkg)
+            label = f"{GREEN}{where}{NC}" if where else '-'
+            print(f"  {stats['inclusive'] / 1000:8.0f}ms  {stats['self'] / 1000:6.0f}ms  {stats['modules']:7}  "
+                  f"{pkg:32} {label}")
+
+    if folded is not None:
+        with open(folded, 'w') as f:
+            for service, roots in profiles.items():
+                for line in folded_stacks(service, roots):
+                    f.write(line + '\n')
+        print(f"\nFlamegraph stacks written to {folded} (flamegraph.pl {folded.name} > startup.svg, "
+              f"or open it in speedscope)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='分析服务启动时的导入耗时')
+    parser.add_argument('services', nargs='*', help='只分析这些服务（默认全部）')
+    parser.add_argument('--dir', default=str(DEFAULT_DIR), help='导入耗时日志目录 (默认: %(default)s)')
+    parser.add_argument('--top', type=int, default=15, help='每个服务列出前 N 个包 (默认: %(default)s)')
+    parser.add_argument('--folded', help=f'折叠栈输出文件 (默认: <dir>/{FOLDED_FILE})')
+    args = parser.parse_args(argv)
+
+    profile_dir = Path(args.dir)
+    profiles = load_profiles(profile_dir, args.services)
+    print_report(profiles, engine_modules(), args.top,
+                 Path(args.folded) if args.folded else profile_dir / FOLDED_FILE)
+    return 0 if profiles else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
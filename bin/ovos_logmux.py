@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+OVOS 服务日志多路复用
+
+进程管理器把每个服务的 stdout/stderr 管道交给 LogMux，由它在同一个事件循环中
+读取所有服务的输出，替代每个服务一个后台 tail：
+
+- 每个服务写入 logs/ 下自己的日志文件，按大小轮转（file.log.1 ... file.log.N）
+- 终端输出带按服务着色的前缀，可按服务、最低级别和正则过滤
+- 运行时在终端输入命令修改过滤条件（输入 help 查看）
+- 可以把以特定前缀开头的行（例如 -X importtime 的输出）分流到单独的文件，
+  不写入服务日志也不显示在终端
+- 文件和终端都经过有界缓冲：某个服务输出过多时丢弃其最旧的行并记录丢弃数量，
+  读取管道永远不会因为写文件或终端慢而阻塞，不会拖慢其他服务
+
+级别取自 OVOS 日志行中的 " - INFO - " 字段；没有级别的行（例如 traceback）
+沿用同一服务上一行的级别。
+"""
+
+import asyncio
+import os
+import re
+import sys
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}", flush=True)
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}", flush=True)
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+_LEVEL_RE = re.compile(rb'\b(DEBUG|INFO|WARNING|ERROR|CRITICAL|EXCEPTION)\b')
+
+# 服务前缀颜色，按注册顺序循环使用
+PREFIX_COLORS = ('\033[0;36m', '\033[0;35m', '\033[0;32m', '\033[0;33m', '\033[0;34m',
+                 '\033[1;36m', '\033[1;35m', '\033[1;32m')
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUPS = 3
+DEFAULT_BUFFER_LINES = 10000
+# 关闭时等待终端写完剩余输出的最长时间（终端可能被 Ctrl-S 挂起）
+TERMINAL_CLOSE_TIMEOUT = 2.0
+# 超过 StreamReader 行长度上限的行按块拆成多行输出（不丢内容），不会中断对该服务的读取
+READ_LIMIT = 64 * 1024
+
+COMMANDS_HELP = """commands:
+  level LEVEL         show LEVEL and above (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+  grep REGEX          only show lines matching REGEX; 'grep' alone clears it
+  show NAME... | all  show these services on the terminal
+  hide NAME...        stop showing these services
+  filters             print the current filters"""
+
+
+class RotatingFile:
+    """按大小轮转的日志文件；首次写入时清空上一次运行的日志"""
+
+    def __init__(self, path: Path, max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+        self._size = 0
+
+    def write(self, data: bytes):
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'wb')
+            self._size = 0
+        if self.max_bytes and self._size + len(data) > self.max_bytes and self._size > 0:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backups > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        self._file = open(self.path, 'wb')
+        self._size = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class LogFilter:
+    """终端输出的过滤条件"""
+
+    def __init__(self, level: str = 'DEBUG', pattern: Optional[str] = None,
+                 services: Optional[Iterable[str]] = None):
+        self.level = LEVELS[level.upper()]
+        self.pattern = re.compile(pattern.encode()) if pattern else None
+        self.services: Optional[Set[str]] = set(services) if services is not None else None
+
+    def matches(self, service: str, level: int, line: bytes) -> bool:
+        if self.services is not None and service not in self.services:
+            return False
+        if level < self.level:
+            return False
+        return self.pattern is None or bool(self.pattern.search(line))
+
+    def describe(self) -> str:
+        services = 'all' if self.services is None else (', '.join(sorted(self.services)) or 'none')
+        level = next(name for name, value in LEVELS.items() if value == self.level)
+        pattern = self.pattern.pattern.decode() if self.pattern else '-'
+        return f"services: {services}; level >= {level}; grep: {pattern}"
+
+
+class ServiceLog:
+    """单个服务的日志状态：文件、待写缓冲、当前级别"""
+
+    def __init__(self, name: str, log_file: RotatingFile, color: str, buffer_lines: int):
+        self.name = name
+        self.file = log_file
+        self.prefix = f"{color}{name:>10}{NC} | ".encode()
+        self.pending: deque = deque(maxlen=buffer_lines)
+        self.dropped = 0
+        self.diverts: List[Tuple[bytes, 'ServiceLog']] = []  # (行前缀, 写入的目标)
+        self.level = LEVELS['INFO']
+        self.wakeup = asyncio.Event()
+
+
+class LogMux:
+    """读取所有服务的输出管道，写入轮转文件并按过滤条件输出到终端"""
+
+    def __init__(self, log_dir: Path, log_filter: Optional[LogFilter] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES, backups: int = DEFAULT_BACKUPS,
+                 buffer_lines: int = DEFAULT_BUFFER_LINES, out=None):
+        self.log_dir = Path(log_dir)
+        self.filter = log_filter or LogFilter()
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buffer_lines = buffer_lines
+        self.out = out or sys.stdout.buffer
+        self.services: Dict[str, ServiceLog] = {}
+        self._terminal: deque = deque(maxlen=buffer_lines)
+        self._terminal_dropped = 0
+        self._terminal_wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []   # 文件写入任务
+        self._terminal_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._commands: Dict[str, Tuple[str, Callable[[List[str]], None]]] = {}
+
+    def register(self, name: str, log_name: str, max_bytes: Optional[int] = None) -> ServiceLog:
+        """登记一个服务并启动其文件写入任务；max_bytes 为 0 时不轮转"""
+        if name not in self.services:
+            color = PREFIX_COLORS[len(self.services) % len(PREFIX_COLORS)]
+            max_bytes = self.max_bytes if max_bytes is None else max_bytes
+            rotating = RotatingFile(self.log_dir / log_name, max_bytes, self.backups)
+            self.services[name] = ServiceLog(name, rotating, color, self.buffer_lines)
+            self._tasks.append(asyncio.create_task(self._file_writer(self.services[name])))
+        return self.services[name]
+
+    def divert(self, name: str, prefix: bytes, log_name: str):
+        """服务 name 输出中以 prefix 开头的行改为写入 log_name（不轮转、不显示在终端）"""
+        target = self.register(f"{name}:{log_name}", log_name, max_bytes=0)
+        self.services[name].diverts.append((prefix, target))
+
+    def add_command(self, name: str, usage: str, handler: Callable[[List[str]], None]):
+        """登记一条额外的运行时命令，handler 接收命令参数列表"""
+        self._commands[name] = (usage, handler)
+
+    def start(self):
+        """启动终端输出任务，并在 stdin 可读时接受过滤命令"""
+        self._terminal_task = asyncio.create_task(self._terminal_writer())
+        try:
+            asyncio.get_running_loop().add_reader(sys.stdin.fileno(), self._read_command)
+        except (OSError, ValueError, NotImplementedError):
+            pass  # 没有可用的 stdin（例如重定向自 /dev/null 或在后台运行）
+
+    async def pump(self, name: str, stream: asyncio.StreamReader):
+        """读取一个服务的输出直到 EOF"""
+        svc = self.services[name]
+        in_long_line = False  # 上一块是超长行的一部分
+        while True:
+            try:
+                line = await stream.readuntil(b'\n')
+            except asyncio.IncompleteReadError as e:
+                line = e.partial  # EOF 前没有换行的最后一行
+            except asyncio.LimitOverrunError as e:
+                # 超长行：readuntil 不消耗数据，取出已缓冲的部分作为一行，剩余部分继续读取
+                self.feed(svc, await stream.readexactly(e.consumed) + b'\n')
+                in_long_line = True
+                continue
+            if not line:
+                break
+            if in_long_line:
+                in_long_line = False
+                if line == b'\n':
+                    continue  # 超长行恰好在上一块末尾结束
+            if not line.endswith(b'\n'):
+                line += b'\n'
+            self.feed(svc, line)
+
+    def feed(self, svc: ServiceLog, line: bytes):
+        """把一行放入文件缓冲和（通过过滤时）终端缓冲；缓冲满时丢弃最旧的行"""
+        for prefix, target in svc.diverts:
+            if line.startswith(prefix):
+                return self._buffer(target, line)
+
+        m = _LEVEL_RE.search(line)
+        if m:
+            svc.level = LEVELS.get(m.group(1).decode(), LEVELS['ERROR'])
+        self._buffer(svc, line)
+
+        if self.filter.matches(svc.name, svc.level, line):
+            if len(self._terminal) == self._terminal.maxlen:
+                self._terminal_dropped += 1
+            self._terminal.append(svc.prefix + line)
+            self._terminal_wakeup.set()
+
+    @staticmethod
+    def _buffer(svc: ServiceLog, line: bytes):
+        if len(svc.pending) == svc.pending.maxlen:
+            svc.dropped += 1
+        svc.pending.append(line)
+        svc.wakeup.set()
+
+    async def _file_writer(self, svc: ServiceLog):
+        """批量写文件；写入在线程中进行，慢速存储不会阻塞事件循环。关闭时写完剩余缓冲后退出"""
+        while True:
+            await svc.wakeup.wait()
+            svc.wakeup.clear()
+            lines = list(svc.pending)
+            svc.pending.clear()
+            if svc.dropped:
+                lines.insert(0, f"[logmux] dropped {svc.dropped} lines (buffer full)\n".encode())
+                svc.dropped = 0
+            if lines:
+                await asyncio.to_thread(svc.file.write, b''.join(lines))
+            if self._closing and not svc.pending:
+                return
+
+    async def _terminal_writer(self):
+        """终端写入同样在线程中进行：终端被挂起（Ctrl-S、慢速 ssh、管道满）时只有终端缓冲
+        积压并丢弃最旧的行，服务输出的读取和文件写入不受影响"""
+        while True:
+            await self._terminal_wakeup.wait()
+            self._terminal_wakeup.clear()
+            lines = list(self._terminal)
+            self._terminal.clear()
+            if self._terminal_dropped:
+                lines.append(f"[logmux] dropped {self._terminal_dropped} terminal lines\n".encode())
+                self._terminal_dropped = 0
+            if lines:
+                await asyncio.to_thread(self._write_terminal, b''.join(lines))
+            if self._closing and not self._terminal:
+                return
+
+    def _write_terminal(self, data: bytes):
+        self.out.write(data)
+        self.out.flush()
+
+    def _read_command(self):
+        line = sys.stdin.readline()
+        if not line:
+            asyncio.get_running_loop().remove_reader(sys.stdin.fileno())
+            return
+        if line.strip():
+            self.command(line.strip())
+
+    def command(self, text: str):
+        """处理一条过滤命令"""
+        cmd, _, arg = text.partition(' ')
+        names = arg.split()
+        if cmd in self._commands and names:
+            self._commands[cmd][1](names)
+            return
+        try:
+            if cmd == 'level' and arg.upper() in LEVELS:
+                self.filter.level = LEVELS[arg.upper()]
+            elif cmd == 'grep':
+                self.filter.pattern = re.compile(arg.encode()) if arg else None
+            elif cmd == 'show' and names:
+                if names == ['all']:
+                    self.filter.services = None
+                else:
+                    shown = self.filter.services if self.filter.services is not None else set()
+                    self.filter.services = shown | set(self._known(names))
+            elif cmd == 'hide' and names:
+                shown = self.filter.services if self.filter.services is not None else set(self.services)
+                self.filter.services = shown - set(names)
+            elif cmd != 'filters':
+                usages = ''.join(f"\n  {usage}" for usage, _ in self._commands.values())
+                print(COMMANDS_HELP + usages, flush=True)
+                return
+        except re.error as e:
+            log_warn(f"invalid regex: {e}")
+            return
+        log_info(f"log filters: {self.filter.describe()}")
+
+    def _known(self, names: List[str]) -> List[str]:
+        unknown = [name for name in names if name not in self.services]
+        if unknown:
+            log_warn(f"unknown services: {', '.join(unknown)}")
+        return [name for name in names if name in self.services]
+
+    async def close(self):
+        """让写入任务写完剩余缓冲并退出，之后才关闭文件"""
+        self._closing = True
+        for svc in self.services.values():
+            svc.wakeup.set()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for svc in self.services.values():
+            svc.file.close()
+        if self._terminal_task is not None:
+            self._terminal_wakeup.set()
+            try:
+                await asyncio.wait_for(self._terminal_task, TERMINAL_CLOSE_TIMEOUT)
+            except (asyncio.TimeoutError, OSError, ValueError):
+                pass  # 终端仍被挂起或已关闭，放弃剩余的终端输出（日志文件中是完整的）
+        try:
+            asyncio.get_running_loop().remove_reader(sys.stdin.fileno())
+        except (OSError, ValueError, NotImplementedError):
+            pass
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+OVOS 服务就绪探测
+
+代替 bin/ovos-dev 中固定的 sleep：
+  port     TCP 连接消息总线端口（默认 localhost:8181），连上即就绪
+  service  先等总线端口，再通过总线询问服务是否就绪：
+           发送 mycroft.<name>.is_ready，等待 status 为 True 的
+           mycroft.<name>.is_ready.response；也可以指定一条广播消息
+           （例如 mycroft.ready），收到即视为就绪
+
+每种等待都有超时，重试间隔按指数退避增长。给出 --pid 时，被探测的进程退出会
+立即判定失败，不必等到超时。给出 --since（启动服务时的时间戳）时，输出从启动
+到就绪的耗时。
+
+总线消息需要 ovos_bus_client（ovos-dev 的 venv 中已安装）；不可用时 service
+退化为只检查总线端口和进程存活。
+
+退出码: 0 就绪，1 进程已退出，2 超时，3 无法通过总线确认（仅端口/进程检查通过）
+
+用法:
+  python3 ovos_ready.py port --check                       # 只检查一次端口是否被占用
+  python3 ovos_ready.py port --pid 1234 --since 1700000000.1 --label "Message bus"
+  python3 ovos_ready.py service audio --pid 1234 --timeout 60
+  python3 ovos_ready.py service skills --ready-message mycroft.ready
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+from typing import Optional
+
+try:
+    from ovos_bus_client import Message, MessageBusClient
+except ImportError:  # 没有总线客户端时只做端口/进程检查
+    MessageBusClient = None
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+DEFAULT_HOST = 'localhost'
+DEFAULT_PORT = 8181
+DEFAULT_TIMEOUT = float(os.environ.get('OVOS_READY_TIMEOUT', 60))
+
+# 退避: 首次重试间隔、增长倍数、最大间隔（秒）
+BACKOFF_START = 0.05
+BACKOFF_FACTOR = 2.0
+BACKOFF_MAX = 1.0
+
+READY = 0
+EXITED = 1
+TIMEOUT = 2
+UNCONFIRMED = 3
+
+
+class ProbeFailed(Exception):
+    """探测失败，code 为对应的退出码"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def backoff():
+    """无限的退避间隔序列"""
+    delay = BACKOFF_START
+    while True:
+        yield delay
+        delay = min(delay * BACKOFF_FACTOR, BACKOFF_MAX)
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """pid 为 None 时视为存活"""
+    if pid is None:
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    # 已退出但尚未被父进程回收的僵尸进程也视为退出
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except (OSError, IndexError):
+        return True
+
+
+def port_open(host: str, port: int, timeout: float = 0.5) -> bool:
+    """能否建立 TCP 连接"""
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def wait_for_port(host: str, port: int, deadline: float, pid: Optional[int] = None):
+    """等待端口可连接，失败时抛出 ProbeFailed"""
+    for delay in backoff():
+        if port_open(host, port):
+            return
+        if not process_alive(pid):
+            raise ProbeFailed(EXITED, f"process {pid} exited")
+        if time.monotonic() + delay > deadline:
+            raise ProbeFailed(TIMEOUT, f"{host}:{port} not listening before timeout")
+        time.sleep(delay)
+
+
+def wait_for_service(name: str, host: str, port: int, deadline: float,
+                     pid: Optional[int] = None, ready_message: Optional[str] = None):
+    """
+    通过总线等待服务就绪
+
+    周期性发送 mycroft.<name>.is_ready 并等待 status 为 True 的响应；
+    同时监听 ready_message 广播（服务只广播、不响应查询时使用）。
+    """
+    wait_for_port(host, port, deadline, pid)
+    if MessageBusClient is None:
+        raise ProbeFailed(UNCONFIRMED, "ovos_bus_client not available, only the bus port was checked")
+
+    ready = threading.Event()
+    client = MessageBusClient(host=host, port=port, route='/core', ssl=False)
+    if ready_message:
+        client.on(ready_message, lambda message: ready.set())
+    client.run_in_thread()
+    try:
+        if not client.connected_event.wait(max(0.0, deadline - time.monotonic())):
+            raise ProbeFailed(TIMEOUT, "could not connect to the message bus")
+
+        query = f"mycroft.{name}.is_ready"
+        for delay in backoff():
+            if ready.is_set():
+                return
+            response = client.wait_for_response(Message(query), reply_type=f"{query}.response",
+                                                timeout=max(delay, 0.5))
+            if ready.is_set() or (response is not None and response.data.get('status')):
+                return
+            if not process_alive(pid):
+                raise ProbeFailed(EXITED, f"process {pid} exited")
+            if time.monotonic() + delay > deadline:
+                raise ProbeFailed(TIMEOUT, f"no ready response to {query} before timeout")
+            time.sleep(delay)
+    finally:
+        client.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='等待 OVOS 服务就绪')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_port = sub.add_parser('port', help='等待消息总线端口可连接')
+    p_port.add_argument('--check', action='store_true', help='只检查一次，端口可连接时退出码为 0')
+
+    p_service = sub.add_parser('service', help='等待服务通过总线报告就绪')
+    p_service.add_argument('name', help='服务名，用于 mycroft.<name>.is_ready（skills、audio、voice、PHAL ...）')
+    p_service.add_argument('--ready-message', help='收到该广播消息即视为就绪（例如 mycroft.ready）')
+
+    for p in (p_port, p_service):
+        p.add_argument('--host', default=DEFAULT_HOST, help='消息总线地址 (默认: %(default)s)')
+        p.add_argument('--port', type=int, default=DEFAULT_PORT, help='消息总线端口 (默认: %(default)s)')
+        p.add_argument('--pid', type=int, help='被探测服务的进程号，进程退出时立即失败')
+        p.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                       help='超时秒数 (默认: $OVOS_READY_TIMEOUT 或 %(default)s)')
+        p.add_argument('--since', type=float, help='服务启动时的时间戳（date +%%s.%%N），用于计算启动到就绪的耗时')
+        p.add_argument('--label', help='输出中使用的服务名称')
+    args = parser.parse_args(argv)
+
+    if args.command == 'port' and args.check:
+        return READY if port_open(args.host, args.port) else TIMEOUT
+
+    label = args.label or (args.name if args.command == 'service' else f"{args.host}:{args.port}")
+    deadline = time.monotonic() + args.timeout
+    try:
+        if args.command == 'port':
+            wait_for_port(args.host, args.port, deadline, args.pid)
+        else:
+            wait_for_service(args.name, args.host, args.port, deadline, args.pid, args.ready_message)
+        code = READY
+    except ProbeFailed as e:
+        code = e.code
+        message = str(e)
+
+    elapsed = f" ({time.time() - args.since:.2f}s from launch)" if args.since else ''
+    if code == READY:
+        log_success(f"{label} ready{elapsed}")
+    elif code == UNCONFIRMED:
+        log_warn(f"{label}: {message}{elapsed}")
+    else:
+        log_error(f"{label}: {message}")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,671 @@
+#!/usr/bin/env python3
+"""
+OVOS 开发模式进程管理器
+
+由 SERVICES 服务表驱动（声明启动顺序、依赖、命令、就绪检查、重启策略），
+替代 bin/ovos-dev 中为每个服务单独维护的 PID、启动标志和停止函数：
+
+- 依赖就绪后立即启动，互不依赖的服务并发启动
+- 就绪检查复用 ovos_ready.py（总线端口 / mycroft.<name>.is_ready）
+- 崩溃的服务按重启策略以指数退避重启
+- 关闭时按依赖的逆拓扑顺序停止，互不依赖的服务并行停止，
+  整个关闭过程共用一个截止时间（--stop-deadline / OVOS_STOP_DEADLINE）
+- 每个服务在自己的进程组中运行，停止时向整个进程组发信号并等待组内进程全部退出
+- 所有服务的输出由 ovos_logmux.LogMux 在同一个事件循环中读取：写入按大小轮转的
+  日志文件，按服务、级别、正则过滤后带前缀输出到终端，运行时可输入命令修改过滤条件
+- --zygote（或 OVOS_ZYGOTE=1）时，标记了 zygote 的服务由 ovos_zygote.py 预导入共享
+  模块后 fork 启动；运行时输入 restart NAME 重启服务。每个服务按启动方式（cold/zygote）
+  记录启动到就绪的耗时（logs/startup-times.json），就绪时与另一种方式上次的耗时对比
+- --profile-startup 时以 PYTHONPROFILEIMPORTTIME=1（即 -X importtime）启动服务，导入耗时
+  写入 logs/importtime/<服务>.log，退出时由 ovos_importtime.py 输出按包排名的报告和
+  flamegraph 折叠栈文件
+
+bin/ovos-dev 负责准备 venv 和配置，然后调用本脚本。
+
+用法:
+  python3 ovos_supervisor.py [--log-dir DIR] [--skip SERVICE ...] [--only SERVICE ...]
+  python3 ovos_supervisor.py --show all --log-level warning     # 终端显示所有服务的警告和错误
+  python3 ovos_supervisor.py --zygote                           # 预导入共享模块后 fork 启动服务
+  python3 ovos_supervisor.py --profile-startup --only core      # 分析 ovos-core 启动时的导入耗时
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import shutil
+import signal
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ovos_importtime import FOLDED_FILE, LINE_PREFIX, engine_modules, load_profiles, print_report
+from ovos_logmux import (DEFAULT_BACKUPS, DEFAULT_BUFFER_LINES, DEFAULT_MAX_BYTES, LEVELS,
+                         READ_LIMIT, LogFilter, LogMux)
+from ovos_ready import (DEFAULT_HOST, DEFAULT_PORT, DEFAULT_TIMEOUT, EXITED, TIMEOUT, UNCONFIRMED,
+                        ProbeFailed, port_open, wait_for_port, wait_for_service)
+from ovos_zygote import Zygote, ZygoteError
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}", flush=True)
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}", flush=True)
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}", flush=True)
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}", flush=True)
+
+PROJECT_ROOT = Path(__file__).parent.parent.absolute()
+ENGINE_DIR = PROJECT_ROOT / 'engine'
+DEFAULT_LOG_DIR = PROJECT_ROOT / 'logs'
+
+# 服务表（字典顺序即启动顺序）
+#   cmd:      命令；{python} 替换为当前解释器
+#   after:    依赖的服务，全部就绪（或被跳过）后才启动
+#   ready:    就绪检查 {'port': 端口} 或 {'bus': 服务名, 'message': 广播消息}
+#   restart:  重启策略 no | on-failure | always
+#   critical: 该服务最终退出（不再重启）时关闭整个系统
+#   adopt:    端口上已有实例在运行时直接使用，不再启动
+#   zygote:   --zygote 时从预导入进程 fork 启动（命令须为 console_scripts 或 python -m）
+#   echo:     默认在终端显示该服务的输出（可用 --show 或运行时的 show/hide 命令修改）
+#   log:      日志文件名（相对日志目录）
+SERVICES = {
+    'messagebus': {
+        'description': 'Message bus',
+        'cmd': ['{python}', '-m', 'ovos_messagebus'],
+        'after': [],
+        'ready': {'port': DEFAULT_PORT},
+        'restart': 'on-failure',
+        'critical': True,
+        'adopt': True,
+        'log': 'messagebus.log',
+    },
+    'phal': {
+        'description': 'OVOS PHAL',
+        'cmd': ['ovos_PHAL'],
+        'after': ['messagebus'],
+        'ready': {'bus': 'PHAL'},
+        'restart': 'on-failure',
+        'zygote': True,
+        'log': 'ovos-phal.log',
+    },
+    'audio': {
+        'description': 'OVOS audio',
+        'cmd': ['ovos-audio'],
+        'after': ['messagebus'],
+        'ready': {'bus': 'audio'},
+        'restart': 'on-failure',
+        'zygote': True,
+        'log': 'ovos-audio.log',
+    },
+    'dinkum': {
+        'description': 'OVOS dinkum listener',
+        'cmd': ['ovos-dinkum-listener'],
+        'after': ['messagebus'],
+        'ready': {'bus': 'voice'},
+        'restart': 'on-failure',
+        'zygote': True,
+        'log': 'ovos-dinkum-listener.log',
+    },
+    'core': {
+        'description': 'OVOS core',
+        'cmd': ['ovos-core'],
+        'after': ['messagebus'],
+        'ready': {'bus': 'skills', 'message': 'mycroft.ready'},
+        'restart': 'on-failure',
+        'critical': True,
+        'zygote': True,
+        'echo': True,
+        'log': 'ovos-core.log',
+    },
+}
+
+# 重启退避: 首次等待、最大等待（秒）；连续运行超过 RESTART_RESET 秒后重新计数
+RESTART_BACKOFF_START = 1.0
+RESTART_BACKOFF_MAX = 30.0
+RESTART_RESET = 60.0
+MAX_RESTARTS = 5
+
+# 关闭所有服务的总截止时间（秒），到达后仍未退出的进程组被 SIGKILL
+DEFAULT_STOP_DEADLINE = float(os.environ.get('OVOS_STOP_DEADLINE', 15))
+# SIGKILL 后等待进程组消失的时间、轮询进程组的间隔（秒）
+KILL_GRACE = 2.0
+GROUP_POLL = 0.05
+
+DEFAULT_ZYGOTE = os.environ.get('OVOS_ZYGOTE', '').lower() in ('1', 'true', 'yes', 'on')
+# 每个服务按启动方式记录的最近一次启动到就绪耗时（相对日志目录）
+TIMINGS_FILE = 'startup-times.json'
+
+
+class Service:
+    """服务表中一项的运行状态"""
+
+    def __init__(self, name: str, spec: Dict):
+        self.name = name
+        self.description = spec.get('description', name)
+        self.cmd = [sys.executable if arg == '{python}' else arg for arg in spec['cmd']]
+        self.after = list(spec.get('after', []))
+        self.ready_check = dict(spec.get('ready', {}))
+        self.restart = spec.get('restart', 'no')
+        self.critical = spec.get('critical', False)
+        self.adopt = spec.get('adopt', False)
+        self.echo = spec.get('echo', False)
+        self.use_zygote = spec.get('zygote', False)
+        self.log = spec.get('log', f'{name}.log')
+
+        # pending | starting | ready | skipped | external | failed | stopped
+        self.state = 'pending'
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+        self.launched_at: Optional[float] = None
+        self.ready_after: Optional[float] = None   # 启动到就绪的耗时
+        self.returncode: Optional[int] = None
+        self.settled = asyncio.Event()   # 已就绪、被跳过或已失败，依赖它的服务可以继续
+        self.stopped = asyncio.Event()   # 已停止（或从未运行）
+        self.stopped.set()
+        self.pump: Optional[asyncio.Task] = None
+        self.mode = 'cold'               # 最近一次启动方式: cold | zygote
+        self.restart_requested = False   # 通过 restart 命令请求的重启，不计入崩溃重启次数
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+
+class Supervisor:
+    """按服务表启动、监控和停止服务"""
+
+    def __init__(self, services: Dict[str, Dict], log_dir: Path,
+                 skip: Optional[List[str]] = None, ready_timeout: float = DEFAULT_TIMEOUT,
+                 stop_deadline: float = DEFAULT_STOP_DEADLINE,
+                 host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 log_filter: Optional[LogFilter] = None, log_max_bytes: int = DEFAULT_MAX_BYTES,
+                 log_backups: int = DEFAULT_BACKUPS, log_buffer: int = DEFAULT_BUFFER_LINES,
+                 zygote: bool = False, profile_startup: bool = False):
+        self.services = {name: Service(name, spec) for name, spec in services.items()}
+        self.log_dir = log_dir
+        if log_filter is None:
+            log_filter = LogFilter(services=[svc.name for svc in self.services.values() if svc.echo])
+        # 日志文件在服务首次输出时清空，重启后继续写入同一文件以保留崩溃前的输出
+        self.logs = LogMux(log_dir, log_filter, max_bytes=log_max_bytes, backups=log_backups,
+                           buffer_lines=log_buffer)
+        for svc in self.services.values():
+            self.logs.register(svc.name, svc.log)
+        self.profile_dir = log_dir / 'importtime' if profile_startup else None
+        self.env = None
+        if profile_startup:
+            self.env = dict(os.environ, PYTHONPROFILEIMPORTTIME='1')
+            for svc in self.services.values():
+                self.logs.divert(svc.name, LINE_PREFIX, f"importtime/{svc.name}.log")
+            if zygote:
+                # fork 出的服务不会重新导入预导入的模块，分析结果不完整
+                log_warn("--profile-startup measures cold starts, ignoring --zygote")
+                zygote = False
+        self.logs.add_command('restart', 'restart NAME...     restart these services', self._restart_command)
+
+        # 只有服务表中有服务使用 zygote 时才启动它
+        self.zygote: Optional[Zygote] = None
+        self._zygote_settled = asyncio.Event()
+        self._zygote_pump: Optional[asyncio.Task] = None
+        if zygote and any(svc.use_zygote for svc in self.services.values()):
+            self.zygote = Zygote()
+            self.logs.register('zygote', 'ovos-zygote.log')
+        else:
+            self._zygote_settled.set()
+        self.timings_file = log_dir / TIMINGS_FILE
+        self.timings = self._load_timings()
+        self.skip = set(skip or [])
+        self.ready_timeout = ready_timeout
+        self.stop_deadline = stop_deadline
+        self.host = host
+        self.port = port
+        self.exit_code = 0
+        self._stopping = asyncio.Event()
+        # 启动进程与开始关闭互斥，避免关闭过程中又启动了新的进程
+        self._spawn_lock = asyncio.Lock()
+        self._check_graph()
+
+    def _check_graph(self):
+        """依赖必须存在且无环"""
+        for svc in self.services.values():
+            for dep in svc.after:
+                if dep not in self.services:
+                    raise ValueError(f"{svc.name} depends on unknown service {dep}")
+        self.topological_order()
+
+    def topological_order(self) -> List[str]:
+        """依赖在前的服务顺序（同层按服务表顺序）"""
+        order, visiting = [], set()
+
+        def visit(name):
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"dependency cycle at service {name}")
+            visiting.add(name)
+            for dep in self.services[name].after:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.services:
+            visit(name)
+        return order
+
+    def dependents(self, name: str) -> List['Service']:
+        """直接依赖 name 的服务"""
+        return [svc for svc in self.services.values() if name in svc.after]
+
+    # ------------------------------------------------------------------
+    # 运行
+    # ------------------------------------------------------------------
+
+    async def run(self) -> int:
+        """启动所有服务，直到收到停止信号或关键服务最终退出，然后停止所有服务"""
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.request_stop)
+        self.logs.start()
+
+        zygote = asyncio.create_task(self._start_zygote())
+        tasks = [asyncio.create_task(self._supervise(svc)) for svc in self.services.values()]
+        summary = asyncio.create_task(self._startup_summary())
+        await self._stopping.wait()
+
+        await self.shutdown()
+        summary.cancel()
+        zygote.cancel()
+        await asyncio.gather(*tasks, summary, zygote, return_exceptions=True)
+        if self.zygote is not None:
+            await self.zygote.stop()
+        await self.logs.close()
+        if self.profile_dir is not None:
+            self.report_import_times()
+        return self.exit_code
+
+    def request_stop(self, exit_code: Optional[int] = None):
+        """请求关闭（信号处理或关键服务退出时调用）"""
+        if not self._stopping.is_set():
+            log_warn("Stopping OVOS services...")
+            if exit_code is not None:
+                self.exit_code = exit_code
+            self._stopping.set()
+
+    async def _supervise(self, svc: Service):
+        """启动单个服务，崩溃时按重启策略重启"""
+        for dep in svc.after:
+            await self.services[dep].settled.wait()
+        if self._stopping.is_set():
+            return self._settle(svc, 'stopped')
+
+        failed_deps = [dep for dep in svc.after if self.services[dep].state == 'failed']
+        if failed_deps:
+            log_error(f"{svc.description} not started: {', '.join(failed_deps)} failed")
+            return self._settle(svc, 'failed')
+
+        if svc.name in self.skip:
+            log_info(f"Skipping {svc.description} (assuming it is already running)")
+            return self._settle(svc, 'external')
+        if svc.adopt and 'port' in svc.ready_check and port_open(self.host, svc.ready_check['port']):
+            log_warn(f"{svc.description} already running on port {svc.ready_check['port']}")
+            return self._settle(svc, 'external')
+        if shutil.which(svc.cmd[0]) is None:
+            log_warn(f"{svc.cmd[0]} not found in PATH, skipping {svc.description} startup")
+            return self._settle(svc, 'skipped')
+        if svc.use_zygote:
+            await self._zygote_settled.wait()
+
+        while True:
+            async with self._spawn_lock:
+                if self._stopping.is_set():
+                    break
+                log_info(f"Starting {svc.description}...")
+                try:
+                    await self._spawn(svc)
+                except OSError as e:
+                    log_error(f"{svc.description} failed to start: {e}")
+                    svc.returncode = 127
+                    self._settle(svc, 'failed')
+                    break
+            ready = asyncio.create_task(self._await_ready(svc))
+            started = time.monotonic()
+            svc.returncode = await svc.proc.wait()
+            ready.cancel()
+            await svc.pump
+
+            if self._stopping.is_set():
+                break
+            if svc.restart_requested:
+                svc.restart_requested = False
+                continue
+            log_warn(f"{svc.description} exited with code {svc.returncode}")
+
+            if time.monotonic() - started > RESTART_RESET:
+                svc.restarts = 0
+            if not self._should_restart(svc):
+                self._settle(svc, 'failed' if svc.returncode else 'stopped')
+                break
+            svc.restarts += 1
+            delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_START * 2 ** (svc.restarts - 1))
+            log_info(f"Restarting {svc.description} in {delay:.1f}s (restart {svc.restarts}/{MAX_RESTARTS})")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+        if self._stopping.is_set():
+            return  # shutdown() 负责停止并标记
+        svc.stopped.set()
+        if svc.critical:
+            log_error(f"{svc.description} stopped; shutting down")
+            self.request_stop(svc.returncode or 0)
+
+    def _should_restart(self, svc: Service) -> bool:
+        if svc.restart == 'always' or (svc.restart == 'on-failure' and svc.returncode != 0):
+            if svc.restarts < MAX_RESTARTS:
+                return True
+            log_error(f"{svc.description} crashed {svc.restarts + 1} times, giving up")
+        return False
+
+    def _settle(self, svc: Service, state: str):
+        svc.state = state
+        svc.settled.set()
+        if state != 'ready' and not svc.running:
+            svc.stopped.set()
+
+    async def _spawn(self, svc: Service):
+        """在新的进程组中启动服务（可用时从 zygote fork），输出交给日志多路复用"""
+        svc.state = 'starting'
+        svc.launched_at = time.time()
+        svc.mode = 'cold'
+        if svc.use_zygote and self.zygote is not None and self.zygote.running:
+            try:
+                svc.proc, reloaded = await self.zygote.spawn(svc.cmd, str(ENGINE_DIR), limit=READ_LIMIT)
+                svc.mode = 'zygote'
+                if reloaded:
+                    log_info(f"Zygote re-imported changed packages: {', '.join(reloaded)}")
+            except ZygoteError as e:
+                log_warn(f"{svc.description}: zygote spawn failed ({e}), starting cold")
+        if svc.mode == 'cold':
+            svc.proc = await asyncio.create_subprocess_exec(
+                *svc.cmd, cwd=str(ENGINE_DIR), start_new_session=True, env=self.env,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, limit=READ_LIMIT)
+        svc.stopped.clear()
+        svc.pump = asyncio.create_task(self.logs.pump(svc.name, svc.proc.stdout))
+
+    async def _await_ready(self, svc: Service):
+        """等待就绪检查通过；超时只告警，服务仍视为已启动"""
+        deadline = time.monotonic() + self.ready_timeout
+        pid = svc.proc.pid
+        try:
+            if 'port' in svc.ready_check:
+                await asyncio.to_thread(wait_for_port, self.host, svc.ready_check['port'], deadline, pid)
+            elif 'bus' in svc.ready_check:
+                await asyncio.to_thread(wait_for_service, svc.ready_check['bus'], self.host, self.port,
+                                        deadline, pid, svc.ready_check.get('message'))
+        except ProbeFailed as e:
+            if e.code == EXITED:
+                return  # 由 _supervise 处理退出
+            if e.code == TIMEOUT:
+                log_warn(f"{svc.description} did not report ready within {self.ready_timeout:.0f}s, "
+                         f"continuing (PID: {pid})")
+            elif e.code == UNCONFIRMED:
+                log_warn(f"{svc.description}: {e}")
+        svc.ready_after = time.time() - svc.launched_at
+        log_success(f"{svc.description} ready (PID: {pid}, {svc.ready_after:.2f}s from launch"
+                    f"{self._record_timing(svc)})")
+        self._settle(svc, 'ready')
+
+    async def _start_zygote(self):
+        """启动 zygote 并等待预导入完成；失败时相关服务改为直接启动"""
+        if self.zygote is None:
+            return
+        try:
+            log_info("Starting zygote (preloading shared modules)...")
+            proc = await self.zygote.start(str(ENGINE_DIR))
+            self._zygote_pump = asyncio.create_task(self.logs.pump('zygote', proc.stdout))
+            await self.zygote.wait_ready(self.ready_timeout)
+            log_success(f"Zygote ready (PID: {proc.pid}, preloaded in {self.zygote.ready_after:.2f}s)")
+        except (OSError, ZygoteError) as e:
+            log_warn(f"Zygote unavailable ({e}), services will start cold")
+            await self.zygote.stop()
+        finally:
+            self._zygote_settled.set()
+
+    def report_import_times(self):
+        """输出各服务的导入耗时排名并写出 flamegraph 折叠栈文件"""
+        profiles = load_profiles(self.profile_dir)
+        if not profiles:
+            log_warn(f"No import-time output was collected in {self.profile_dir}")
+            return
+        print(f"\n{BLUE}Startup import times (last start of each service):{NC}", flush=True)
+        print_report(profiles, engine_modules(ENGINE_DIR), folded=self.profile_dir / FOLDED_FILE)
+        sys.stdout.flush()
+
+    def _restart_command(self, names: List[str]):
+        """restart 命令：停止服务进程组，_supervise 立即重新启动（不计入崩溃次数）"""
+        for name in names:
+            svc = self.services.get(name)
+            if svc is None or not svc.running:
+                log_warn(f"{name} is not running")
+                continue
+            log_info(f"Restarting {svc.description}...")
+            svc.restart_requested = True
+            self._signal_group(svc, signal.SIGTERM)
+
+    def _load_timings(self) -> Dict[str, Dict[str, float]]:
+        try:
+            with open(self.timings_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _record_timing(self, svc: Service) -> str:
+        """保存本次启动到就绪的耗时，返回与另一种启动方式上次耗时的对比说明"""
+        timings = self.timings.setdefault(svc.name, {})
+        timings[svc.mode] = round(svc.ready_after, 3)
+        try:
+            with open(self.timings_file, 'w') as f:
+                json.dump(self.timings, f, indent=2)
+        except OSError:
+            pass
+        if not svc.use_zygote:
+            return ''
+        other = 'cold' if svc.mode == 'zygote' else 'zygote'
+        if other not in timings:
+            return f", {svc.mode}"
+        return f", {svc.mode}; last {other} start {timings[other]:.2f}s"
+
+    async def _startup_summary(self):
+        """所有服务都就绪（或跳过/失败）后输出启动耗时"""
+        await asyncio.gather(*(svc.settled.wait() for svc in self.services.values()))
+        print(f"\n{BLUE}Startup summary:{NC}", flush=True)
+        for name in self.topological_order():
+            svc = self.services[name]
+            timing = f"{svc.ready_after:6.2f}s" if svc.ready_after is not None else '     - '
+            mode = svc.mode if svc.launched_at is not None else ''
+            print(f"  {svc.description:24} {svc.state:9} {timing}  {mode}".rstrip(), flush=True)
+        print(flush=True)
+
+    # ------------------------------------------------------------------
+    # 停止
+    # ------------------------------------------------------------------
+
+    async def shutdown(self):
+        """
+        在一个总的截止时间内按逆拓扑顺序停止
+
+        没有其他服务依赖的服务（叶子）同时收到 SIGTERM，各自等待整个进程组退出；
+        一个服务在依赖它的服务全部退出后才收到 SIGTERM（总线最后停止）。
+        截止时间到达时仍未退出的进程组一律 SIGKILL。最后输出每个服务的退出耗时。
+        """
+        async with self._spawn_lock:
+            pass  # 等待正在进行的启动完成；之后不会再启动新的进程
+
+        started = time.monotonic()
+        deadline = started + self.stop_deadline
+        report = {}
+
+        async def stop(svc: Service):
+            for dependent in self.dependents(svc.name):
+                await dependent.stopped.wait()
+            if svc.proc is not None and (svc.running or self._group_alive(svc)):
+                report[svc.name] = await self._stop_process(svc, deadline, started)
+            svc.stopped.set()
+
+        await asyncio.gather(*(stop(svc) for svc in self.services.values()))
+
+        print(f"\n{BLUE}Shutdown summary (deadline {self.stop_deadline:.0f}s):{NC}", flush=True)
+        for name in reversed(self.topological_order()):
+            if name not in report:
+                continue
+            svc = self.services[name]
+            signaled_at, exited_in, killed = report[name]
+            how = 'killed at deadline' if killed else 'exited'
+            print(f"  {svc.description:24} {how:18} {exited_in:6.2f}s after SIGTERM"
+                  f" (signaled at +{signaled_at:.2f}s)", flush=True)
+        log_success(f"All OVOS services stopped in {time.monotonic() - started:.2f}s")
+
+    async def _stop_process(self, svc: Service, deadline: float, started: float):
+        """
+        SIGTERM 进程组并等待组内所有进程退出，截止时间到达后 SIGKILL
+
+        返回 (相对关闭开始的发信号时间, 发信号到退出的耗时, 是否被强制结束)
+        """
+        signaled = time.monotonic()
+        log_info(f"Stopping {svc.description} (PID: {svc.proc.pid})...")
+        self._signal_group(svc, signal.SIGTERM)
+        killed = not await self._wait_group(svc, deadline)
+        if killed:
+            log_warn(f"{svc.description} did not exit before the deadline, sending SIGKILL to process group")
+            self._signal_group(svc, signal.SIGKILL)
+            await self._wait_group(svc, time.monotonic() + KILL_GRACE)
+        svc.state = 'stopped'
+        return signaled - started, time.monotonic() - signaled, killed
+
+    async def _wait_group(self, svc: Service, deadline: float) -> bool:
+        """等待服务进程及其进程组内的所有进程退出；截止时间前退出返回 True"""
+        while True:
+            if not svc.running and not self._group_alive(svc):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if svc.running:
+                try:
+                    await asyncio.wait_for(asyncio.shield(svc.proc.wait()), min(remaining, GROUP_POLL))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # 主进程已退出，组内还有子进程（例如插件启动的进程）
+                await asyncio.sleep(min(remaining, GROUP_POLL))
+
+    @staticmethod
+    def _group_alive(svc: Service) -> bool:
+        """服务的进程组（pgid 即服务进程的 pid）中是否还有进程"""
+        try:
+            os.killpg(svc.proc.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    @staticmethod
+    def _signal_group(svc: Service, sig: int):
+        try:
+            os.killpg(svc.proc.pid, sig)
+        except ProcessLookupError:
+            pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='OVOS 开发模式进程管理器')
+    parser.add_argument('--log-dir', default=str(DEFAULT_LOG_DIR), help='日志目录 (默认: %(default)s)')
+    parser.add_argument('--skip', action='append', default=[], choices=list(SERVICES),
+                        help='不启动该服务（视为已在运行），可重复')
+    parser.add_argument('--only', action='append', default=[], choices=list(SERVICES),
+                        help='只启动这些服务及其依赖，可重复')
+    parser.add_argument('--ready-timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='每个服务的就绪等待时间（秒） (默认: $OVOS_READY_TIMEOUT 或 %(default)s)')
+    parser.add_argument('--stop-deadline', type=float, default=DEFAULT_STOP_DEADLINE,
+                        help='关闭所有服务的总截止时间（秒） (默认: $OVOS_STOP_DEADLINE 或 %(default)s)')
+    parser.add_argument('--show', action='append', default=[], choices=list(SERVICES) + ['all'],
+                        help='在终端显示该服务的输出，可重复 (默认: 服务表中 echo 的服务)')
+    parser.add_argument('--log-level', default='DEBUG', type=str.upper, choices=list(LEVELS),
+                        help='终端只显示该级别及以上的日志 (默认: %(default)s)')
+    parser.add_argument('--log-grep', metavar='REGEX', help='终端只显示匹配该正则的日志行')
+    parser.add_argument('--log-max-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help='单个日志文件的最大字节数，超过后轮转 (默认: %(default)s)')
+    parser.add_argument('--log-backups', type=int, default=DEFAULT_BACKUPS,
+                        help='每个服务保留的轮转日志数 (默认: %(default)s)')
+    parser.add_argument('--log-buffer', type=int, default=DEFAULT_BUFFER_LINES,
+                        help='每个服务待写入的最大行数，写入跟不上时丢弃最旧的行 (默认: %(default)s)')
+    parser.add_argument('--zygote', action='store_true', default=DEFAULT_ZYGOTE,
+                        help='从预导入共享模块的 zygote 进程 fork 启动服务 (默认: $OVOS_ZYGOTE)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='以 -X importtime 启动服务，退出时输出按包排名的导入耗时和 flamegraph 文件')
+    parser.add_argument('--list', action='store_true', help='列出服务表后退出')
+    args = parser.parse_args(argv)
+    if args.log_grep:
+        try:
+            re.compile(args.log_grep)
+        except re.error as e:
+            parser.error(f"--log-grep: {e}")
+    return args
+
+
+def select_services(only: List[str]) -> Dict[str, Dict]:
+    """only 中的服务及其传递依赖（保持服务表顺序）"""
+    if not only:
+        return dict(SERVICES)
+    wanted = set()
+    stack = list(only)
+    while stack:
+        name = stack.pop()
+        if name not in wanted:
+            wanted.add(name)
+            stack.extend(SERVICES[name].get('after', []))
+    return {name: spec for name, spec in SERVICES.items() if name in wanted}
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    services = select_services(args.only)
+
+    if args.list:
+        for name, spec in services.items():
+            after = ', '.join(spec.get('after', [])) or '-'
+            print(f"  {name:12} {' '.join(spec['cmd']):32} after: {after:12} restart: {spec.get('restart', 'no')}")
+        return 0
+
+    shown = None if 'all' in args.show else (args.show or [name for name, spec in services.items()
+                                                           if spec.get('echo')])
+
+    async def run():
+        log_filter = LogFilter(args.log_level, args.log_grep, shown)
+        supervisor = Supervisor(services, Path(args.log_dir), skip=args.skip,
+                                ready_timeout=args.ready_timeout, stop_deadline=args.stop_deadline,
+                                log_filter=log_filter, log_max_bytes=args.log_max_bytes,
+                                log_backups=args.log_backups, log_buffer=args.log_buffer,
+                                zygote=args.zygote, profile_startup=args.profile_startup)
+        return await supervisor.run()
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+OVOS 服务预导入进程（zygote）
+
+开发模式下每次启动或重启 ovos-core、audio、PHAL、dinkum listener 都要重新导入
+ovos_utils、ovos_config、ovos_bus_client、ovos_plugin_manager、ovos_workshop，
+在树莓派上每个服务要花好几秒。zygote 先导入这些共享模块，然后为每个服务 fork
+出子进程，子进程只需导入服务自己的包：
+
+- 服务自己的包（ovos_core、ovos_audio ...）不预导入，每次 fork 后重新导入，
+  修改服务代码后重启立即生效
+- 每次 fork 前检查预导入包的源文件 mtime；某个包被修改时，只清除并重新导入
+  该包以及预导入顺序在它之后（可能引用了它）的包
+- 子进程调用 setsid()，与直接启动的服务一样在自己的进程组中运行
+
+由 ovos_supervisor.py --zygote 启动和使用；也可以单独运行做调试。
+
+协议（Unix SOCK_SEQPACKET socket，每个服务一个连接，每条消息一个 JSON）:
+  请求  {"cmd": [...], "cwd": ..., "env": {...}}，同时通过 SCM_RIGHTS 传递输出管道的写端
+  响应  {"pid": N, "reloaded": [...]} 或 {"error": "..."}；子进程退出后 {"exit": 退出码}
+
+用法:
+  python3 ovos_zygote.py --socket /tmp/ovos-zygote.sock [--preload ovos_utils,ovos_workshop]
+"""
+
+import argparse
+import asyncio
+import atexit
+import importlib
+import json
+import os
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from importlib import metadata
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ovos_ready import backoff, process_alive
+
+# 按依赖顺序排列：后面的包可能引用前面的包，前面的包被重新导入时后面的也要重新导入
+DEFAULT_PRELOAD = ('ovos_utils', 'ovos_config', 'ovos_bus_client', 'ovos_plugin_manager', 'ovos_workshop')
+ENV_PRELOAD = 'OVOS_ZYGOTE_PRELOAD'
+
+MAX_MESSAGE = 1024 * 1024
+# zygote 不可用后轮询子进程是否退出的间隔（秒）
+ORPHAN_POLL = 0.2
+
+
+def default_socket_path() -> str:
+    return os.path.join(tempfile.gettempdir(), f"ovos-zygote-{os.getpid()}.sock")
+
+
+def preload_packages() -> List[str]:
+    value = os.environ.get(ENV_PRELOAD)
+    return [pkg.strip() for pkg in value.split(',') if pkg.strip()] if value else list(DEFAULT_PRELOAD)
+
+
+# ---------------------------------------------------------------------------
+# zygote 进程
+# ---------------------------------------------------------------------------
+
+class Preloader:
+    """导入共享包，并在源文件变化时重新导入"""
+
+    def __init__(self, packages: List[str]):
+        self.packages = list(packages)
+        self.sources: Dict[str, Dict[str, int]] = {}   # 包 -> {源文件: mtime_ns}
+
+    def load(self, packages: Optional[List[str]] = None):
+        for pkg in packages or self.packages:
+            start = time.monotonic()
+            try:
+                importlib.import_module(pkg)
+            except Exception as e:
+                print(f"preload {pkg} failed: {e}", flush=True)
+                self.sources.pop(pkg, None)
+                continue
+            self.sources[pkg] = self._snapshot(pkg)
+            print(f"preloaded {pkg} in {time.monotonic() - start:.2f}s "
+                  f"({len(self.sources[pkg])} modules)", flush=True)
+
+    def refresh(self) -> List[str]:
+        """重新导入源文件已变化的包（及其后的包），返回重新导入的包"""
+        for i, pkg in enumerate(self.packages):
+            if pkg in self.sources and self._snapshot_changed(pkg):
+                break
+        else:
+            return []
+        reload = [pkg for pkg in self.packages[i:] if pkg in self.sources]
+        for pkg in reload:
+            for name in self._module_names(pkg):
+                del sys.modules[name]
+        importlib.invalidate_caches()
+        self.load(reload)
+        return reload
+
+    @staticmethod
+    def _module_names(pkg: str) -> List[str]:
+        return [name for name in list(sys.modules) if name == pkg or name.startswith(pkg + '.')]
+
+    def _snapshot(self, pkg: str) -> Dict[str, int]:
+        sources = {}
+        for name in self._module_names(pkg):
+            path = getattr(sys.modules[name], '__file__', None)
+            if path:
+                try:
+                    sources[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+        return sources
+
+    def _snapshot_changed(self, pkg: str) -> bool:
+        for path, mtime in self.sources[pkg].items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+
+def resolve_target(cmd: List[str]) -> Tuple[Callable, List[str]]:
+    """把服务命令转换为 (入口函数, sys.argv)；支持 python -m 模块和 console_scripts"""
+    if len(cmd) >= 3 and cmd[1] == '-m':
+        module = cmd[2]
+        return (lambda: runpy.run_module(module, run_name='__main__', alter_sys=True)), [module] + cmd[3:]
+
+    name = os.path.basename(cmd[0])
+    try:
+        eps = metadata.entry_points(group='console_scripts')
+    except TypeError:  # Python < 3.10
+        eps = metadata.entry_points().get('console_scripts', [])
+    for ep in eps:
+        if ep.name == name:
+            return ep.load, [cmd[0]] + cmd[1:]
+    raise LookupError(f"no console_scripts entry point named {name}")
+
+
+def run_child(target: Callable, argv: List[str], cwd: str, env: Dict[str, str], out_fd: int,
+              inherited: List[int]):
+    """fork 出的子进程：成为新会话的首进程，输出写入管道，运行服务入口"""
+    os.setsid()
+    for fd in inherited:
+        try:
+            os.close(fd)
+        except OSError:
+            pass
+    os.dup2(out_fd, 1)
+    os.dup2(out_fd, 2)
+    os.close(out_fd)
+    signal.set_wakeup_fd(-1)
+    for sig in (signal.SIGCHLD, signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, signal.SIG_DFL)
+
+    os.chdir(cwd)
+    os.environ.clear()
+    os.environ.update(env)
+    sys.argv = argv
+
+    code = 0
+    try:
+        result = target()
+        if callable(result):  # console_scripts 入口: ep.load() 返回函数
+            result = result()
+        code = result if isinstance(result, int) else 0
+    except SystemExit as e:
+        if isinstance(e.code, int) or e.code is None:
+            code = e.code or 0
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def serve(socket_path: str, preloader: Preloader):
+    """接受 fork 请求，回收子进程并把退出码发回请求方"""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(socket_path)
+    listener.listen()
+
+    wake_r, wake_w = os.pipe()
+    os.set_blocking(wake_r, False)
+    os.set_blocking(wake_w, False)
+    signal.set_wakeup_fd(wake_w)
+    stopping = []
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.append(True))
+
+    sel = selectors.DefaultSelector()
+    sel.register(listener, selectors.EVENT_READ)
+    sel.register(wake_r, selectors.EVENT_READ)
+    children: Dict[int, socket.socket] = {}
+    print(f"zygote listening on {socket_path}", flush=True)
+
+    def reap():
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            conn = children.pop(pid, None)
+            if conn is not None:
+                try:
+                    conn.send(json.dumps({'exit': os.waitstatus_to_exitcode(status)}).encode())
+                except OSError:
+                    pass  # 请求方已断开
+
+    def spawn(conn: socket.socket):
+        try:
+            msg, fds, _, _ = socket.recv_fds(conn, MAX_MESSAGE, 1)
+        except OSError:
+            msg, fds = b'', []
+        if not msg:
+            sel.unregister(conn)
+            conn.close()
+            return
+        if not fds:
+            conn.send(json.dumps({'error': 'no output pipe received'}).encode())
+            return
+        out_fd = fds[0]
+        try:
+            request = json.loads(msg)
+            reloaded = preloader.refresh()
+            target, argv = resolve_target(request['cmd'])
+        except Exception as e:
+            os.close(out_fd)
+            conn.send(json.dumps({'error': str(e)}).encode())
+            return
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            inherited = [listener.fileno(), wake_r, wake_w] + \
+                [key.fileobj.fileno() for key in sel.get_map().values() if isinstance(key.fileobj, socket.socket)]
+            run_child(target, argv, request.get('cwd') or os.getcwd(),
+                      request.get('env') or dict(os.environ), out_fd, inherited)
+        os.close(out_fd)
+        children[pid] = conn
+        conn.send(json.dumps({'pid': pid, 'reloaded': reloaded}).encode())
+        print(f"forked {' '.join(request['cmd'])} as {pid}"
+              + (f" (reloaded {', '.join(reloaded)})" if reloaded else ''), flush=True)
+
+    try:
+        while not stopping:
+            for key, _ in sel.select():
+                if key.fileobj is listener:
+                    conn, _ = listener.accept()
+                    sel.register(conn, selectors.EVENT_READ)
+                elif key.fileobj == wake_r:
+                    try:
+                        os.read(wake_r, 4096)
+                    except BlockingIOError:
+                        pass
+                    reap()
+                else:
+                    spawn(key.fileobj)
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+# ---------------------------------------------------------------------------
+# 进程管理器一侧
+# ---------------------------------------------------------------------------
+
+class ZygoteError(Exception):
+    """zygote 不可用或无法派生该服务"""
+
+
+class ZygoteProcess:
+    """zygote 派生的服务进程，提供进程管理器用到的 asyncio.subprocess.Process 接口"""
+
+    def __init__(self, pid: int, sock: socket.socket, stdout: asyncio.StreamReader):
+        self.pid = pid
+        self.stdout = stdout
+        self.returncode: Optional[int] = None
+        self._exited = asyncio.Event()
+        self._watch = asyncio.create_task(self._watch_exit(sock))
+
+    async def _watch_exit(self, sock: socket.socket):
+        try:
+            data = await asyncio.get_running_loop().sock_recv(sock, MAX_MESSAGE)
+        except OSError:
+            data = b''
+        finally:
+            sock.close()
+        if data:
+            self.returncode = json.loads(data)['exit']
+        else:
+            # zygote 已退出，子进程被 init 接管，只能轮询是否存活，退出码未知
+            while process_alive(self.pid):
+                await asyncio.sleep(ORPHAN_POLL)
+            self.returncode = 1
+        self._exited.set()
+
+    async def wait(self) -> int:
+        await self._exited.wait()
+        return self.returncode
+
+
+class Zygote:
+    """启动 zygote 进程并通过它派生服务"""
+
+    def __init__(self, socket_path: Optional[str] = None, preload: Optional[List[str]] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.preload = preload or preload_packages()
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.ready_after: Optional[float] = None
+
+    async def start(self, cwd: str) -> asyncio.subprocess.Process:
+        """启动 zygote 进程（输出由调用方读取）"""
+        self.proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), '--socket', self.socket_path,
+            '--preload', ','.join(self.preload),
+            cwd=cwd, start_new_session=True,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        return self.proc
+
+    async def wait_ready(self, timeout: float):
+        """等待 zygote 完成预导入（socket 可连接）"""
+        started = time.monotonic()
+        deadline = started + timeout
+        for delay in backoff():
+            if self.proc.returncode is not None:
+                raise ZygoteError(f"zygote exited with code {self.proc.returncode}")
+            if os.path.exists(self.socket_path) and self._connectable():
+                self.ready_after = time.monotonic() - started
+                return
+            if time.monotonic() + delay > deadline:
+                raise ZygoteError("zygote did not finish preloading before timeout")
+            await asyncio.sleep(delay)
+
+    def _connectable(self) -> bool:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET) as sock:
+            try:
+                sock.connect(self.socket_path)
+                return True
+            except OSError:
+                return False
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def spawn(self, cmd: List[str], cwd: str, limit: int = 2 ** 16) -> Tuple[ZygoteProcess, List[str]]:
+        """派生一个服务进程，返回 (进程, 本次重新导入的预导入包)"""
+        if not self.running:
+            raise ZygoteError("zygote is not running")
+        loop = asyncio.get_running_loop()
+        out_r, out_w = os.pipe()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            sock.connect(self.socket_path)
+            request = json.dumps({'cmd': cmd, 'cwd': cwd, 'env': dict(os.environ)}).encode()
+            socket.send_fds(sock, [request], [out_w])
+            sock.setblocking(False)
+            reply = json.loads(await loop.sock_recv(sock, MAX_MESSAGE) or b'{"error": "zygote closed the connection"}')
+        except (OSError, ValueError) as e:
+            sock.close()
+            os.close(out_r)
+            raise ZygoteError(str(e)) from e
+        finally:
+            os.close(out_w)
+        if 'error' in reply:
+            sock.close()
+            os.close(out_r)
+            raise ZygoteError(reply['error'])
+
+        reader = asyncio.StreamReader(limit=limit)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(out_r, 'rb', 0))
+        return ZygoteProcess(reply['pid'], sock, reader), reply.get('reloaded', [])
+
+    async def stop(self, timeout: float = 5.0):
+        if not self.running:
+            return
+        self.proc.terminate()
+        try:
+            await asyncio.wait_for(self.proc.wait(), timeout)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='OVOS 服务预导入进程')
+    parser.add_argument('--socket', default=None, help='监听的 Unix socket 路径')
+    parser.add_argument('--preload', help=f'预导入的包，逗号分隔 (默认: ${ENV_PRELOAD} 或 {",".join(DEFAULT_PRELOAD)})')
+    args = parser.parse_args(argv)
+
+    packages = [pkg for pkg in args.preload.split(',') if pkg] if args.preload else preload_packages()
+    preloader = Preloader(packages)
+    start = time.monotonic()
+    preloader.load()
+    print(f"preload finished in {time.monotonic() - start:.2f}s", flush=True)
+    serve(args.socket or default_socket_path(), preloader)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,8 @@
 """
 clean_constrains.py
 
-Scan the engine tree and remove constraints.txt files created by gen_constraints.py.
+Scan the engine tree and remove constraints.txt files created by
+rewrite_requirements.py constraints-only (gen_constraints.py).
 
 Usage:
   python3 clean_constrains.py            # interactive confirmation
@@ -15,7 +16,10 @@ import os
 import sys
 import argparse
 
-# Keep default in sync with gen_constraints.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "engine"))
+from package_index import load_index  # noqa: E402
+
+# Default engine checkout on the device
 ENGINE_ROOT = "/home/pi/dev/norapy-dev/engine"
 
 
@@ -25,10 +29,13 @@ def find_constraints(root: str):
     root = os.path.abspath(root)
     if not os.path.isdir(root):
         return matches
-    for dirpath, dirnames, files in os.walk(root):
-        # Only consider directories that look like package roots
-        if "constraints.txt" in files and ("setup.py" in files or "pyproject.toml" in files):
-            matches.append(os.path.join(dirpath, "constraints.txt"))
+    # Package roots come from the shared package index instead of a full tree walk
+    index = load_index(root)
+    print("Package index:", index.summary())
+    for entry in index:
+        path = os.path.join(str(index.abspath(entry)), "constraints.txt")
+        if os.path.isfile(path):
+            matches.append(path)
     return matches
 
 
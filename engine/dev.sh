@@ -2,7 +2,14 @@
 # Enhanced installer with reporting, retries and basic operations
 set -u
 
-ACTION=${1:-install}   # install | reinstall | status
+ACTION=${1:-install}   # install | reinstall | status | changed | batch
+
+# changed: only reinstall packages whose metadata changed since the last install
+# (and their dependents), driven by install-dev-full.py's install state
+if [ "$ACTION" = "changed" ]; then
+  exec python3 "$(dirname "$0")/install-dev-full.py" --changed-only "${@:2}"
+fi
+
 DRY_RUN=0
 if [ "${2:-}" = "--dry-run" ]; then
   DRY_RUN=1
@@ -18,6 +25,10 @@ LOG_SUCCESS="$LOG_DIR/success.log"
 LOG_FAIL="$LOG_DIR/fail.log"
 LOG_SKIPPED="$LOG_DIR/skipped.log"
 
+# all pip calls of this run share one session in the install trace
+# (.install_logs/install-trace.jsonl, see install_trace.py)
+export OVOS_INSTALL_SESSION="${OVOS_INSTALL_SESSION:-$(date +%Y%m%dT%H%M%S)-$$}"
+
 # rotate/clear previous logs for a fresh run
 : > "$LOG_ALL"
 : > "$LOG_SUCCESS"
@@ -42,17 +53,41 @@ PY
 
 SITE_PACKAGES=$(get_site_packages)
 
+# pruned walk: skips venv, .git, build artifacts and stops at package roots
 packages=()
 while IFS= read -r setupfile; do
   packages+=("$(dirname "$setupfile")")
-done < <(find . -type f -name setup.py)
+done < <(python3 "$(dirname "$0")/tree_scan.py" . --name setup.py --stop-at-match --stats)
 
 total=${#packages[@]}
 echo "Found $total packages to process"
 
+# batch: hand every package to a single pip invocation instead of one per package
+if [ "$ACTION" = "batch" ]; then
+  if [ $DRY_RUN -eq 1 ]; then
+    echo "DRY RUN: would batch install $total packages" | tee -a "$LOG_ALL" "$LOG_SKIPPED"
+    exit 0
+  fi
+  start=$(date +%s)
+  python3 "$(dirname "$0")/pip_batch.py" "${packages[@]}" 2>&1 | tee -a "$LOG_ALL"
+  rc=${PIPESTATUS[0]}
+  echo "Batch install finished in $(( $(date +%s) - start ))s (exit $rc)" | tee -a "$LOG_ALL"
+  echo "Logs written to $LOG_DIR"
+  exit $rc
+fi
+
 success=0
 failures=()
 
+# Prefer the shared wheelhouse ($OVOS_WHEELHOUSE or engine/.wheelhouse) for
+# third-party dependencies; wheelhouse.py prints the pip args and hit/miss counts
+wheelhouse_args=()
+if [ $DRY_RUN -eq 0 ] && [ "$ACTION" != "status" ]; then
+  while IFS= read -r arg; do
+    wheelhouse_args+=("$arg")
+  done < <(python3 "$(dirname "$0")/wheelhouse.py" pip-args "${packages[@]}")
+fi
+
 for pkgdir in "${packages[@]}"; do
   pkgdir=$(realpath "$pkgdir")
   name=$(basename "$pkgdir")
@@ -76,7 +111,10 @@ for pkgdir in "${packages[@]}"; do
   attempt=$((attempt+1))
   echo "Attempt #$attempt for $name" | tee -a "$LOG_ALL"
     if [ "$ACTION" = "install" ] || [ "$ACTION" = "reinstall" ]; then
-      cmd=(pip install -e "$pkgdir")
+      # timed through install_trace.py: duration, pip phases and exit status as JSON lines
+      cmd=(python3 "$(dirname "$0")/install_trace.py" run --installer dev.sh
+           --package "$name" --path "$pkgdir" --
+           pip install -e "$pkgdir" "${wheelhouse_args[@]}")
       if [ -n "$constraints_arg" ]; then
         cmd+=(--constraint "$pkgdir/constraints.txt")
       fi
@@ -3,23 +3,41 @@
 OVOS 完整依赖解析和安装系统
 
 这个脚本完成以下工作：
-1. 自动扫描所有 setup.py 文件
-2. 使用 AST 解析提取 install_requires 和 extras_require
+1. 自动扫描所有 setup.py / pyproject.toml 文件
+2. 使用 AST 解析 setup.py 的 install_requires 和 extras_require，
+   读取 pyproject.toml 的 [project] dependencies 和 optional-dependencies
 3. 构建完整的依赖图
 4. 按正确顺序安装所有本地包
 5. 自动处理本地与 PyPI 包的优先级
 
+check 命令不安装任何东西，只检查依赖图：所有循环依赖、本地版本与约束的冲突、孤立包。
+lock 命令解析一次依赖并写出带哈希的锁文件，sync 命令按锁文件安装（见 lockfile.py）。
+
 这是业界标准的 monorepo 管理方式
 """
 
-import subprocess
 import sys
 import os
 import json
+import time
+import argparse
 import ast
+import hashlib
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from install_trace import InstallTracer, get_trace_file, load_trace, print_report
+from lockfile import DEFAULT_LOCK_FILE, LockError, read_lock, resolve, sync, write_lock
+from package_index import INDEX_FILE, PackageIndex
+from pip_batch import BatchInstaller
+from plugin_manifest import update_after_install
+from requirements_parser import parse_requirement
+from wheelhouse import (Wheelhouse, collect_requirements, find_wheelhouse,
+                        get_wheelhouse_dir, normalize_name)
 
 # Colors
 GREEN = '\033[0;32m'
@@ -41,126 +59,92 @@ def log_warn(msg):
     print(f"{YELLOW}⚠{NC} {msg}")
 
 class DependencyAnalyzer:
-    """使用 AST 分析 setup.py 中的依赖"""
+    """基于包索引中的 setup.py / pyproject.toml 元数据分析本地包之间的依赖"""
     
-    def __init__(self, engine_dir: Path):
+    def __init__(self, engine_dir: Path, use_cache: bool = True):
         self.engine_dir = engine_dir
         self.packages: Dict[str, Dict] = {}  # {package_name: {path, deps}}
         self.local_packages: Set[str] = set()
+        self.use_cache = use_cache
+        self.index: Optional[PackageIndex] = None
         
     def scan_all_packages(self):
-        """扫描所有 setup.py 文件"""
-        log_info("扫描所有 setup.py 文件...")
+        """从包索引加载所有 setup.py / pyproject.toml 的解析结果"""
+        log_info("扫描所有 setup.py / pyproject.toml 文件...")
         
-        setup_files = list(self.engine_dir.rglob('setup.py'))
-        setup_files = [f for f in setup_files 
-                      if 'test' not in str(f) and 'venv' not in str(f)]
+        self.index = PackageIndex.load(self.engine_dir, use_cache=self.use_cache)
+        entries = [entry for entry in self.index if entry['metadata']]
         
-        log_success(f"找到 {len(setup_files)} 个包")
+        log_success(f"找到 {len(entries)} 个包")
         
-        for setup_file in setup_files:
-            try:
-                self._parse_setup_py(setup_file)
-            except Exception as e:
-                log_warn(f"解析 {setup_file}: {e}")
+        for entry in entries:
+            for info in entry['metadata']:
+                self._register_package(info, self.index.abspath(entry), entry['build_requires'])
+        
+        log_info(f"包索引: {self.index.summary()}")
+    
+    def _register_package(self, info: Dict, pkg_path: Path, build_requires: List[str]):
+        """将解析结果登记到包表中"""
+        pkg_name = info['name']
+        self.packages[pkg_name] = {
+            'path': pkg_path,
+            'version': info['version'],
+            'dependencies': list(info['dependencies']),
+            # -e / 注释形式引用的本地包路径（相对 engine）
+            'local_paths': list(info.get('local_paths', ())),
+            # 隔离构建时需要的 [build-system].requires
+            'build_requires': list(build_requires),
+        }
+        self.local_packages.add(pkg_name)
+        print(f"  └─ {pkg_name}: {len(info['dependencies'])} 依赖")
     
-    def _parse_setup_py(self, setup_file: Path):
-        """使用 AST 解析单个 setup.py"""
-        with open(setup_file) as f:
-            content = f.read()
+    def clear_cache(self):
+        """删除持久化的包索引"""
+        index = PackageIndex(self.engine_dir)
+        if index.index_file.exists():
+            index.clear()
+            log_success(f"已清除包索引: {index.index_file}")
+    
+    def build_graph(self) -> Dict[str, Set[str]]:
+        """
+        构建本地依赖图 {包名: 其依赖的本地包集合}
+
+        依赖按 PEP 508 解析，包名按 PEP 503 规范化后匹配本地包；
+        环境标记不适用于当前解释器的依赖不计入。requirements 文件中以
+        -e 等形式引用的本地路径按目录匹配到对应的包。
+        """
+        graph = defaultdict(set)
+        by_key = {normalize_name(name): name for name in self.packages}
+        by_path = {str(info['path'].resolve()): name for name, info in self.packages.items()}
         
-        try:
-            tree = ast.parse(content)
-        except SyntaxError:
-            return
+        for pkg_name, info in self.packages.items():
+            deps = set()
+            for dep in info['dependencies']:
+                req = parse_requirement(dep)
+                if req is None or not req.applies():
+                    continue
+                if req.key in by_key:
+                    deps.add(by_key[req.key])
+            for rel in info['local_paths']:
+                target = by_path.get(str((self.engine_dir / rel).resolve()))
+                if target:
+                    deps.add(target)
+            
+            # 忽略自依赖
+            deps.discard(pkg_name)
+            if deps:
+                graph[pkg_name] = deps
         
-        # 查找 setup() 调用
-        for node in ast.walk(tree):
-            if isinstance(node, ast.Call):
-                if isinstance(node.func, ast.Name) and node.func.id == 'setup':
-                    self._extract_setup_info(node, setup_file)
-    
-    def _extract_setup_info(self, setup_call: ast.Call, setup_file: Path):
-        """从 setup() 调用中提取信息"""
-        pkg_name = None
-        version = None
-        dependencies = []
-        
-        for keyword in setup_call.keywords:
-            if keyword.arg == 'name':
-                pkg_name = self._get_string_value(keyword.value)
-            elif keyword.arg == 'version':
-                version = self._get_string_value(keyword.value)
-            elif keyword.arg == 'install_requires':
-                dependencies.extend(self._extract_requirements_list(keyword.value))
-            elif keyword.arg == 'extras_require':
-                # 处理 extras_require 中的所有依赖
-                extras_deps = self._extract_extras_requires(keyword.value)
-                dependencies.extend(extras_deps)
-        
-        if pkg_name:
-            self.packages[pkg_name] = {
-                'path': setup_file.parent,
-                'version': version,
-                'dependencies': dependencies
-            }
-            self.local_packages.add(pkg_name)
-            print(f"  └─ {pkg_name}: {len(dependencies)} 依赖")
-    
-    def _get_string_value(self, node):
-        """提取字符串字面值"""
-        if isinstance(node, ast.Constant):
-            return str(node.value)
-        elif isinstance(node, ast.Str):
-            return node.s
-        return None
-    
-    def _extract_requirements_list(self, node):
-        """提取 install_requires 列表"""
-        requirements = []
-        
-        if isinstance(node, ast.List):
-            for elt in node.elts:
-                if isinstance(elt, ast.Constant):
-                    req = str(elt.value)
-                    if not req.startswith('-e'):  # 跳过 -e 行
-                        requirements.append(req)
-        elif isinstance(node, ast.Call):
-            # 处理函数调用，如 required('requirements.txt')
-            # 这需要实际读取文件
-            pass
-        
-        return requirements
-    
-    def _extract_extras_requires(self, node):
-        """提取 extras_require 中的所有依赖"""
-        requirements = []
-        
-        if isinstance(node, ast.Dict):
-            for key, value in zip(node.keys, node.values):
-                reqs = self._extract_requirements_list(value)
-                requirements.extend(reqs)
-        
-        return requirements
+        return graph
     
     def resolve_dependency_order(self) -> List[str]:
         """拓扑排序，确定安装顺序"""
         log_info("解析依赖图...")
         
-        # 构建依赖关系
-        graph = defaultdict(set)
+        graph = self.build_graph()
         all_packages = set(self.packages.keys())
         
-        for pkg_name, info in self.packages.items():
-            for dep in info['dependencies']:
-                # 提取包名（移除版本规范）
-                dep_name = self._parse_package_name(dep)
-                
-                # 如果是本地包，添加到图中
-                if dep_name in all_packages:
-                    graph[pkg_name].add(dep_name)
-        
-        # 拓扑排序
+        # 拓扑排序（后序遍历，依赖先于使用者加入 order）
         visited = set()
         visiting = set()
         order = []
@@ -174,51 +158,317 @@ class DependencyAnalyzer:
             visiting.add(node)
             
             if node in graph:
-                for dep in graph[node]:
+                for dep in sorted(graph[node]):
                     visit(dep)
             
             visiting.remove(node)
             visited.add(node)
             order.append(node)
         
-        for pkg in all_packages:
+        for pkg in sorted(all_packages):
             visit(pkg)
         
-        # 反向排序（依赖在前）
-        order.reverse()
-        
         return order
     
-    def _parse_package_name(self, requirement: str) -> str:
-        """从 requirement 字符串中提取包名"""
-        # 移除版本规范符号
-        for char in ['<', '>', '=', '!', '[', ' ', '~']:
-            if char in requirement:
-                requirement = requirement.split(char)[0]
+    def resolve_dependency_levels(self) -> List[List[str]]:
+        """
+        将依赖图按层（wave）拆分
+
+        第 N 层中的包只依赖前 N-1 层中的包，因此同一层内的包可以并发安装。
+        """
+        log_info("按层拆分依赖图...")
+        
+        graph = self.build_graph()
+        remaining = {pkg: set(graph.get(pkg, ())) for pkg in self.packages}
+        levels = []
+        
+        while remaining:
+            ready = sorted(pkg for pkg, deps in remaining.items() if not deps)
+            if not ready:
+                raise ValueError(f"循环依赖检测到: {', '.join(sorted(remaining))}")
+            
+            levels.append(ready)
+            for pkg in ready:
+                del remaining[pkg]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        
+        return levels
+    
+    def find_cycles(self) -> List[List[str]]:
+        """
+        所有循环依赖：依赖图中包含多个包的强连通分量（Tarjan 算法，非递归）
+
+        与 resolve_dependency_order 不同，不在第一个循环处停止；每个分量内按包名排序。
+        """
+        graph = self.build_graph()
+        index: Dict[str, int] = {}
+        low: Dict[str, int] = {}
+        stack: List[str] = []
+        on_stack: Set[str] = set()
+        sccs = []
+        
+        def enter(node):
+            index[node] = low[node] = len(index)
+            stack.append(node)
+            on_stack.add(node)
+            return node, iter(sorted(graph.get(node, ())))
+        
+        for root in sorted(self.packages):
+            if root in index:
+                continue
+            work = [enter(root)]
+            while work:
+                node, deps = work[-1]
+                for dep in deps:
+                    if dep not in index:
+                        work.append(enter(dep))
+                        break
+                    if dep in on_stack:
+                        low[node] = min(low[node], index[dep])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        scc = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            scc.append(member)
+                            if member == node:
+                                break
+                        if len(scc) > 1:
+                            sccs.append(sorted(scc))
+        return sorted(sccs)
+    
+    def find_version_conflicts(self) -> Tuple[List[Tuple[str, str, str, str]], List[Tuple[str, str]]]:
+        """
+        对比每个本地包声明的版本与其他本地包对它的版本约束
+
+        返回 (冲突, 无法判断)：冲突为 (使用者, 依赖字符串, 本地包, 本地版本)；
+        本地包没有静态可解析的版本或约束无法解析时记入无法判断 (使用者, 依赖字符串)。
+        """
+        by_key = {normalize_name(name): name for name in self.packages}
+        conflicts = []
+        unknown = []
+        for pkg_name, info in sorted(self.packages.items()):
+            for dep in info['dependencies']:
+                req = parse_requirement(dep)
+                if req is None or not req.applies() or req.key not in by_key or req.url:
+                    continue
+                target = by_key[req.key]
+                if target == pkg_name:
+                    continue
+                version = self.packages[target]['version']
+                ok = req.contains(version) if version else None
+                if ok is None:
+                    unknown.append((pkg_name, dep))
+                elif not ok:
+                    conflicts.append((pkg_name, dep, target, version))
+        return conflicts, unknown
+    
+    def get_dependencies(self, pkg_names: Set[str]) -> Set[str]:
+        """pkg_names 及其直接或间接依赖的所有本地包"""
+        graph = self.build_graph()
+        reached = set()
+        stack = [name for name in pkg_names if name in self.packages]
+        while stack:
+            pkg_name = stack.pop()
+            if pkg_name not in reached:
+                reached.add(pkg_name)
+                stack.extend(graph.get(pkg_name, ()))
+        return reached
+    
+    def find_unreachable(self, roots: Set[str]) -> Set[str]:
+        """不在 roots 依赖闭包中的本地包"""
+        return set(self.packages) - self.get_dependencies(roots)
+    
+    def get_dependents(self, pkg_names: Set[str]) -> Set[str]:
+        """返回直接或间接依赖 pkg_names 中任意包的所有本地包（不含 pkg_names 本身）"""
+        reverse = defaultdict(set)
+        for pkg_name, deps in self.build_graph().items():
+            for dep in deps:
+                reverse[dep].add(pkg_name)
         
-        return requirement.strip()
+        result = set()
+        stack = list(pkg_names)
+        while stack:
+            for dependent in reverse.get(stack.pop(), ()):
+                if dependent not in result and dependent not in pkg_names:
+                    result.add(dependent)
+                    stack.append(dependent)
+        return result
     
-    def get_install_order(self) -> List[Tuple[str, Path]]:
-        """获取安装顺序"""
+    def get_install_order(self, only: Optional[Set[str]] = None) -> List[Tuple[str, Path]]:
+        """获取安装顺序，only 不为 None 时只保留其中的包"""
         order = self.resolve_dependency_order()
         result = []
         
         for pkg_name in order:
-            if pkg_name in self.packages:
+            if pkg_name in self.packages and (only is None or pkg_name in only):
                 result.append((pkg_name, self.packages[pkg_name]['path']))
         
         return result
+    
+    def get_install_levels(self, only: Optional[Set[str]] = None) -> List[List[Tuple[str, Path]]]:
+        """获取分层安装顺序，每层内的包互不依赖；only 不为 None 时只保留其中的包"""
+        levels = []
+        for level in self.resolve_dependency_levels():
+            selected = [(pkg_name, self.packages[pkg_name]['path'])
+                        for pkg_name in level if only is None or pkg_name in only]
+            if selected:
+                levels.append(selected)
+        return levels
+
+
+# 安装状态文件（相对于 engine 目录）
+STATE_FILE = '.install_state.json'
+# 决定是否需要重新安装的元数据文件；纯源码修改在 editable 安装下无需重装
+METADATA_FILES = ['setup.py', 'setup.cfg', 'pyproject.toml', 'requirements.txt', 'constraints.txt']
+METADATA_DIRS = ['requirements']
+
+
+def read_git_head(path: Path) -> Optional[str]:
+    """直接读取 .git 目录获取 HEAD 的 SHA，避免为每个子模块启动 git 进程"""
+    git_path = path / '.git'
+    try:
+        if git_path.is_file():
+            # 子模块的 .git 是指向真实 gitdir 的文件
+            content = git_path.read_text().strip()
+            if not content.startswith('gitdir:'):
+                return None
+            git_dir = (path / content[len('gitdir:'):].strip()).resolve()
+        elif git_path.is_dir():
+            git_dir = git_path
+        else:
+            return None
+        
+        head = (git_dir / 'HEAD').read_text().strip()
+        if not head.startswith('ref:'):
+            return head  # detached HEAD
+        
+        ref = head[len('ref:'):].strip()
+        ref_file = git_dir / ref
+        if ref_file.exists():
+            return ref_file.read_text().strip()
+        
+        packed = git_dir / 'packed-refs'
+        if packed.exists():
+            for line in packed.read_text().splitlines():
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except OSError:
+        pass
+    return None
+
+
+class InstallState:
+    """记录每个包安装时的 git HEAD 与元数据哈希，用于只重装发生变化的包"""
+    
+    def __init__(self, engine_dir: Path):
+        self.state_file = engine_dir / STATE_FILE
+        self.packages: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """读取状态文件；虚拟环境不同时视为从未安装"""
+        if not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            log_warn(f"忽略损坏的安装状态 {self.state_file}: {e}")
+            return
+        if data.get('prefix') != sys.prefix:
+            log_warn(f"安装状态属于其他虚拟环境 ({data.get('prefix')})，将全部重新安装")
+            return
+        self.packages = data.get('packages', {})
+    
+    def save(self):
+        """原子写入状态文件"""
+        tmp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        with self._lock:
+            data = {'prefix': sys.prefix, 'packages': self.packages}
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            log_warn(f"无法写入安装状态 {self.state_file}: {e}")
+    
+    @staticmethod
+    def metadata_hash(pkg_path: Path) -> str:
+        """计算包元数据文件（setup.py、requirements 等）内容的哈希"""
+        files = [pkg_path / name for name in METADATA_FILES]
+        for dirname in METADATA_DIRS:
+            req_dir = pkg_path / dirname
+            if req_dir.is_dir():
+                files.extend(sorted(req_dir.glob('*.txt')))
+        
+        digest = hashlib.sha256()
+        for f in files:
+            if f.is_file():
+                digest.update(str(f.relative_to(pkg_path)).encode())
+                digest.update(b'\0')
+                digest.update(f.read_bytes())
+                digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def record(self, pkg_name: str, pkg_path: Path):
+        """记录一次成功的安装"""
+        entry = {
+            'path': str(pkg_path),
+            'head': read_git_head(pkg_path),
+            'metadata': self.metadata_hash(pkg_path),
+            'installed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with self._lock:
+            self.packages[pkg_name] = entry
+    
+    def changed_packages(self, packages: Dict[str, Dict]) -> Tuple[Set[str], Set[str]]:
+        """
+        比较当前包与记录的状态
+
+        返回 (需要重装的包, 仅 HEAD 变化而元数据未变的包)。
+        后者是 editable 安装下的纯源码修改，无需重装。
+        """
+        changed = set()
+        moved = set()
+        for pkg_name, info in packages.items():
+            entry = self.packages.get(pkg_name)
+            pkg_path = info['path']
+            if (entry is None or entry['path'] != str(pkg_path)
+                    or entry['metadata'] != self.metadata_hash(pkg_path)):
+                changed.add(pkg_name)
+            elif entry['head'] != read_git_head(pkg_path):
+                moved.add(pkg_name)
+        return changed, moved
 
 
 class InstallManager:
     """管理包的安装"""
     
-    def __init__(self, engine_dir: Path):
+    def __init__(self, engine_dir: Path, state: Optional[InstallState] = None,
+                 pip_args: Optional[List[str]] = None, tracer: Optional[InstallTracer] = None):
         self.engine_dir = engine_dir
         self.failed = []
+        self.state = state
+        self.pip_args = list(pip_args or [])  # 例如 wheelhouse 的 --find-links 参数
+        self.tracer = tracer or InstallTracer.from_env('install-dev-full')
+    
+    def _on_installed(self, pkg_name: str, pkg_path: Path):
+        """记录安装成功的包"""
+        if self.state is not None:
+            self.state.record(pkg_name, pkg_path)
     
-    def install_package(self, pkg_name: str, pkg_path: Path, use_editable: bool = True) -> bool:
-        """安装单个包"""
+    def install_package(self, pkg_name: str, pkg_path: Path, use_editable: bool = True,
+                        no_deps: bool = False) -> bool:
+        """安装单个包；no_deps 为 True 时不解析依赖（依赖已预先装好）"""
         try:
             if use_editable:
                 cmd = [
@@ -231,17 +481,16 @@ class InstallManager:
                     sys.executable, '-m', 'pip', 'install',
                     str(pkg_path)
                 ]
+            if no_deps:
+                cmd.append('--no-deps')
+            cmd += self.pip_args
             
-            # 运行安装
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                cwd=self.engine_dir
-            )
+            # 运行安装（记录耗时和 pip 各阶段）
+            result = self.tracer.run(cmd, pkg_name, path=pkg_path, cwd=self.engine_dir)
             
             if result.returncode == 0:
                 log_success(f"已安装: {pkg_name}")
+                self._on_installed(pkg_name, pkg_path)
                 return True
             else:
                 log_error(f"安装失败: {pkg_name}")
@@ -249,12 +498,13 @@ class InstallManager:
                     # 尝试不用 --no-build-isolation 再试一次
                     log_warn(f"  重试不使用 --no-build-isolation...")
                     cmd.remove('--no-build-isolation')
-                    result = subprocess.run(cmd, capture_output=True, text=True)
+                    result = self.tracer.run(cmd, pkg_name, path=pkg_path)
                     if result.returncode == 0:
                         log_success(f"已安装: {pkg_name} (不使用 --no-build-isolation)")
+                        self._on_installed(pkg_name, pkg_path)
                         return True
                 
-                self.failed.append((pkg_name, result.stderr))
+                self.failed.append((pkg_name, result.stdout))
                 return False
         
         except Exception as e:
@@ -268,10 +518,110 @@ class InstallManager:
         print(f"{BLUE}安装依赖（共 {len(install_order)} 个包）{NC}")
         print(f"{BLUE}{'='*70}{NC}\n")
         
+        start = time.monotonic()
         for i, (pkg_name, pkg_path) in enumerate(install_order, 1):
             print(f"[{i}/{len(install_order)}] 安装 {pkg_name}...")
             self.install_package(pkg_name, pkg_path)
             print()
+        
+        log_info(f"串行安装总耗时 {time.monotonic() - start:.1f}s")
+    
+    def install_batch(self, install_order: List[Tuple[str, Path]]):
+        """用尽量少的 pip 调用一次性安装所有包，失败按包归因"""
+        print(f"\n{BLUE}{'='*70}{NC}")
+        print(f"{BLUE}批量安装依赖（共 {len(install_order)} 个包）{NC}")
+        print(f"{BLUE}{'='*70}{NC}\n")
+        
+        constraints = [pkg_path / 'constraints.txt' for _, pkg_path in install_order
+                       if (pkg_path / 'constraints.txt').exists()]
+        result = BatchInstaller(constraints, self.pip_args, cwd=self.engine_dir,
+                                tracer=self.tracer).install(install_order)
+        
+        paths = dict(install_order)
+        for pkg_name in result.installed:
+            self._on_installed(pkg_name, paths[pkg_name])
+        self.failed.extend(result.failed)
+    
+    def install_requirements(self, requirements: List[str]) -> bool:
+        """用一次 pip 调用安装合并后的第三方依赖"""
+        if not requirements:
+            return True
+        log_info(f"安装 {len(requirements)} 个第三方依赖...")
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='third-party-', delete=False) as f:
+            f.write(''.join(req + '\n' for req in requirements))
+            req_file = f.name
+        try:
+            cmd = [sys.executable, '-m', 'pip', 'install', '-r', req_file] + self.pip_args
+            result = self.tracer.run(cmd, 'third-party', cwd=self.engine_dir)
+        finally:
+            os.unlink(req_file)
+        
+        if result.returncode != 0:
+            log_error("第三方依赖安装失败")
+            self.failed.append(('第三方依赖', result.stdout))
+            return False
+        log_success("第三方依赖已安装")
+        return True
+    
+    def install_levels(self, levels: List[List[Tuple[str, Path]]], jobs: int,
+                       requirements: List[str], graph: Dict[str, Set[str]]):
+        """
+        按层并发安装
+
+        先用一次 pip 调用装好所有第三方依赖（requirements），再逐层安装本地包：
+        同一层内的包通过大小为 jobs 的线程池并发执行 pip install --no-deps，
+        并发的 pip 不做依赖解析，不会同时改写 venv 中的同一个第三方包。
+        上一层全部结束后才开始下一层；graph 中（直接或间接）依赖了失败包的包不再安装，
+        在最终报告中列为跳过。
+        """
+        total = sum(len(level) for level in levels)
+        print(f"\n{BLUE}{'='*70}{NC}")
+        print(f"{BLUE}并行安装依赖（共 {total} 个包，{len(levels)} 层，{jobs} 个并发）{NC}")
+        print(f"{BLUE}{'='*70}{NC}\n")
+        
+        start = time.monotonic()
+        if not self.install_requirements(requirements):
+            log_error("第三方依赖未装好，不再安装本地包")
+            return
+        print()
+        
+        level_times = []
+        unavailable = set()  # 安装失败或被跳过的包
+        
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for i, level in enumerate(levels, 1):
+                runnable = []
+                for pkg_name, pkg_path in level:
+                    missing = sorted(graph.get(pkg_name, set()) & unavailable)
+                    if missing:
+                        log_warn(f"跳过 {pkg_name}: 依赖的本地包未安装 ({', '.join(missing)})")
+                        self.failed.append((pkg_name, f"跳过: 依赖的本地包未安装 ({', '.join(missing)})"))
+                        unavailable.add(pkg_name)
+                    else:
+                        runnable.append((pkg_name, pkg_path))
+                if not runnable:
+                    print()
+                    continue
+                
+                names = ', '.join(pkg_name for pkg_name, _ in runnable)
+                print(f"[层 {i}/{len(levels)}] {len(runnable)} 个包: {names}")
+                
+                level_start = time.monotonic()
+                results = list(pool.map(
+                    lambda item: self.install_package(*item, no_deps=True), runnable))
+                elapsed = time.monotonic() - level_start
+                unavailable.update(pkg_name for (pkg_name, _), ok in zip(runnable, results) if not ok)
+                
+                level_times.append((i, len(runnable), elapsed))
+                log_info(f"层 {i} 完成，耗时 {elapsed:.1f}s")
+                print()
+        
+        total_elapsed = time.monotonic() - start
+        
+        print(f"{BLUE}每层耗时:{NC}")
+        for i, count, elapsed in level_times:
+            print(f"  层 {i:>2}: {count:>3} 个包  {elapsed:7.1f}s")
+        print(f"  总计: {total_elapsed:.1f}s")
     
     def report(self):
         """输出报告"""
@@ -298,8 +648,275 @@ class InstallManager:
             return True
 
 
-def main():
+def collect_third_party(analyzer: DependencyAnalyzer, pkg_names: Optional[Set[str]] = None,
+                        build: bool = False) -> List[str]:
+    """
+    收集本地包（默认全部）的第三方依赖
+
+    build 为 True 时同时包括这些包的构建依赖：离线（--no-index）安装时，
+    隔离构建环境也只能从 wheelhouse 安装 setuptools、wheel 等。
+    """
+    if pkg_names is None:
+        pkg_names = set(analyzer.packages)
+    local_names = {normalize_name(name) for name in analyzer.packages}
+    pkg_dirs = [analyzer.packages[name]['path'] for name in sorted(pkg_names)]
+    extra = [dep for name in pkg_names for dep in analyzer.packages[name]['dependencies']]
+    if build:
+        extra += [req for name in pkg_names for req in analyzer.packages[name]['build_requires']]
+    return collect_requirements(pkg_dirs, local_names, extra)
+
+
+def build_wheelhouse(analyzer: DependencyAnalyzer, wheelhouse_dir: Path) -> bool:
+    """把所有本地包的第三方依赖和构建依赖下载或构建到 wheelhouse"""
+    requirements = collect_third_party(analyzer, build=True)
+    log_info(f"共 {len(requirements)} 个第三方依赖")
+    return Wheelhouse(wheelhouse_dir).build(requirements)
+
+
+def report_trace(analyzer: DependencyAnalyzer, args) -> int:
+    """输出安装追踪中最慢的安装，以及依赖图上按实际耗时加权的关键路径"""
+    trace_file = get_trace_file(args.trace)
+    if trace_file is None:
+        log_error("安装追踪已关闭（$OVOS_INSTALL_TRACE）")
+        return 1
+    records = load_trace(trace_file, args.session)
+    if not records:
+        log_error(f"没有找到安装追踪记录: {trace_file}")
+        return 1
+    
+    # 追踪中的包名可能是目录名（dev.sh）或声明的包名，按路径和规范化名称映射到依赖图
+    by_path = {str(info['path'].resolve()): name for name, info in analyzer.packages.items()}
+    by_key = {normalize_name(name): name for name in analyzer.packages}
+    
+    def resolve(record):
+        if record.get('path') and record['path'] in by_path:
+            return by_path[record['path']]
+        return by_key.get(normalize_name(record['package']))
+    
+    print_report(records, args.top, analyzer.build_graph(), resolve)
+    return 0
+
+
+def load_workspace_paths(engine_dir: Path, names: Optional[List[str]] = None) -> Optional[Set[str]]:
+    """
+    install-workspaces.py 中 WORKSPACES 列出的包路径（相对 engine），不导入安装器
+
+    names 为 None 时返回所有工作区的包；无法读取或有未知的工作区时返回 None。
+    """
+    try:
+        tree = ast.parse((engine_dir / 'install-workspaces.py').read_text())
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and any(
+                    isinstance(t, ast.Name) and t.id == 'WORKSPACES' for t in node.targets):
+                workspaces = ast.literal_eval(node.value)
+                unknown = [name for name in names or () if name not in workspaces]
+                if unknown:
+                    log_error(f"未知的工作区: {', '.join(unknown)}（可用: {', '.join(workspaces)}）")
+                    return None
+                return {pkg for name in names or workspaces for pkg in workspaces[name]['packages']}
+    except (OSError, SyntaxError, ValueError, KeyError) as e:
+        log_warn(f"无法读取 WORKSPACES: {e}")
+    return None
+
+
+def lock_dependencies(analyzer: DependencyAnalyzer, engine_dir: Path, args) -> int:
+    """解析一次选中本地包的第三方依赖，写出带哈希的锁文件（本地包为 file:// editable）"""
+    selected = None
+    if args.workspace:
+        paths = load_workspace_paths(engine_dir, args.workspace)
+        if paths is None:
+            return 1
+        roots = {name for name, info in analyzer.packages.items()
+                 if os.path.relpath(info['path'], engine_dir) in paths}
+        selected = analyzer.get_dependencies(roots)
+        log_info(f"工作区 {', '.join(args.workspace)}: {len(roots)} 个包，含本地依赖共 {len(selected)} 个")
+    
+    requirements = collect_third_party(analyzer, selected)
+    log_info(f"解析 {len(requirements)} 个第三方依赖...")
+    wheelhouse = None if args.no_wheelhouse else find_wheelhouse(args.wheelhouse)
+    pip_args = wheelhouse.pip_args(requirements) if wheelhouse is not None else []
+    try:
+        locked = resolve(requirements, pip_args)
+        install_order = analyzer.get_install_order(selected)
+    except (LockError, ValueError) as e:
+        log_error(f"无法生成锁文件: {e}")
+        return 1
+    
+    # 第三方包依赖了本地包时 pip 会从 PyPI 解析出一份，锁文件中以本地 editable 为准
+    local_keys = {normalize_name(name) for name in analyzer.packages}
+    shadowed = [pkg for pkg in locked if normalize_name(pkg.name) in local_keys]
+    if shadowed:
+        log_warn(f"以下包由本地 editable 提供，忽略 PyPI 解析结果: "
+                 f"{', '.join(f'{pkg.name}=={pkg.version}' for pkg in shadowed)}")
+    locked = [pkg for pkg in locked if pkg not in shadowed]
+    
+    lock_file = Path(args.lock)
+    write_lock(lock_file, locked, [path for _, path in install_order], engine_dir,
+               {'workspaces': ', '.join(args.workspace) if args.workspace else 'all'})
+    log_success(f"锁文件: {len(locked)} 个第三方依赖，{len(install_order)} 个本地包 -> {lock_file}")
+    return 0
+
+
+def sync_lock(analyzer: DependencyAnalyzer, engine_dir: Path, args) -> int:
+    """按锁文件原样安装并卸载多余的发行版，然后记录安装状态"""
+    lock_file = Path(args.lock)
+    if not lock_file.is_file():
+        log_error(f"锁文件不存在: {lock_file}（先运行 {Path(__file__).name} lock）")
+        return 1
+    try:
+        pinned = [f"{pkg.name}=={pkg.version}" for pkg in read_lock(lock_file).packages]
+    except (LockError, OSError) as e:
+        log_error(f"无法读取锁文件: {e}")
+        return 1
+    wheelhouse = None if args.no_wheelhouse else find_wheelhouse(args.wheelhouse)
+    pip_args = wheelhouse.pip_args(pinned) if wheelhouse is not None else []
+    
+    state = InstallState(engine_dir)
+    try:
+        ok, editables = sync(lock_file, engine_dir, pip_args, remove_extra=not args.keep_extra)
+    except (LockError, OSError) as e:
+        log_error(f"无法读取锁文件: {e}")
+        return 1
+    if ok:
+        by_path = {str(info['path'].resolve()): name for name, info in analyzer.packages.items()}
+        for path in editables:
+            name = by_path.get(str(path.resolve()))
+            if name:
+                state.record(name, path)
+        state.save()
+    update_after_install()
+    return 0 if ok else 1
+
+
+def _cycle_path(graph: Dict[str, Set[str]], members: List[str]) -> List[str]:
+    """强连通分量中经过第一个包的一条最短环路（用于展示）"""
+    start = members[0]
+    scc = set(members)
+    parents = {}
+    queue = [start]
+    for node in queue:
+        for dep in sorted(graph.get(node, ())):
+            if dep == start:
+                path = [node]
+                while path[-1] != start:
+                    path.append(parents[path[-1]])
+                return [start] + path[::-1][1:] + [start]
+            if dep in scc and dep not in parents:
+                parents[dep] = node
+                queue.append(dep)
+    return members
+
+
+def check_graph(analyzer: DependencyAnalyzer, engine_dir: Path) -> int:
+    """
+    不安装任何东西，检查依赖图的一致性：循环依赖、版本冲突、悬空的本地路径、
+    孤立包和不在任何工作区依赖闭包中的包。有循环、冲突或悬空路径时返回 1。
+    """
+    start = time.monotonic()
+    graph = analyzer.build_graph()
+    problems = 0
+    
+    cycles = analyzer.find_cycles()
+    if cycles:
+        problems += len(cycles)
+        log_error(f"循环依赖: {len(cycles)} 组")
+        for members in cycles:
+            print(f"  [{len(members)} 个包] {', '.join(members)}")
+            print(f"    例: {' -> '.join(_cycle_path(graph, members))}")
+    else:
+        log_success("没有循环依赖")
+    
+    conflicts, unknown = analyzer.find_version_conflicts()
+    if conflicts:
+        problems += len(conflicts)
+        log_error(f"版本冲突: {len(conflicts)} 处（本地版本不满足约束，pip 安装时会失败或改装 PyPI 版本）")
+        for pkg_name, dep, target, version in conflicts:
+            print(f"  {pkg_name}: {dep}  ←  本地 {target} {version}")
+    else:
+        log_success("本地包版本满足所有约束")
+    if unknown:
+        log_warn(f"{len(unknown)} 处约束无法判断（本地包版本未静态声明或约束无法解析）")
+    
+    by_path = {str(info['path'].resolve()) for info in analyzer.packages.values()}
+    dangling = [(pkg_name, rel) for pkg_name, info in sorted(analyzer.packages.items())
+                for rel in info['local_paths'] if str((engine_dir / rel).resolve()) not in by_path]
+    if dangling:
+        problems += len(dangling)
+        log_error(f"悬空的本地路径: {len(dangling)} 处（-e 等引用的目录不是已索引的包）")
+        for pkg_name, rel in dangling:
+            print(f"  {pkg_name}: {rel}")
+    
+    dependents = {dep for deps in graph.values() for dep in deps}
+    isolated = sorted(name for name in analyzer.packages if name not in graph and name not in dependents)
+    workspace_paths = load_workspace_paths(engine_dir)
+    if workspace_paths is not None:
+        roots = {name for name, info in analyzer.packages.items()
+                 if os.path.relpath(info['path'], engine_dir) in workspace_paths}
+        unreachable = sorted(analyzer.find_unreachable(roots) - set(isolated))
+        if unreachable:
+            log_info(f"不在任何工作区依赖闭包中的包: {len(unreachable)} 个")
+            for name in unreachable:
+                print(f"  {name}")
+    if isolated:
+        log_info(f"孤立包（既不依赖也不被任何本地包依赖）: {len(isolated)} 个")
+        for name in isolated:
+            print(f"  {name}")
+    
+    print()
+    summary = (f"{len(analyzer.packages)} 个包，{sum(len(deps) for deps in graph.values())} 条本地依赖，"
+               f"耗时 {(time.monotonic() - start) * 1000:.0f}ms")
+    if problems:
+        log_error(f"检查发现 {problems} 个问题（{summary}）")
+        return 1
+    log_success(f"依赖图一致（{summary}）")
+    return 0
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='OpenVoiceOS 开发环境完整安装器')
+    parser.add_argument('command', nargs='?', default='install', choices=['install', 'wheelhouse', 'report', 'check', 'lock', 'sync'],
+                        help='install: 安装所有本地包（默认）；wheelhouse: 构建第三方依赖的本地 wheel 缓存；'
+                             'report: 根据安装追踪输出最慢的包和依赖图上的关键路径；'
+                             'check: 检查循环依赖、版本冲突和孤立包，不安装；'
+                             'lock: 解析一次依赖并写出带哈希的锁文件；sync: 按锁文件安装（不经过 resolver）并卸载多余的包')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='每层并发安装的包数量；大于 1 时按依赖层并行安装 (默认: %(default)s)')
+    parser.add_argument('--batch', action='store_true',
+                        help='把所有包合并为一个 requirements 集合，交给一次（或少数几次）pip 调用安装')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'不读取也不写入包索引，重新遍历并解析所有包 ({INDEX_FILE})')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='扫描前删除包索引')
+    parser.add_argument('--changed-only', action='store_true',
+                        help=f'只重装元数据（setup.py、requirements 等）相对上次安装发生变化的包及其下游包 ({STATE_FILE})')
+    parser.add_argument('--wheelhouse', metavar='DIR',
+                        help='wheelhouse 目录 (默认: $OVOS_WHEELHOUSE 或 engine/.wheelhouse)；存在时优先离线安装')
+    parser.add_argument('--no-wheelhouse', action='store_true',
+                        help='安装时不使用 wheelhouse')
+    parser.add_argument('--trace', metavar='FILE',
+                        help='安装追踪文件 (默认: $OVOS_INSTALL_TRACE 或 engine/.install_logs/install-trace.jsonl)')
+    parser.add_argument('--session', default='latest',
+                        help='report: 分析的追踪 session (默认: 最新一次)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='report: 列出最慢的 N 次安装 (默认: %(default)s)')
+    parser.add_argument('--workspace', action='append', default=[],
+                        help='lock: 只锁定这些工作区（install-workspaces.py）及其本地依赖，可重复 (默认: 所有本地包)')
+    parser.add_argument('--lock', default=str(DEFAULT_LOCK_FILE),
+                        help='lock/sync: 锁文件 (默认: %(default)s)')
+    parser.add_argument('--keep-extra', action='store_true',
+                        help='sync: 不卸载锁文件以外的发行版')
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs 必须大于等于 1')
+    if args.batch and args.jobs > 1:
+        parser.error('--batch 与 --jobs 不能同时使用')
+    return args
+
+
+def main(argv=None):
     """主函数"""
+    args = parse_args(argv)
     engine_dir = Path(__file__).parent.absolute()
     
     print(f"\n{BLUE}{'='*70}{NC}")
@@ -309,26 +926,87 @@ def main():
     
     # 第一步：分析依赖
     print(f"{BLUE}第一步：分析依赖{NC}\n")
-    analyzer = DependencyAnalyzer(engine_dir)
+    analyzer = DependencyAnalyzer(engine_dir, use_cache=not args.no_cache)
+    if args.clear_cache:
+        analyzer.clear_cache()
     analyzer.scan_all_packages()
     
+    if args.command == 'wheelhouse':
+        print(f"\n{BLUE}第二步：构建 wheelhouse{NC}\n")
+        return 0 if build_wheelhouse(analyzer, get_wheelhouse_dir(args.wheelhouse)) else 1
+    
+    if args.command == 'report':
+        print(f"\n{BLUE}第二步：安装耗时报告{NC}\n")
+        return report_trace(analyzer, args)
+    
+    if args.command == 'check':
+        print(f"\n{BLUE}第二步：检查依赖图{NC}\n")
+        return check_graph(analyzer, engine_dir)
+    
+    if args.command == 'lock':
+        print(f"\n{BLUE}第二步：生成锁文件{NC}\n")
+        return lock_dependencies(analyzer, engine_dir, args)
+    
+    if args.command == 'sync':
+        print(f"\n{BLUE}第二步：按锁文件同步{NC}\n")
+        return sync_lock(analyzer, engine_dir, args)
+    
+    state = InstallState(engine_dir)
+    selected = None
+    if args.changed_only:
+        changed, moved = state.changed_packages(analyzer.packages)
+        downstream = analyzer.get_dependents(changed)
+        selected = changed | downstream
+        
+        print()
+        log_info(f"元数据变化: {len(changed)} 个包，受影响的下游包: {len(downstream)} 个")
+        if moved:
+            log_info(f"仅源码变化（editable 安装无需重装）: {', '.join(sorted(moved))}")
+        if not selected:
+            log_success("所有包均为最新，无需重新安装")
+            return 0
+    
     # 第二步：确定安装顺序
     print(f"\n{BLUE}第二步：确定安装顺序{NC}\n")
     try:
-        install_order = analyzer.get_install_order()
-        print(f"\n建议安装顺序（共 {len(install_order)} 个包）:")
-        for i, (pkg_name, pkg_path) in enumerate(install_order[:10], 1):
-            print(f"  {i}. {pkg_name}")
-        if len(install_order) > 10:
-            print(f"  ... 还有 {len(install_order) - 10} 个包")
+        if args.jobs > 1:
+            install_levels = analyzer.get_install_levels(selected)
+            print(f"\n依赖分层（共 {len(install_levels)} 层）:")
+            for i, level in enumerate(install_levels, 1):
+                print(f"  层 {i}: {len(level)} 个包")
+        else:
+            install_order = analyzer.get_install_order(selected)
+            print(f"\n建议安装顺序（共 {len(install_order)} 个包）:")
+            for i, (pkg_name, pkg_path) in enumerate(install_order[:10], 1):
+                print(f"  {i}. {pkg_name}")
+            if len(install_order) > 10:
+                print(f"  ... 还有 {len(install_order) - 10} 个包")
     except ValueError as e:
         log_error(f"依赖分析错误: {e}")
+        log_info(f"运行 {Path(__file__).name} check 查看所有循环依赖")
         return 1
     
     # 第三步：安装
     print(f"\n{BLUE}第三步：安装所有包{NC}")
-    installer = InstallManager(engine_dir)
-    installer.install_all(install_order)
+    pip_args = []
+    # 包含构建依赖：离线时隔离构建要用，--no-build-isolation 时要预先装进 venv
+    requirements = collect_third_party(analyzer, selected, build=True)
+    wheelhouse = None if args.no_wheelhouse else find_wheelhouse(args.wheelhouse)
+    if wheelhouse is not None:
+        pip_args = wheelhouse.pip_args(requirements)
+    
+    tracer = InstallTracer('install-dev-full', get_trace_file(args.trace))
+    installer = InstallManager(engine_dir, state, pip_args, tracer)
+    try:
+        if args.jobs > 1:
+            installer.install_levels(install_levels, args.jobs, requirements, analyzer.build_graph())
+        elif args.batch:
+            installer.install_batch(install_order)
+        else:
+            installer.install_all(install_order)
+    finally:
+        state.save()
+        update_after_install()
     
     # 输出报告
     if installer.report():
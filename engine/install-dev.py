@@ -28,6 +28,10 @@ import site
 import sysconfig
 from pathlib import Path
 
+from install_trace import InstallTracer
+from pip_batch import BatchInstaller
+from wheelhouse import pip_args_for_packages
+
 # Colors for output
 GREEN = '\033[0;32m'
 BLUE = '\033[0;34m'
@@ -47,15 +51,17 @@ def log_error(msg):
 def log_warn(msg):
     print(f"{YELLOW}⚠{NC} {msg}")
 
-def run_pip(args, desc=None):
-    """Run pip install with error handling"""
+def run_pip(args, desc=None, extra_args=None, package=None, tracer=None):
+    """Run pip install with error handling; each call is recorded in the install trace"""
     if desc:
         log_info(desc)
     
-    cmd = [sys.executable, "-m", "pip", "install", "--no-build-isolation", "-q"] + args
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    # No -q: the trace splits pip's progress output into phases; it is only shown on failure
+    cmd = [sys.executable, "-m", "pip", "install", "--no-build-isolation"] + args + (extra_args or [])
+    tracer = tracer or InstallTracer.from_env('install-dev')
+    result = tracer.run(cmd, package or args[-1], path=Path(args[-1]) if package else None)
     if result.returncode != 0:
-        print(result.stderr)
+        print(result.stdout)
     return result.returncode == 0
 
 def extract_commented_local_deps(req_file):
@@ -114,6 +120,12 @@ def main():
                         help='Skip packages that are already installed (pip show)')
     parser.add_argument('--skip-if-editable', action='store_true',
                         help='Skip packages that are installed in editable mode pointing to the same path')
+    parser.add_argument('--batch', action='store_true',
+                        help='Install all selected packages with a single pip invocation')
+    parser.add_argument('--wheelhouse', metavar='DIR',
+                        help='Wheelhouse directory (default: $OVOS_WHEELHOUSE or engine/.wheelhouse)')
+    parser.add_argument('--no-wheelhouse', action='store_true',
+                        help='Do not install third-party dependencies from the local wheelhouse')
     args = parser.parse_args()
 
     print(f"\n{BLUE}{'='*60}{NC}")
@@ -192,6 +204,14 @@ def main():
     
     failed = []
     skipped = []
+    batch = []
+
+    # Prefer the local wheelhouse (offline when it covers every dependency)
+    tracer = InstallTracer.from_env('install-dev')
+    pip_args = []
+    if not args.no_wheelhouse:
+        pip_args = pip_args_for_packages([Path(pkg['full_path']) for pkg in unique_packages],
+                                         args.wheelhouse)
 
     # helper: check pip show
     def pip_show(pkg_name):
@@ -244,13 +264,28 @@ def main():
                 except Exception:
                     pass
 
+        if args.batch:
+            batch.append(pkg)
+            continue
+
         print(f"  Installing {pkg['desc']}...")
-        if run_pip(["-e", pkg['full_path']]):
+        if run_pip(["-e", pkg['full_path']], extra_args=pip_args,
+                   package=Path(pkg['full_path']).name, tracer=tracer):
             log_success(f"Installed {pkg['desc']}")
         else:
             log_error(f"Failed to install {pkg['desc']}")
             failed.append(pkg['desc'])
         print()
+
+    if batch:
+        print(f"  Installing {len(batch)} package(s) in one pip invocation...")
+        constraints = [Path(pkg['full_path']) / 'constraints.txt' for pkg in batch
+                       if (Path(pkg['full_path']) / 'constraints.txt').exists()]
+        descs = {Path(pkg['full_path']).name: pkg['desc'] for pkg in batch}
+        result = BatchInstaller(constraints, pip_args=pip_args, tracer=tracer).install(
+            [(Path(pkg['full_path']).name, Path(pkg['full_path'])) for pkg in batch])
+        failed.extend(descs[name] for name, _ in result.failed)
+        print()
     
     if failed or skipped:
         print(f"\n{RED}{'='*60}{NC}")
@@ -11,12 +11,17 @@ OVOS 多包系统的标准解决方案
 这是 Yarn Workspaces/npm Workspaces 风格的解决方案
 """
 
-import subprocess
 import sys
 import os
 from pathlib import Path
 from typing import List, Tuple
 
+from install_trace import InstallTracer
+from package_index import PACKAGE_MARKERS, load_index
+from pip_batch import BatchInstaller
+from plugin_manifest import update_after_install
+from wheelhouse import pip_args_for_packages
+
 # Colors
 GREEN = '\033[0;32m'
 BLUE = '\033[0;34m'
@@ -87,10 +92,13 @@ DEFAULT_WORKSPACES = ['core']
 class WorkspaceManager:
     """工作区管理器"""
     
-    def __init__(self, engine_dir: Path):
+    def __init__(self, engine_dir: Path, use_wheelhouse: bool = True):
         self.engine_dir = engine_dir
         self.failed = []
         self.installed = []
+        self.use_wheelhouse = use_wheelhouse
+        self.pip_args = []  # 例如 wheelhouse 的 --find-links 参数
+        self.tracer = InstallTracer.from_env('install-workspaces')
     
     def select_workspaces(self, names: List[str] = None) -> List[str]:
         """选择要安装的工作区"""
@@ -107,8 +115,10 @@ class WorkspaceManager:
         return selected
     
     def get_packages_for_workspaces(self, workspace_names: List[str]) -> List[Tuple[str, Path]]:
-        """获取指定工作区的所有包"""
+        """获取指定工作区的所有包（包含 setup.py 或 pyproject.toml 的目录）"""
         packages = []
+        index = load_index(self.engine_dir)
+        names = {entry['path']: entry['name'] for entry in index}
         
         for ws_name in workspace_names:
             if ws_name not in WORKSPACES:
@@ -118,9 +128,9 @@ class WorkspaceManager:
             for pkg_rel_path in ws['packages']:
                 pkg_path = self.engine_dir / pkg_rel_path
                 
-                if pkg_path.exists() and (pkg_path / 'setup.py').exists():
-                    # 从 setup.py 中提取包名
-                    pkg_name = pkg_path.name
+                if any((pkg_path / marker).is_file() for marker in PACKAGE_MARKERS):
+                    # 包名取自 setup.py / pyproject.toml 元数据，缺失时用目录名
+                    pkg_name = names.get(pkg_rel_path, pkg_path.name)
                     packages.append((pkg_name, pkg_path))
                 else:
                     log_warn(f"包不存在: {pkg_rel_path}")
@@ -130,13 +140,14 @@ class WorkspaceManager:
     def install_package(self, pkg_name: str, pkg_path: Path) -> bool:
         """安装单个包"""
         try:
+            # 不加 -q：安装追踪根据 pip 的进度输出划分阶段
             cmd = [
                 sys.executable, '-m', 'pip', 'install',
-                '--no-build-isolation', '-q',
+                '--no-build-isolation',
                 '-e', str(pkg_path)
-            ]
+            ] + self.pip_args
             
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = self.tracer.run(cmd, pkg_name, path=pkg_path)
             
             if result.returncode == 0:
                 log_success(f"已安装: {pkg_name}")
@@ -145,7 +156,7 @@ class WorkspaceManager:
             else:
                 # 尝试不使用 --no-build-isolation
                 cmd.remove('--no-build-isolation')
-                result = subprocess.run(cmd, capture_output=True, text=True)
+                result = self.tracer.run(cmd, pkg_name, path=pkg_path)
                 
                 if result.returncode == 0:
                     log_success(f"已安装: {pkg_name}")
@@ -153,7 +164,7 @@ class WorkspaceManager:
                     return True
                 
                 log_error(f"安装失败: {pkg_name}")
-                self.failed.append((pkg_name, result.stderr))
+                self.failed.append((pkg_name, result.stdout))
                 return False
         
         except Exception as e:
@@ -161,7 +172,15 @@ class WorkspaceManager:
             self.failed.append((pkg_name, str(e)))
             return False
     
-    def install_workspaces(self, workspace_names: List[str]):
+    def install_batch(self, packages: List[Tuple[str, Path]]):
+        """用一次（或少数几次）pip 调用安装所有包"""
+        constraints = [pkg_path / 'constraints.txt' for _, pkg_path in packages
+                       if (pkg_path / 'constraints.txt').exists()]
+        result = BatchInstaller(constraints, pip_args=self.pip_args, tracer=self.tracer).install(packages)
+        self.installed.extend(result.installed)
+        self.failed.extend(result.failed)
+    
+    def install_workspaces(self, workspace_names: List[str], batch: bool = False):
         """安装指定的工作区"""
         packages = self.get_packages_for_workspaces(workspace_names)
         
@@ -174,6 +193,13 @@ class WorkspaceManager:
         print(f"{BLUE}总共 {len(packages)} 个包{NC}")
         print(f"{BLUE}{'='*70}{NC}\n")
         
+        if self.use_wheelhouse:
+            self.pip_args = pip_args_for_packages([pkg_path for _, pkg_path in packages])
+        
+        if batch:
+            self.install_batch(packages)
+            return True
+        
         for i, (pkg_name, pkg_path) in enumerate(packages, 1):
             print(f"[{i}/{len(packages)}] {pkg_name}...", end=" ", flush=True)
             if self.install_package(pkg_name, pkg_path):
@@ -214,7 +240,11 @@ def show_usage():
     """显示使用说明"""
     print(f"\n{BLUE}OpenVoiceOS 开发环境安装器{NC}\n")
     print("用法:")
-    print(f"  python3 {Path(__file__).name} [工作区...]\n")
+    print(f"  python3 {Path(__file__).name} [--batch] [工作区...]\n")
+    
+    print("选项:")
+    print("  --batch          把所有包合并为一次 pip 调用安装")
+    print("  --no-wheelhouse  不使用本地 wheelhouse（默认存在时优先离线安装）\n")
     
     print("可用的工作区:")
     for ws_name, ws_info in WORKSPACES.items():
@@ -225,6 +255,7 @@ def show_usage():
     print(f"  python3 {Path(__file__).name}            # 安装核心工作区（默认）")
     print(f"  python3 {Path(__file__).name} core gui   # 安装核心和 GUI")
     print(f"  python3 {Path(__file__).name} audio      # 仅安装音频模块")
+    print(f"  python3 {Path(__file__).name} --batch core audio  # 一次 pip 调用安装核心和音频")
     print()
 
 
@@ -238,11 +269,20 @@ def main():
         show_usage()
         return 0
     
+    # 分离选项和工作区名称
+    options = [arg for arg in sys.argv[1:] if arg.startswith('--')]
+    names = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    for option in options:
+        if option not in ('--batch', '--no-wheelhouse'):
+            log_error(f"未知选项: {option}")
+            show_usage()
+            return 1
+    
     # 获取要安装的工作区
-    selected_workspaces = sys.argv[1:] if len(sys.argv) > 1 else DEFAULT_WORKSPACES
+    selected_workspaces = names if names else DEFAULT_WORKSPACES
     
     # 创建管理器
-    manager = WorkspaceManager(engine_dir)
+    manager = WorkspaceManager(engine_dir, use_wheelhouse='--no-wheelhouse' not in options)
     
     # 验证工作区
     valid_workspaces = manager.select_workspaces(selected_workspaces)
@@ -253,7 +293,8 @@ def main():
         return 1
     
     # 安装
-    if manager.install_workspaces(valid_workspaces):
+    if manager.install_workspaces(valid_workspaces, batch='--batch' in options):
+        update_after_install()
         # 输出报告
         success = manager.report()
         return 0 if success else 1
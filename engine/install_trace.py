@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+安装耗时追踪
+
+各安装器（install-dev-full.py、install-workspaces.py、install-dev.py、
+pip_batch.py、dev.sh）通过这里运行 pip，把每次调用记录为一行 JSON：
+
+  {"session": ..., "installer": ..., "package": ..., "path": ...,
+   "start": ..., "end": ..., "duration": ...,
+   "phases": {"resolve": ..., "download": ..., "build": ..., "install": ...},
+   "exit": 0, "cmd": [...]}
+
+阶段耗时根据 pip 输出中的进度行划分（Collecting/Obtaining、Downloading、
+Building wheel/editable、Installing collected packages），因此追踪时不要给
+pip 传 -q。同一次运行的记录共享 session，dev.sh 通过环境变量
+OVOS_INSTALL_SESSION 把多个 pip 调用归入同一个 session。
+
+追踪文件: 环境变量 OVOS_INSTALL_TRACE > engine/.install_logs/install-trace.jsonl；
+OVOS_INSTALL_TRACE=off 关闭追踪。
+
+用法:
+  python3 install_trace.py run --package NAME [--installer NAME] -- pip install -e PKG
+  python3 install_trace.py report [--top 10] [--session ID]
+  python3 install-dev-full.py report            # 额外计算依赖图上的关键路径
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_TRACE_FILE = Path(__file__).parent.absolute() / '.install_logs' / 'install-trace.jsonl'
+ENV_TRACE = 'OVOS_INSTALL_TRACE'
+ENV_SESSION = 'OVOS_INSTALL_SESSION'
+
+PHASES = ('resolve', 'download', 'build', 'install')
+
+# pip 输出行 -> 阶段；按顺序匹配，第一个命中的生效
+_PHASE_PATTERNS = (
+    ('download', re.compile(r'^\s*(Downloading|Using cached|File was already downloaded) ')),
+    ('build', re.compile(r'^\s*(Building (wheel|editable|wheels)|Created wheel|Running setup\.py (develop|install))')),
+    ('install', re.compile(r'^\s*(Installing collected packages|Attempting uninstall|Successfully installed)')),
+    ('resolve', re.compile(r'^\s*(Obtaining |Collecting |Requirement already satisfied|Processing |Looking in |'
+                           r'Preparing (editable )?metadata|Getting requirements to build|Installing build dependencies|'
+                           r'Checking if build backend)')),
+)
+
+
+def get_trace_file(path: Optional[str] = None) -> Optional[Path]:
+    """返回追踪文件路径；通过环境变量关闭追踪时返回 None"""
+    if path:
+        return Path(path).absolute()
+    value = os.environ.get(ENV_TRACE, '')
+    if value.lower() in ('off', '0', 'no', 'false'):
+        return None
+    return Path(value).absolute() if value else DEFAULT_TRACE_FILE
+
+
+def new_session() -> str:
+    """当前运行的 session；已在环境变量中设置时沿用"""
+    return os.environ.get(ENV_SESSION) or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+
+
+class PhaseTimer:
+    """根据 pip 输出行的时间戳累计各阶段耗时"""
+
+    def __init__(self, start: float):
+        self.phase = 'resolve'  # pip 启动后首先进入依赖解析
+        self.last = start
+        self.phases = {phase: 0.0 for phase in PHASES}
+
+    def feed(self, line: str, now: float):
+        for phase, pattern in _PHASE_PATTERNS:
+            if pattern.match(line):
+                self._advance(now)
+                self.phase = phase
+                return
+
+    def finish(self, now: float) -> Dict[str, float]:
+        self._advance(now)
+        return {phase: round(seconds, 3) for phase, seconds in self.phases.items()}
+
+    def _advance(self, now: float):
+        self.phases[self.phase] += now - self.last
+        self.last = now
+
+
+class InstallTracer:
+    """运行 pip 并把每次调用追加到 JSON lines 追踪文件（线程安全）"""
+
+    def __init__(self, installer: str, trace_file: Optional[Path] = None,
+                 session: Optional[str] = None):
+        self.installer = installer
+        self.trace_file = trace_file
+        self.session = session or new_session()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, installer: str) -> 'InstallTracer':
+        """按环境变量确定追踪文件和 session"""
+        return cls(installer, get_trace_file())
+
+    def run(self, cmd: List[str], package: str, path: Optional[Path] = None,
+            packages: Optional[List[str]] = None, cwd: Optional[Path] = None,
+            echo: bool = False) -> subprocess.CompletedProcess:
+        """
+        运行 cmd，stdout/stderr 合并后返回在 CompletedProcess.stdout 中
+
+        packages 用于批量安装（一次 pip 调用包含多个包）；echo 为 True 时
+        同时把输出原样写到 stdout。
+        """
+        start = time.time()
+        timer = PhaseTimer(start)
+        lines = []
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                text=True, cwd=cwd)
+        for line in proc.stdout:
+            timer.feed(line, time.time())
+            lines.append(line)
+            if echo:
+                sys.stdout.write(line)
+        returncode = proc.wait()
+        end = time.time()
+
+        self.record({
+            'package': package,
+            'packages': packages,
+            'path': str(Path(path).resolve()) if path else None,
+            'start': round(start, 3),
+            'end': round(end, 3),
+            'duration': round(end - start, 3),
+            'phases': timer.finish(end),
+            'exit': returncode,
+            'cmd': [str(arg) for arg in cmd],
+        })
+        return subprocess.CompletedProcess(cmd, returncode, ''.join(lines), '')
+
+    def record(self, event: Dict):
+        """追加一条记录"""
+        if self.trace_file is None:
+            return
+        event = dict(session=self.session, installer=self.installer, **event)
+        if not event.get('packages'):
+            event.pop('packages', None)
+        with self._lock:
+            self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.trace_file, 'a') as f:
+                f.write(json.dumps(event, ensure_ascii=False) + '\n')
+
+
+# ---------------------------------------------------------------------------
+# 报告
+# ---------------------------------------------------------------------------
+
+def load_trace(trace_file: Path, session: Optional[str] = None) -> List[Dict]:
+    """读取追踪文件中某个 session（默认最新一个）的记录"""
+    records = []
+    try:
+        with open(trace_file) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # 被中断的写入
+    except OSError:
+        return []
+    if not records:
+        return []
+    if session in (None, 'latest'):
+        session = max(records, key=lambda r: r.get('start', 0))['session']
+    return [r for r in records if r.get('session') == session]
+
+
+def package_durations(records: Iterable[Dict], resolve=None) -> Dict[str, float]:
+    """
+    每个包的安装耗时（同一个包的多次尝试累加）
+
+    resolve(record) 把记录映射到依赖图中的包名，返回 None 的记录被忽略；
+    批量安装记录（包含多个包）不计入。
+    """
+    durations: Dict[str, float] = {}
+    for record in records:
+        if record.get('packages'):
+            continue
+        name = resolve(record) if resolve else record['package']
+        if name:
+            durations[name] = durations.get(name, 0.0) + record['duration']
+    return durations
+
+
+def critical_path(graph: Dict[str, Set[str]], durations: Dict[str, float],
+                  back_edges: Optional[List[Tuple[str, str]]] = None) -> Tuple[List[str], float]:
+    """
+    依赖图（{包名: 其依赖}）上按安装耗时加权的最长路径
+
+    即使无限并发，按依赖顺序安装也至少需要这条路径的总耗时。
+    未出现在 durations 中的包耗时记为 0。
+    图中有循环时抛出 ValueError；给出 back_edges 列表时改为忽略构成循环的回边，
+    并把它们 (包, 依赖) 追加到该列表中。
+    """
+    finish: Dict[str, float] = {}
+    via: Dict[str, Optional[str]] = {}
+    nodes = set(graph) | set(durations) | {dep for deps in graph.values() for dep in deps}
+
+    def visit(node, stack):
+        if node in finish:
+            return finish[node]
+        stack.add(node)
+        best, best_dep = 0.0, None
+        for dep in sorted(graph.get(node, ())):
+            if dep in stack:
+                if back_edges is None:
+                    raise ValueError(f"循环依赖检测到: {dep}")
+                back_edges.append((node, dep))
+                continue
+            t = visit(dep, stack)
+            if t > best:
+                best, best_dep = t, dep
+        stack.discard(node)
+        finish[node] = best + durations.get(node, 0.0)
+        via[node] = best_dep
+        return finish[node]
+
+    for node in sorted(nodes):
+        visit(node, set())
+    if not finish:
+        return [], 0.0
+
+    end = max(sorted(finish), key=lambda n: finish[n])
+    path = []
+    node = end
+    while node is not None:
+        path.append(node)
+        node = via[node]
+    path.reverse()
+    return path, finish[end]
+
+
+def print_report(records: List[Dict], top: int = 10,
+                 graph: Optional[Dict[str, Set[str]]] = None, resolve=None):
+    """输出最慢的安装、阶段汇总以及（给出依赖图时）关键路径"""
+    if not records:
+        print("没有追踪记录")
+        return
+
+    start = min(r['start'] for r in records)
+    end = max(r['end'] for r in records)
+    serial = sum(r['duration'] for r in records)
+    failed = [r for r in records if r['exit'] != 0]
+    installers = sorted({r['installer'] for r in records})
+
+    print(f"session {records[0]['session']}（{', '.join(installers)}）: "
+          f"{len(records)} 次 pip 调用，失败 {len(failed)} 次")
+    print(f"  墙钟耗时 {end - start:.1f}s，pip 累计耗时 {serial:.1f}s")
+
+    totals = {phase: sum(r['phases'].get(phase, 0.0) for r in records) for phase in PHASES}
+    print("  阶段累计: " + "，".join(f"{phase} {seconds:.1f}s" for phase, seconds in totals.items()))
+
+    print(f"\n最慢的 {min(top, len(records))} 次安装:")
+    for r in sorted(records, key=lambda r: r['duration'], reverse=True)[:top]:
+        phases = ' '.join(f"{phase[:3]}={r['phases'].get(phase, 0.0):.1f}" for phase in PHASES)
+        status = '' if r['exit'] == 0 else f"  (exit {r['exit']})"
+        label = r['package'] if not r.get('packages') else f"{r['package']} [{len(r['packages'])} 个包]"
+        print(f"  {r['duration']:8.1f}s  {label:40}  {phases}{status}")
+
+    if graph is None:
+        return
+    durations = package_durations(records, resolve)
+    back_edges = []
+    path, total = critical_path(graph, durations, back_edges)
+    if back_edges:
+        print("\n依赖图中有循环，关键路径忽略了以下依赖:")
+        for node, dep in back_edges:
+            print(f"  {node} -> {dep}")
+    print(f"\n关键路径（{len(path)} 个包，{total:.1f}s；并发安装的理论下限）:")
+    for node in path:
+        print(f"  {durations.get(node, 0.0):8.1f}s  {node}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pip 安装耗时追踪')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_run = sub.add_parser('run', help='运行一个 pip 命令并记录耗时（供 shell 脚本使用）')
+    p_run.add_argument('--package', required=True, help='包名')
+    p_run.add_argument('--path', help='包目录')
+    p_run.add_argument('--installer', default='shell', help='安装器名称 (默认: %(default)s)')
+    p_run.add_argument('cmd', nargs=argparse.REMAINDER, help='要运行的命令（放在 -- 之后）')
+
+    p_report = sub.add_parser('report', help='输出最慢的安装和阶段汇总')
+    p_report.add_argument('--top', type=int, default=10, help='列出最慢的 N 次安装 (默认: %(default)s)')
+    p_report.add_argument('--session', default='latest', help='session（默认最新一次）')
+    for p in (p_run, p_report):
+        p.add_argument('--trace', help=f'追踪文件 (默认: ${ENV_TRACE} 或 {DEFAULT_TRACE_FILE})')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        cmd = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+        if not cmd:
+            parser.error('缺少要运行的命令')
+        tracer = InstallTracer(args.installer, get_trace_file(args.trace))
+        result = tracer.run(cmd, args.package, path=Path(args.path).absolute() if args.path else None,
+                            echo=True)
+        return result.returncode
+
+    trace_file = get_trace_file(args.trace) or DEFAULT_TRACE_FILE
+    print_report(load_trace(trace_file, args.session), args.top)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
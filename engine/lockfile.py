@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+依赖锁文件
+
+每条安装路径都从 ovos-plugin-manager>=1.0.2,<2.0.0 这类宽松约束重新解析整个依赖集，
+在树莓派上 pip resolver 的回溯是安装中最慢的部分之一，两台设备也可能装出不同的版本。
+
+lock: 用 pip install --dry-run --report 对一组本地包的第三方依赖只解析一次，
+把结果写成带哈希、完全固定版本的 requirements 格式锁文件；本地包写成 file:// editable：
+
+  # python: 3.11.7 cpython-311 linux_aarch64
+  # engine: /home/pi/dev/norapy-dev/engine
+  # workspaces: core
+  requests==2.31.0 \\
+      --hash=sha256:...
+  -e file:///home/pi/dev/norapy-dev/engine/engine-core/ovos-core
+
+sync: 按锁文件原样安装——第三方依赖 --no-deps --require-hashes，本地包 --no-deps --no-build-isolation -e
+（路径按 engine 目录重定位，已是同一路径的 editable 安装跳过），再卸载 venv 中
+锁文件以外的发行版。全程不经过 pip resolver。
+
+锁文件只对生成它的 Python 版本和平台有效（哈希对应具体的 wheel），sync 时不一致会告警。
+
+通过 install-dev-full.py 使用:
+  python3 install-dev-full.py lock [--workspace core ...] [--lock FILE]
+  python3 install-dev-full.py sync [--lock FILE] [--keep-extra]
+"""
+
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+from urllib.parse import unquote, urlparse
+
+from requirements_parser import normalize_name, parse_requirement
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+ENGINE_DIR = Path(__file__).parent.absolute()
+DEFAULT_LOCK_FILE = ENGINE_DIR / 'requirements.lock'
+# sync 不卸载的基础工具（及其依赖）：本地包用 --no-build-isolation 构建，需要它们留在 venv 中
+KEEP_DISTRIBUTIONS = {'pip', 'setuptools', 'wheel'}
+
+
+class LockError(Exception):
+    pass
+
+
+class Locked(NamedTuple):
+    """锁文件中的一个第三方发行版"""
+    name: str
+    version: str
+    hashes: List[str]      # "sha256:..."
+
+
+class LockFile(NamedTuple):
+    header: Dict[str, str]
+    packages: List[Locked]
+    editables: List[Path]  # 本地包的绝对路径（按 header['engine'] 记录）
+
+
+def environment_tag() -> str:
+    """锁文件适用的解释器和平台"""
+    return (f"{platform.python_version()} {sys.implementation.cache_tag} "
+            f"{sysconfig.get_platform().replace('-', '_').replace('.', '_')}")
+
+
+# ---------------------------------------------------------------------------
+# lock
+# ---------------------------------------------------------------------------
+
+def _file_hash(url: str) -> Optional[str]:
+    parsed = urlparse(url)
+    if parsed.scheme != 'file':
+        return None
+    h = hashlib.sha256()
+    with open(unquote(parsed.path), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return f"sha256:{h.hexdigest()}"
+
+
+def resolve(requirements: List[str], pip_args: Optional[List[str]] = None) -> List[Locked]:
+    """用 pip 的 resolver 解析一次（不安装），返回所有要安装的发行版及其哈希"""
+    with tempfile.TemporaryDirectory(prefix='ovos-lock-') as tmp:
+        req_file = Path(tmp) / 'requirements.txt'
+        report_file = Path(tmp) / 'report.json'
+        req_file.write_text(''.join(req + '\n' for req in requirements))
+        cmd = [sys.executable, '-m', 'pip', 'install', '--dry-run', '--ignore-installed', '--quiet',
+               '--report', str(report_file), '-r', str(req_file)] + list(pip_args or [])
+        result = subprocess.run(cmd)
+        if result.returncode != 0:
+            raise LockError(f"pip 解析失败（退出码 {result.returncode}）")
+        report = json.loads(report_file.read_text())
+
+    locked = []
+    for item in report.get('install', []):
+        name = item['metadata']['name']
+        version = item['metadata']['version']
+        info = item.get('download_info', {})
+        archive = info.get('archive_info')
+        if archive is None:
+            raise LockError(f"{name} 来自 {info.get('url')}（VCS 或目录），无法固定哈希")
+        hashes = [f"{algo}:{value}" for algo, value in sorted(archive.get('hashes', {}).items())]
+        if not hashes and archive.get('hash'):
+            hashes = [archive['hash'].replace('=', ':', 1)]
+        if not hashes:
+            file_hash = _file_hash(info.get('url', ''))
+            if file_hash is None:
+                raise LockError(f"{name} {version}: pip 没有报告哈希")
+            hashes = [file_hash]
+        locked.append(Locked(name, version, hashes))
+    return sorted(locked, key=lambda p: normalize_name(p.name))
+
+
+def write_lock(lock_file: Path, packages: List[Locked], editables: List[Path], engine_dir: Path,
+               header: Optional[Dict[str, str]] = None):
+    """原子写入锁文件；editables 按安装顺序排列"""
+    lines = [
+        "# OVOS 依赖锁文件: install-dev-full.py lock 生成，install-dev-full.py sync 安装",
+        f"# python: {environment_tag()}",
+        f"# engine: {engine_dir}",
+        f"# generated: {time.strftime('%Y-%m-%dT%H:%M:%S')}",
+    ]
+    lines += [f"# {key}: {value}" for key, value in (header or {}).items()]
+    for pkg in packages:
+        lines.append(f"{pkg.name}=={pkg.version}" + ''.join(f" \\\n    --hash={h}" for h in pkg.hashes))
+    lines += [f"-e {path.as_uri()}" for path in editables]
+    tmp_file = lock_file.with_name(lock_file.name + '.tmp')
+    tmp_file.write_text('\n'.join(lines) + '\n')
+    os.replace(tmp_file, lock_file)
+
+
+# ---------------------------------------------------------------------------
+# sync
+# ---------------------------------------------------------------------------
+
+def read_lock(lock_file: Path) -> LockFile:
+    header: Dict[str, str] = {}
+    packages: List[Locked] = []
+    editables: List[Path] = []
+    text = lock_file.read_text().replace('\\\n', ' ')
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('#'):
+            key, sep, value = line[1:].partition(':')
+            if sep and ' ' not in key.strip():
+                header.setdefault(key.strip(), value.strip())
+            continue
+        if line.startswith('-e '):
+            editables.append(Path(unquote(urlparse(line[3:].strip()).path)))
+            continue
+        spec, *options = line.split()
+        name, sep, version = spec.partition('==')
+        if not sep:
+            raise LockError(f"锁文件中没有固定版本的条目: {line}")
+        hashes = [opt[len('--hash='):] for opt in options if opt.startswith('--hash=')]
+        packages.append(Locked(name, version, hashes))
+    return LockFile(header, packages, editables)
+
+
+def relocate(lock: LockFile, engine_dir: Path) -> List[Path]:
+    """锁文件记录的 engine 目录与当前不同时（checkout 移动过），把本地包路径换到当前目录"""
+    recorded = Path(lock.header.get('engine', str(engine_dir)))
+    result = []
+    for path in lock.editables:
+        try:
+            result.append(engine_dir / path.relative_to(recorded))
+        except ValueError:
+            result.append(path)
+    return result
+
+
+def editable_location(dist: metadata.Distribution) -> Optional[str]:
+    """
+    editable 安装的源码目录
+
+    PEP 660 安装读 direct_url.json（PEP 610）；没有 pyproject.toml 的包在 --no-build-isolation 下
+    走 setup.py develop，元数据是源码目录中的 *.egg-info，其所在目录即源码目录。
+    """
+    try:
+        direct_url = json.loads(dist.read_text('direct_url.json') or 'null')
+    except ValueError:
+        direct_url = None
+    if direct_url:
+        if not direct_url.get('dir_info', {}).get('editable'):
+            return None
+        return os.path.normpath(unquote(urlparse(direct_url['url']).path))
+    location = Path(str(dist.locate_file('')))
+    if any((location / name).is_file() for name in ('setup.py', 'pyproject.toml', 'setup.cfg')):
+        return os.path.normpath(location)
+    return None
+
+
+def site_paths(site_dirs: Optional[List[str]] = None) -> List[str]:
+    """
+    site-packages 目录（默认为当前解释器的 purelib/platlib）及其 .pth 文件加入的目录
+
+    不用 sys.path：其中还有用户 site 和系统 site-packages，sync 不能卸载那里的发行版；
+    .pth 中的目录包含 setup.py develop 安装的源码目录。
+    """
+    if site_dirs is None:
+        paths = sysconfig.get_paths()
+        site_dirs = [paths['purelib'], paths['platlib']]
+    result = list(dict.fromkeys(site_dirs))
+    for site_dir in list(result):
+        for pth in sorted(Path(site_dir).glob('*.pth')):
+            try:
+                lines = pth.read_text().splitlines()
+            except (OSError, UnicodeDecodeError):
+                continue
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith(('#', 'import ', 'import\t')):
+                    continue
+                entry = os.path.normpath(os.path.join(site_dir, line))
+                if os.path.isdir(entry) and entry not in result:
+                    result.append(entry)
+    return result
+
+
+def installed_distributions(path: Optional[List[str]] = None) -> Dict[str, metadata.Distribution]:
+    """{规范化包名: 发行版}，默认为当前 venv 中安装的发行版（见 site_paths），path 指定时只看这些目录"""
+    found = {}
+    for dist in metadata.distributions(path=site_paths() if path is None else path):
+        name = dist.metadata['Name']
+        if name:
+            found.setdefault(normalize_name(name), dist)
+    return found
+
+
+def _keep_closure(installed: Dict[str, metadata.Distribution]) -> Set[str]:
+    """KEEP_DISTRIBUTIONS 及其已安装的依赖"""
+    keep: Set[str] = set()
+    stack = list(KEEP_DISTRIBUTIONS)
+    while stack:
+        key = stack.pop()
+        if key in keep:
+            continue
+        keep.add(key)
+        dist = installed.get(key)
+        for text in (dist.requires or []) if dist is not None else []:
+            req = parse_requirement(text)
+            if req is not None and req.applies():
+                stack.append(req.key)
+    return keep
+
+
+def _pip(args: List[str]) -> int:
+    return subprocess.run([sys.executable, '-m', 'pip'] + args).returncode
+
+
+def sync(lock_file: Path, engine_dir: Path = ENGINE_DIR, pip_args: Optional[List[str]] = None,
+         remove_extra: bool = True) -> Tuple[bool, List[Path]]:
+    """
+    按锁文件安装，不经过 pip resolver
+
+    返回 (是否成功, 锁文件中本地包的当前路径)，供调用方记录安装状态。
+    """
+    start = time.monotonic()
+    lock = read_lock(lock_file)
+    if lock.header.get('python') and lock.header['python'] != environment_tag():
+        log_warn(f"锁文件生成于 {lock.header['python']}，当前为 {environment_tag()}；哈希可能不匹配")
+    editables = relocate(lock, engine_dir)
+    missing = [p for p in editables if not p.is_dir()]
+    if missing:
+        log_error(f"锁文件中的本地包不存在: {', '.join(str(p) for p in missing)}")
+        return False, []
+
+    installed = installed_distributions()
+    ok = True
+    locked_names = {normalize_name(p.name) for p in lock.packages}
+
+    # 第三方依赖: 已安装相同版本的跳过，其余一次 pip 调用
+    todo = [p for p in lock.packages
+            if normalize_name(p.name) not in installed
+            or installed[normalize_name(p.name)].version != p.version]
+    log_info(f"第三方依赖: 锁定 {len(lock.packages)} 个，需安装 {len(todo)} 个")
+    if todo:
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='ovos-sync-', delete=False) as f:
+            for pkg in todo:
+                f.write(f"{pkg.name}=={pkg.version}" + ''.join(f" --hash={h}" for h in pkg.hashes) + '\n')
+            req_file = f.name
+        try:
+            ok = _pip(['install', '--no-deps', '--require-hashes', '-r', req_file] + list(pip_args or [])) == 0
+        finally:
+            os.unlink(req_file)
+
+    # 本地包: 已从同一路径 editable 安装的跳过
+    local_names: Set[str] = set()
+    stale = []
+    for path in editables:
+        dist = next((d for d in installed.values() if editable_location(d) == os.path.normpath(path)), None)
+        if dist is not None:
+            local_names.add(normalize_name(dist.metadata['Name']))
+        else:
+            stale.append(path)
+    log_info(f"本地包: 锁定 {len(editables)} 个，需安装 {len(stale)} 个")
+    if ok and stale:
+        # 与其他安装器一致使用 --no-build-isolation：构建依赖取自 venv，不再从索引下载
+        args = ['install', '--no-deps', '--no-build-isolation']
+        for path in stale:
+            args += ['-e', str(path)]
+        ok = _pip(args + list(pip_args or [])) == 0
+
+    if ok and remove_extra:
+        installed = installed_distributions()
+        local_names |= {key for key, dist in installed.items()
+                        if editable_location(dist) in {os.path.normpath(p) for p in editables}}
+        keep = _keep_closure(installed)
+        extra = sorted(key for key in installed
+                       if key not in locked_names and key not in local_names and key not in keep)
+        if extra:
+            log_info(f"卸载锁文件以外的 {len(extra)} 个发行版: {', '.join(extra)}")
+            ok = _pip(['uninstall', '-y'] + extra) == 0
+
+    elapsed = time.monotonic() - start
+    if ok:
+        log_success(f"已按锁文件同步 ({lock_file.name})，耗时 {elapsed:.1f}s")
+    else:
+        log_error(f"按锁文件同步失败，耗时 {elapsed:.1f}s")
+    return ok, editables
@@ -0,0 +1,634 @@
+#!/usr/bin/env python3
+"""
+engine 包索引
+
+一次遍历 engine 目录（通过 tree_scan 跳过 venv、.git、构建产物等目录，
+最深到 engine/<group>/<package>，到包根目录即停止深入），
+记录每个包的名称、路径、分组（engine-core、engine-plugins ...）、
+requirements/constraints 文件、提供的顶层模块、构建依赖（[build-system].requires）
+以及 setup.py / pyproject.toml (PEP 621) 元数据，
+并以 JSON 形式持久化到 engine/.package_index.json。
+
+rewrite_requirements.py、validate_requirements.py、
+clean_constrains.py、clean_requirements.py 和 install-dev-full.py 的
+DependencyAnalyzer 都从这里加载包信息，不再各自遍历整个目录树。
+
+索引记录遍历过的每个非包目录的子目录列表：这些列表未变时直接复用上次的遍历结果；
+元数据文件 mtime/大小未变的包直接复用上次的解析结果。setup.py 通过
+required('requirements/...') 等方式引用的 requirements 文件（含 -r 包含）
+也计入这些文件，由 requirements_parser 按 PEP 508 解析。
+
+用法:
+  python3 package_index.py                 # 刷新并输出索引摘要
+  python3 package_index.py --rebuild       # 忽略已有索引，重新遍历
+  python3 package_index.py --json          # 以 JSON 输出索引
+"""
+
+import argparse
+import ast
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    try:
+        import tomli as tomllib
+    except ImportError:  # 没有 TOML 解析器时跳过 pyproject.toml 元数据
+        tomllib = None
+
+from requirements_parser import RequirementsFile, parse_requirement, read_requirements
+from tree_scan import PACKAGE_DEPTH, TreeScanner
+
+# 索引文件（相对于 engine 目录）
+INDEX_FILE = '.package_index.json'
+# 索引格式版本，格式或解析逻辑变化时递增以整体失效旧索引
+INDEX_VERSION = 5
+
+# 标识包根目录的文件
+PACKAGE_MARKERS = ('setup.py', 'pyproject.toml')
+# 元数据文件，变化时需要重新解析该包
+METADATA_FILES = ('setup.py', 'setup.cfg', 'pyproject.toml')
+# 没有 [build-system] 时 pip 使用的构建依赖（PEP 517 默认值）
+DEFAULT_BUILD_REQUIRES = ['setuptools>=40.8.0', 'wheel']
+# 包根目录（或 src/）下不视为可导入模块的目录和文件
+_NON_MODULES = {'test', 'tests', 'docs', 'examples', 'setup.py', 'conftest.py', 'noxfile.py'}
+
+
+# ---------------------------------------------------------------------------
+# setup.py AST 解析
+# ---------------------------------------------------------------------------
+
+# requirements 文件名的后缀，用于识别 setup.py 中读取依赖文件的函数调用
+_REQ_FILE_SUFFIXES = ('.txt', '.in')
+# 解析 setup.py 时变量/函数间接引用的最大层数
+_MAX_RESOLVE_DEPTH = 8
+
+
+class _SetupContext:
+    """解析单个 setup.py 时的上下文"""
+
+    def __init__(self, setup_file: Path, tree: ast.Module):
+        self.setup_dir = setup_file.parent
+        # 模块级赋值 {变量名: 值节点} 与函数定义 {函数名: FunctionDef}
+        self.assigns: Dict[str, ast.AST] = {}
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        for node in tree.body:
+            if isinstance(node, ast.Assign) and len(node.targets) == 1 \
+                    and isinstance(node.targets[0], ast.Name):
+                self.assigns[node.targets[0].id] = node.value
+            elif isinstance(node, ast.FunctionDef):
+                self.functions[node.name] = node
+
+
+def parse_setup_py(setup_file: Path) -> List[Dict]:
+    """
+    使用 AST 解析单个 setup.py，返回其中 setup() 调用声明的包信息
+
+    install_requires/extras_require 支持字面量列表、模块级变量、列表拼接，
+    以及 required('requirements/requirements.txt') 这类读取 requirements 文件的调用
+    （会跟随文件中的 -r 包含）。每个结果包含:
+      name, version, dependencies（PEP 508 字符串）,
+      local_paths（-e 等本地包的绝对路径）, files（读取过的 requirements 文件）
+    """
+    with open(setup_file) as f:
+        content = f.read()
+
+    try:
+        tree = ast.parse(content)
+    except SyntaxError:
+        return []
+
+    ctx = _SetupContext(setup_file, tree)
+
+    # 查找 setup() 调用
+    results = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            func = node.func
+            if (isinstance(func, ast.Name) and func.id == 'setup') or \
+                    (isinstance(func, ast.Attribute) and func.attr == 'setup'):
+                info = _extract_setup_info(node, ctx)
+                if info:
+                    results.append(info)
+    return results
+
+
+def _extract_setup_info(setup_call: ast.Call, ctx: _SetupContext) -> Optional[Dict]:
+    """从 setup() 调用中提取信息"""
+    pkg_name = None
+    version = None
+    reqs = RequirementsFile()
+    resolved = False
+
+    for keyword in setup_call.keywords:
+        if keyword.arg == 'name':
+            pkg_name = _get_string_value(keyword.value, ctx)
+        elif keyword.arg == 'version':
+            version = _get_string_value(keyword.value, ctx)
+        elif keyword.arg == 'install_requires':
+            resolved = _collect_requirements(keyword.value, ctx, reqs) or resolved
+        elif keyword.arg == 'extras_require':
+            # 处理 extras_require 中的所有依赖
+            _collect_extras(keyword.value, ctx, reqs)
+
+    if not pkg_name:
+        return None
+
+    if not resolved:
+        # install_requires 无法静态解析时，退回到包内约定的 requirements 文件
+        for candidate in ('requirements.txt', 'requirements/requirements.txt'):
+            if (ctx.setup_dir / candidate).is_file():
+                read_requirements(ctx.setup_dir / candidate, reqs)
+                break
+
+    return {
+        'name': pkg_name,
+        'version': version,
+        'dependencies': [str(req) for req in reqs.requirements],
+        'local_paths': [str(p) for p in reqs.local_paths],
+        'files': [str(f) for f in reqs.files + reqs.missing],
+    }
+
+
+def _get_string_value(node, ctx: Optional[_SetupContext] = None, depth: int = 0):
+    """提取字符串字面值（支持引用模块级字符串变量）"""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name) and ctx is not None and depth < _MAX_RESOLVE_DEPTH \
+            and node.id in ctx.assigns:
+        return _get_string_value(ctx.assigns[node.id], ctx, depth + 1)
+    return None
+
+
+def _collect_requirements(node, ctx: _SetupContext, reqs: RequirementsFile, depth: int = 0) -> bool:
+    """
+    把 install_requires 表达式中的依赖收集到 reqs
+
+    返回是否成功静态解析（字面量、变量或可识别的文件读取调用）。
+    """
+    if depth > _MAX_RESOLVE_DEPTH:
+        return False
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        if not node.value.startswith('-e'):  # 跳过 -e 行
+            req = parse_requirement(node.value)
+            if req:
+                reqs.requirements.append(req)
+        return True
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        for elt in node.elts:
+            _collect_requirements(elt.value if isinstance(elt, ast.Starred) else elt, ctx, reqs, depth + 1)
+        return True
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left = _collect_requirements(node.left, ctx, reqs, depth + 1)
+        right = _collect_requirements(node.right, ctx, reqs, depth + 1)
+        return left or right
+    if isinstance(node, ast.Name):
+        if node.id in ctx.assigns:
+            return _collect_requirements(ctx.assigns[node.id], ctx, reqs, depth + 1)
+        return False
+    if isinstance(node, ast.Call):
+        files = _requirement_files_of_call(node, ctx)
+        for rel in files:
+            read_requirements(ctx.setup_dir / rel, reqs)
+        return bool(files)
+    return False
+
+
+def _collect_extras(node, ctx: _SetupContext, reqs: RequirementsFile, depth: int = 0):
+    """提取 extras_require 中的所有依赖"""
+    if isinstance(node, ast.Name) and node.id in ctx.assigns and depth < _MAX_RESOLVE_DEPTH:
+        _collect_extras(ctx.assigns[node.id], ctx, reqs, depth + 1)
+    elif isinstance(node, ast.Dict):
+        for value in node.values:
+            _collect_requirements(value, ctx, reqs)
+
+
+def _requirement_files_of_call(call: ast.Call, ctx: _SetupContext) -> List[str]:
+    """
+    识别读取 requirements 文件的调用，返回文件路径（相对 setup.py 所在目录）
+
+    支持 required('requirements/x.txt')、
+    get_requirements(os.path.join(BASEDIR, 'requirements', 'x.txt'))、
+    open('requirements.txt').read().splitlines()，
+    以及无参数、但函数体中写死了文件名的本地辅助函数。
+    """
+    for arg in call.args:
+        path = _literal_path(arg, ctx)
+        if path and path.endswith(_REQ_FILE_SUFFIXES):
+            return [path]
+
+    func = call.func
+    if isinstance(func, ast.Attribute):
+        # open(...).read().splitlines() 之类的链式调用
+        inner = func.value
+        while isinstance(inner, ast.Attribute):
+            inner = inner.value
+        if isinstance(inner, ast.Call):
+            return _requirement_files_of_call(inner, ctx)
+    elif isinstance(func, ast.Name) and func.id in ctx.functions and not call.args:
+        files = []
+        for node in ast.walk(ctx.functions[func.id]):
+            if isinstance(node, ast.Call):
+                files.extend(f for f in _requirement_files_of_call(node, ctx) if f not in files)
+        return files
+    return []
+
+
+def _literal_path(node, ctx: _SetupContext) -> Optional[str]:
+    """字符串字面值或 os.path.join(...) 中的字面部分拼成的路径"""
+    value = _get_string_value(node, ctx)
+    if value is not None:
+        return value
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'join':
+        parts = [_get_string_value(arg, ctx) for arg in node.args]
+        parts = [part for part in parts if part is not None]
+        if parts:
+            return os.path.join(*parts)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# pyproject.toml (PEP 621) 解析
+# ---------------------------------------------------------------------------
+
+def parse_pyproject(pyproject_file: Path) -> List[Dict]:
+    """
+    解析 pyproject.toml 中的 [project] 表（PEP 621），返回与 parse_setup_py 相同结构的包信息
+
+    dependencies 与 optional-dependencies 合并为依赖列表；声明为 dynamic 的
+    dependencies/optional-dependencies 从 [tool.setuptools.dynamic] 引用的
+    requirements 文件读取。没有 [project].name（例如只配置构建后端）时返回空列表。
+    """
+    if tomllib is None:
+        print(f"⚠ 没有可用的 TOML 解析器（Python < 3.11 需要 tomli），跳过 {pyproject_file}",
+              file=sys.stderr)
+        return []
+
+    with open(pyproject_file, 'rb') as f:
+        try:
+            data = tomllib.load(f)
+        except tomllib.TOMLDecodeError:
+            return []
+
+    project = data.get('project')
+    if not isinstance(project, dict) or not isinstance(project.get('name'), str):
+        return []
+
+    reqs = RequirementsFile()
+    for dep in project.get('dependencies', []):
+        req = parse_requirement(dep)
+        if req:
+            reqs.requirements.append(req)
+    for deps in project.get('optional-dependencies', {}).values():
+        for dep in deps:
+            req = parse_requirement(dep)
+            if req:
+                reqs.requirements.append(req)
+
+    # setuptools 的 dynamic 依赖: dependencies = {file = ["requirements.txt"]}
+    dynamic = data.get('tool', {}).get('setuptools', {}).get('dynamic', {})
+    dynamic_files = []
+    if 'dependencies' in project.get('dynamic', []):
+        dynamic_files += _dynamic_files(dynamic.get('dependencies'))
+    if 'optional-dependencies' in project.get('dynamic', []):
+        for spec in dynamic.get('optional-dependencies', {}).values():
+            dynamic_files += _dynamic_files(spec)
+    for rel in dynamic_files:
+        read_requirements(pyproject_file.parent / rel, reqs)
+
+    version = project.get('version')
+    return [{
+        'name': project['name'],
+        'version': version if isinstance(version, str) else None,
+        'dependencies': [str(req) for req in reqs.requirements],
+        'local_paths': [str(p) for p in reqs.local_paths],
+        'files': [str(f) for f in reqs.files + reqs.missing],
+    }]
+
+
+def parse_build_requires(pkg_dir: Path) -> List[str]:
+    """
+    隔离构建时 pip 需要安装的构建依赖
+
+    取 pyproject.toml 的 [build-system].requires；没有 pyproject.toml、没有该表或无法解析时
+    为 PEP 517 的默认值。
+    """
+    pyproject_file = pkg_dir / 'pyproject.toml'
+    if tomllib is None or not pyproject_file.is_file():
+        return list(DEFAULT_BUILD_REQUIRES)
+    try:
+        with open(pyproject_file, 'rb') as f:
+            requires = tomllib.load(f).get('build-system', {}).get('requires')
+    except (OSError, tomllib.TOMLDecodeError):
+        return list(DEFAULT_BUILD_REQUIRES)
+    if not isinstance(requires, list):
+        return list(DEFAULT_BUILD_REQUIRES)
+    return [req for req in requires if isinstance(req, str)]
+
+
+def _dynamic_files(spec) -> List[str]:
+    """[tool.setuptools.dynamic] 中 {file = ...} 引用的文件"""
+    if not isinstance(spec, dict):
+        return []
+    files = spec.get('file', [])
+    return [files] if isinstance(files, str) else list(files)
+
+
+# ---------------------------------------------------------------------------
+# 索引
+# ---------------------------------------------------------------------------
+
+class PackageIndex:
+    """engine 目录下所有本地包的索引"""
+
+    def __init__(self, engine_root, max_depth: Optional[int] = PACKAGE_DEPTH):
+        self.engine_root = Path(engine_root).absolute()
+        self.scanner = TreeScanner(self.engine_root, max_depth=max_depth, stop_at=self._is_package_root)
+        self.index_file = self.engine_root / INDEX_FILE
+        self.packages: Dict[str, Dict] = {}  # {相对路径: 包信息}
+        self.dirs: Dict[str, List[str]] = {}  # 遍历过的非包目录 {相对路径: 子目录名列表}
+        # 统计信息
+        self.walked = False
+        self.hits = 0
+        self.misses = 0
+        self.elapsed = 0.0
+
+    @classmethod
+    def load(cls, engine_root, use_cache: bool = True,
+             max_depth: Optional[int] = PACKAGE_DEPTH) -> 'PackageIndex':
+        """
+        加载索引
+
+        use_cache 为 True 时复用并更新持久化的索引，否则完全重新遍历且不写入文件。
+        max_depth 为包根目录相对 engine 的最大深度，None 表示不限制。
+        """
+        index = cls(engine_root, max_depth)
+        start = time.monotonic()
+
+        old = index._read() if use_cache else {}
+        old_packages = old.get('packages', {})
+
+        if (old and index._dirs_unchanged(old.get('dirs', {}))
+                and all(index._has_marker(rel) for rel in old_packages)):
+            index.dirs = old['dirs']
+            roots = sorted(old_packages)
+        else:
+            roots = index._walk()
+
+        for rel_path in roots:
+            entry = old_packages.get(rel_path)
+            if entry is not None and index._sources_unchanged(entry['sources']):
+                index.hits += 1
+            else:
+                index.misses += 1
+                entry = index._index_package(rel_path)
+            index.packages[rel_path] = entry
+
+        if use_cache and (index.walked or index.misses or not old):
+            index.save()
+
+        index.elapsed = time.monotonic() - start
+        return index
+
+    # -- 查询 ---------------------------------------------------------------
+
+    def __iter__(self):
+        return iter(self.packages.values())
+
+    def __len__(self):
+        return len(self.packages)
+
+    def abspath(self, entry: Dict) -> Path:
+        """包目录的绝对路径"""
+        return self.engine_root / entry['path']
+
+    def by_dir_name(self) -> Dict[str, Dict]:
+        """{包目录名: 包信息}"""
+        return {entry['dir']: entry for entry in self}
+
+    def by_module(self) -> Dict[str, Dict]:
+        """{顶层模块名: 包信息}"""
+        return {module: entry for entry in self for module in entry.get('modules', [])}
+
+    def find(self, name: str) -> Optional[Dict]:
+        """按包名或目录名查找（忽略大小写和 -/_ 差异）"""
+        key = _normalize(name)
+        for entry in self:
+            if _normalize(entry['name']) == key or _normalize(entry['dir']) == key:
+                return entry
+        return None
+
+    def requirement_files(self, requirements_dir_only: bool = False) -> List[Path]:
+        """所有包的 requirements 文件（绝对路径）"""
+        files = []
+        for entry in self:
+            for rel in entry['requirement_files']:
+                if requirements_dir_only and not rel.startswith('requirements/'):
+                    continue
+                files.append(self.abspath(entry) / rel)
+        return files
+
+    def summary(self) -> str:
+        """一行统计信息"""
+        how = self.scanner.stats.summary() if self.walked else "复用目录结构"
+        return (f"{len(self)} 个包，{how}，元数据命中 {self.hits}、重新解析 {self.misses}，"
+                f"总耗时 {self.elapsed * 1000:.0f}ms")
+
+    # -- 遍历与解析 ---------------------------------------------------------
+
+    @staticmethod
+    def _is_package_root(rel_path: str, filenames: List[str]) -> bool:
+        """包含 setup.py 或 pyproject.toml 的目录是包根目录，不再深入"""
+        return any(marker in filenames for marker in PACKAGE_MARKERS)
+
+    def _walk(self) -> List[str]:
+        """遍历 engine 目录，返回包根目录（相对路径）列表"""
+        self.walked = True
+        self.dirs = {}
+        roots = []
+
+        for rel, dirnames, filenames in self.scanner.walk():
+            if rel != '.' and self._is_package_root(rel, filenames):
+                roots.append(rel)
+            else:
+                self.dirs[rel] = list(dirnames) if dirnames else self.scanner.subdirs(rel)
+
+        return sorted(roots)
+
+    def _index_package(self, rel_path: str) -> Dict:
+        """收集单个包的文件和元数据"""
+        pkg_dir = self.engine_root / rel_path
+        parts = Path(rel_path).parts
+
+        requirement_files = []
+        if (pkg_dir / 'requirements.txt').is_file():
+            requirement_files.append('requirements.txt')
+        req_dir = pkg_dir / 'requirements'
+        if req_dir.is_dir():
+            requirement_files.extend(f"requirements/{f.name}" for f in sorted(req_dir.glob('*.txt')))
+
+        # [project] 表是权威元数据；没有时（或只有构建配置）再解析 setup.py
+        metadata = []
+        for marker, parse in (('pyproject.toml', parse_pyproject), ('setup.py', parse_setup_py)):
+            if metadata or not (pkg_dir / marker).is_file():
+                continue
+            try:
+                metadata = parse(pkg_dir / marker)
+            except Exception as e:
+                print(f"⚠ 解析 {pkg_dir / marker}: {e}", file=sys.stderr)
+
+        # setup.py / pyproject.toml 引用的 requirements 文件（含 -r 包含）改为相对 engine 的路径
+        for info in metadata:
+            info['local_paths'] = [os.path.relpath(p, self.engine_root) for p in info['local_paths']]
+            info['files'] = [os.path.relpath(p, self.engine_root) for p in info['files']]
+
+        sources = [pkg_dir, req_dir, pkg_dir / 'src'] + [pkg_dir / f for f in METADATA_FILES + ('constraints.txt',)]
+        sources += [pkg_dir / f for f in requirement_files]
+        sources += [self.engine_root / f for info in metadata for f in info['files']]
+
+        return {
+            'name': metadata[0]['name'] if metadata else pkg_dir.name,
+            'dir': pkg_dir.name,
+            'path': rel_path,
+            'group': parts[0] if len(parts) > 1 else '',
+            'markers': [m for m in PACKAGE_MARKERS if (pkg_dir / m).is_file()],
+            'requirement_files': requirement_files,
+            'constraints_file': 'constraints.txt' if (pkg_dir / 'constraints.txt').is_file() else None,
+            'metadata': metadata,
+            'build_requires': parse_build_requires(pkg_dir),
+            'modules': self._top_level_modules(pkg_dir),
+            'sources': self._stat(sources),
+        }
+
+    @staticmethod
+    def _top_level_modules(pkg_dir: Path) -> List[str]:
+        """包提供的顶层模块名（根目录或 src/ 下的包目录和 .py 文件）"""
+        modules = set()
+        for base in (pkg_dir, pkg_dir / 'src'):
+            try:
+                entries = list(os.scandir(base))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.name in _NON_MODULES or entry.name.startswith(('.', '_')):
+                    continue
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, '__init__.py')):
+                    modules.add(entry.name)
+                elif entry.is_file() and entry.name.endswith('.py'):
+                    modules.add(entry.name[:-3])
+        return sorted(modules)
+
+    def _stat(self, paths: List[Path]) -> Dict[str, Optional[List[int]]]:
+        """记录文件/目录的 mtime 和大小，不存在的记为 None"""
+        result = {}
+        for p in paths:
+            rel = os.path.relpath(p, self.engine_root)
+            try:
+                st = p.stat()
+                result[rel] = [st.st_mtime_ns, st.st_size if p.is_file() else 0]
+            except OSError:
+                result[rel] = None
+        return result
+
+    def _sources_unchanged(self, sources: Dict[str, Optional[List[int]]]) -> bool:
+        """包的元数据文件是否都未变化"""
+        current = self._stat([self.engine_root / rel for rel in sources])
+        return current == sources
+
+    def _dirs_unchanged(self, dirs: Dict[str, List[str]]) -> bool:
+        """
+        上次遍历过的非包目录的子目录列表是否都未变化，且都没有变成包根目录
+
+        只比较子目录而不是目录 mtime，engine 根目录下写入缓存、日志等文件不会让索引失效。
+        """
+        if not dirs:
+            return False
+        for rel, subdirs in dirs.items():
+            try:
+                if self.scanner.subdirs(rel) != subdirs:
+                    return False
+            except OSError:
+                return False
+            # 例如未初始化的子模块目录在 git submodule update 之后变成包根目录
+            if rel != '.' and self._has_marker(rel):
+                return False
+        return True
+
+    def _has_marker(self, rel_path: str) -> bool:
+        """目录中是否有 setup.py 或 pyproject.toml"""
+        return any((self.engine_root / rel_path / marker).is_file() for marker in PACKAGE_MARKERS)
+
+    # -- 持久化 -------------------------------------------------------------
+
+    def _read(self) -> Dict:
+        """读取持久化的索引，格式不符时视为空"""
+        try:
+            with open(self.index_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('version') != INDEX_VERSION:
+            return {}
+        return data
+
+    def save(self):
+        """原子写入索引文件"""
+        tmp_file = self.index_file.with_name(self.index_file.name + '.tmp')
+        data = {'version': INDEX_VERSION, 'dirs': self.dirs, 'packages': self.packages}
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            print(f"⚠ 无法写入包索引 {self.index_file}: {e}", file=sys.stderr)
+
+    def clear(self):
+        """删除持久化的索引"""
+        if self.index_file.exists():
+            self.index_file.unlink()
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace('_', '-').replace('.', '-')
+
+
+def load_index(engine_root, use_cache: bool = True) -> PackageIndex:
+    """加载 engine_root 的包索引（便捷函数）"""
+    return PackageIndex.load(engine_root, use_cache=use_cache)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='构建并输出 engine 包索引')
+    parser.add_argument('--engine-root', default=str(Path(__file__).parent.absolute()),
+                        help='engine 目录 (默认: %(default)s)')
+    parser.add_argument('--rebuild', action='store_true', help='忽略已有索引，重新遍历和解析')
+    parser.add_argument('--json', action='store_true', help='以 JSON 输出所有包信息')
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        PackageIndex(args.engine_root).clear()
+    index = load_index(args.engine_root)
+
+    if args.json:
+        json.dump(list(index), sys.stdout, indent=2)
+        print()
+        return 0
+
+    groups: Dict[str, int] = {}
+    for entry in index:
+        groups[entry['group']] = groups.get(entry['group'], 0) + 1
+    for group, count in sorted(groups.items()):
+        print(f"  {group or '.':<20} {count:>4} 个包")
+    print(f"包索引: {index.summary()}")
+    print(f"索引文件: {index.index_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+批量 pip 安装
+
+把多个本地包合并成一个 requirements 集合（每个包一条 -e 记录），
+再加上各包生成的 constraints.txt，交给一次 pip 调用完成安装，
+避免每个包都重新启动 pip、重新导入并初始化解析器。
+
+pip 失败时通过解析其输出把错误归因到具体的包，剔除这些包后再对剩余的包
+重试一次批量安装；实在无法归因时退回逐个安装，保证每个包都有明确的结果。
+
+用法:
+  python3 pip_batch.py PKG_DIR [PKG_DIR ...]
+  python3 pip_batch.py --constraint constraints.txt engine-core/ovos-core ...
+"""
+
+import argparse
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from install_trace import InstallTracer
+from requirements_parser import normalize_name
+from wheelhouse import pip_args_for_packages
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+# 批量安装最多尝试的 pip 调用次数（之后对剩余的包逐个安装）
+MAX_BATCH_ROUNDS = 3
+
+_OBTAINING_RE = re.compile(r'^Obtaining file://(\S+)')
+_METADATA_ERROR_RE = re.compile(r"(metadata-generation-failed|Preparing .*metadata .*error|"
+                                r"Getting requirements to build .* did not run successfully)")
+_FAILED_BUILD_RE = re.compile(r'Failed (?:building|to build) (?:editable|wheel)? ?for ([A-Za-z0-9._-]+)')
+_FAILED_TO_BUILD_RE = re.compile(r'Failed to build (?:installable wheels for some pyproject\.toml based projects \()?([A-Za-z0-9._, -]+)\)?$')
+_FROM_RE = re.compile(r'\(from ([A-Za-z0-9._-]+)')
+# 只有这些错误块中的 "(from X)" 表示 X 的依赖无法满足；普通的 "Collecting Y (from X)" 进度行不算
+_NOT_FOUND_RE = re.compile(r'^ERROR: (Could not find a version|No matching distribution)')
+_COLLECTING_RE = re.compile(r'^Collecting ([A-Za-z0-9._-]+).*?\(from ([A-Za-z0-9._-]+)')
+_DEPENDS_ON_RE = re.compile(r'^\s+([A-Za-z0-9._-]+) \S+ depends on ')
+
+
+class BatchResult:
+    """批量安装结果"""
+
+    def __init__(self):
+        self.installed: List[str] = []
+        self.failed: List[Tuple[str, str]] = []  # (包名, 错误输出)
+        self.pip_calls = 0
+        self.elapsed = 0.0
+
+
+class BatchInstaller:
+    """把一组本地包交给尽量少的 pip 调用安装"""
+
+    def __init__(self, constraints: Optional[List[Path]] = None,
+                 pip_args: Optional[List[str]] = None, cwd: Optional[Path] = None,
+                 tracer: Optional[InstallTracer] = None):
+        self.constraints = list(constraints or [])
+        self.pip_args = list(pip_args or [])
+        self.cwd = cwd
+        self.tracer = tracer or InstallTracer.from_env('pip_batch')
+
+    def install(self, packages: List[Tuple[str, Path]]) -> BatchResult:
+        """安装 packages（[(包名, 路径)]），返回每个包的结果"""
+        result = BatchResult()
+        start = time.monotonic()
+        pending = list(packages)
+
+        while pending and result.pip_calls < MAX_BATCH_ROUNDS:
+            log_info(f"批量安装 {len(pending)} 个包（第 {result.pip_calls + 1} 次 pip 调用）...")
+            returncode, output = self._run_pip(pending)
+            result.pip_calls += 1
+
+            if returncode == 0:
+                result.installed.extend(name for name, _ in pending)
+                pending = []
+                break
+
+            culprits = attribute_failures(output, pending)
+            if not culprits:
+                log_warn("无法从 pip 输出中定位失败的包，改为逐个安装")
+                break
+
+            for name, _ in pending:
+                if name in culprits:
+                    log_error(f"安装失败: {name}")
+                    result.failed.append((name, culprits[name]))
+            pending = [(name, path) for name, path in pending if name not in culprits]
+
+        # 剩余无法批量完成的包逐个安装，保证失败归因准确
+        for name, path in pending:
+            returncode, output = self._run_pip([(name, path)])
+            result.pip_calls += 1
+            if returncode == 0:
+                result.installed.append(name)
+            else:
+                log_error(f"安装失败: {name}")
+                result.failed.append((name, output))
+
+        for name in result.installed:
+            log_success(f"已安装: {name}")
+
+        result.elapsed = time.monotonic() - start
+        log_info(f"批量安装完成: 成功 {len(result.installed)}，失败 {len(result.failed)}，"
+                 f"pip 调用 {result.pip_calls} 次，耗时 {result.elapsed:.1f}s")
+        return result
+
+    def _run_pip(self, packages: List[Tuple[str, Path]]) -> Tuple[int, str]:
+        """用一个临时 requirements/constraints 文件运行一次 pip"""
+        local_names = {normalize_name(name) for name, _ in packages}
+
+        with tempfile.TemporaryDirectory(prefix='ovos-batch-') as tmp:
+            req_file = Path(tmp) / 'requirements.txt'
+            req_file.write_text(''.join(f"-e {path}\n" for _, path in packages))
+
+            cmd = [sys.executable, '-m', 'pip', 'install', '--no-build-isolation',
+                   '-r', str(req_file)] + self.pip_args
+
+            constraints = merge_constraints(self.constraints, local_names)
+            if constraints:
+                con_file = Path(tmp) / 'constraints.txt'
+                con_file.write_text(''.join(line + '\n' for line in constraints))
+                cmd += ['-c', str(con_file)]
+
+            if len(packages) == 1:
+                name, path = packages[0]
+                proc = self.tracer.run(cmd, name, path=path, cwd=self.cwd)
+            else:
+                proc = self.tracer.run(cmd, f"batch:{packages[0][0]}...", cwd=self.cwd,
+                                       packages=[name for name, _ in packages])
+        return proc.returncode, proc.stdout
+
+
+def merge_constraints(files: List[Path], exclude: Set[str]) -> List[str]:
+    """
+    合并多个 constraints 文件
+
+    批量中的本地包已经作为 -e 记录出现，它们的约束（通常是 file:// 链接）会与
+    editable 记录冲突，因此排除 exclude 中的包名；重复的行只保留一份。
+    -e、-r、--index-url 等选项行会作用于整个批量安装，跳过并给出警告。
+    """
+    lines = []
+    seen = set()
+    for con_file in files:
+        try:
+            content = Path(con_file).read_text()
+        except OSError:
+            continue
+        for line in content.splitlines():
+            line = line.strip()
+            if not line or line.startswith('#') or line in seen:
+                continue
+            if line.startswith('-'):
+                log_warn(f"忽略 {con_file} 中的选项行: {line}")
+                seen.add(line)
+                continue
+            name = re.split(r'[\s<>=!~;@\[]', line, maxsplit=1)[0]
+            if normalize_name(name) in exclude:
+                continue
+            seen.add(line)
+            lines.append(line)
+    return lines
+
+
+def attribute_failures(output: str, packages: List[Tuple[str, Path]]) -> Dict[str, str]:
+    """
+    从 pip 输出中找出导致失败的本地包
+
+    识别以下几类信息:
+      - 构建/元数据生成失败时最近一次 "Obtaining file://..." 对应的包
+      - "Failed building editable for X" / "Failed to build X"；X 是第三方包时，
+        沿 "Collecting X (from Y)" 找到引入它的本地包
+      - "Could not find a version ... (from X...)" 错误块中的 X（同样沿依赖链回溯）
+      - 解析冲突 "X 1.0 depends on ..." 中的 X
+    返回 {包名: 相关输出片段}，无法归因时返回空字典。
+    """
+    by_name = {normalize_name(name): name for name, _ in packages}
+    by_path = {str(Path(path).resolve()): name for name, path in packages}
+    lines = output.splitlines()
+    culprits: Dict[str, str] = {}
+
+    requested_by: Dict[str, str] = {}   # 第三方包 -> 引入它的包（规范化名）
+
+    def local_owner(name: str) -> Optional[str]:
+        key = normalize_name(name)
+        seen = set()
+        while key not in by_name and key in requested_by and key not in seen:
+            seen.add(key)
+            key = requested_by[key]
+        return by_name.get(key)
+
+    def blame(name: Optional[str], index: int):
+        if name and name not in culprits:
+            culprits[name] = '\n'.join(lines[max(0, index - 10):index + 5])
+
+    current = None
+    in_not_found = False
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        m = _OBTAINING_RE.match(stripped)
+        if m:
+            current = by_path.get(str(Path(m.group(1)).resolve()))
+            in_not_found = False
+            continue
+
+        m = _COLLECTING_RE.match(stripped)
+        if m:
+            requested_by.setdefault(normalize_name(m.group(1)), normalize_name(m.group(2)))
+            in_not_found = False
+            continue
+
+        if _NOT_FOUND_RE.match(stripped):
+            in_not_found = True
+        elif not stripped:
+            in_not_found = False
+
+        if _METADATA_ERROR_RE.search(line):
+            blame(current, i)
+
+        m = _DEPENDS_ON_RE.search(line)
+        if m:
+            blame(by_name.get(normalize_name(m.group(1))), i)
+
+        if in_not_found:
+            m = _FROM_RE.search(line)
+            if m:
+                blame(local_owner(m.group(1)), i)
+
+        m = _FAILED_BUILD_RE.search(line)
+        if m:
+            blame(local_owner(m.group(1)), i)
+
+        m = _FAILED_TO_BUILD_RE.search(stripped)
+        if m:
+            for name in re.split(r'[\s,]+', m.group(1)):
+                if name:
+                    blame(local_owner(name), i)
+
+    return culprits
+
+
+def main(argv=None):
+    """命令行入口，供 dev.sh 等 shell 脚本调用"""
+    parser = argparse.ArgumentParser(description='用一次 pip 调用批量 editable 安装多个本地包')
+    parser.add_argument('packages', nargs='+', help='包目录')
+    parser.add_argument('-c', '--constraint', action='append', default=[],
+                        help='额外的 constraints 文件，可重复；各包目录下的 constraints.txt 会自动加入')
+    parser.add_argument('--force-reinstall', action='store_true', help='传递给 pip 的 --force-reinstall')
+    parser.add_argument('--no-wheelhouse', action='store_true', help='不使用本地 wheelhouse')
+    args = parser.parse_args(argv)
+
+    packages = []
+    constraints = [Path(c) for c in args.constraint]
+    for pkg_dir in args.packages:
+        pkg_path = Path(pkg_dir).resolve()
+        packages.append((pkg_path.name, pkg_path))
+        if (pkg_path / 'constraints.txt').exists():
+            constraints.append(pkg_path / 'constraints.txt')
+
+    pip_args = ['--force-reinstall'] if args.force_reinstall else []
+    if not args.no_wheelhouse:
+        pip_args += pip_args_for_packages([path for _, path in packages])
+    result = BatchInstaller(constraints, pip_args).install(packages)
+
+    for name, error in result.failed:
+        print(f"  - {name}")
+        for line in error.split('\n')[-5:]:
+            if line.strip():
+                print(f"    {line}")
+
+    return 0 if not result.failed else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+插件 entry point 清单
+
+OVOS 服务通过扫描已安装发行版的 entry points 查找插件（ovos_plugin_manager 的
+find_plugins 等），每个服务启动时都要读取 venv 中所有发行版的元数据；
+engine/engine-plugins 下约 60 个插件以 editable 方式安装后，这一扫描在每个服务里重复一次。
+
+安装器（install-dev-full.py、install-workspaces.py）安装完成后调用 write_manifest()，
+把插件相关的 entry point 分组（ovos.*、opm.*、mycroft.*、neon.*、hivemind.*）写入
+engine/.plugin_manifest.json：
+
+  {"version": 1, "fingerprint": {...}, "generated_at": ...,
+   "groups": {"mycroft.plugin.stt": [{"name": ..., "value": "module:attr", "dist": ..., "version": ...}]}}
+
+fingerprint 记录安装状态（.install_state.json 的哈希、venv 前缀、site-packages 目录的
+mtime）；任何一次 pip 安装/卸载都会改变 site-packages 目录的 mtime，清单随之失效。
+
+bin/ovos-dev 在清单有效时导出 OVOS_PLUGIN_MANIFEST，并把 plugin_manifest_hook/
+加入 PYTHONPATH：其中的 sitecustomize 在服务启动时调用 install_hook()，
+importlib.metadata.entry_points(group=...) 查询清单中的插件分组时直接返回清单内容，
+不再扫描元数据。清单失效时不安装钩子，服务照常扫描。
+
+用法:
+  python3 plugin_manifest.py build             # 重新生成清单
+  python3 plugin_manifest.py ensure            # 清单失效时重新生成，输出清单路径
+  python3 plugin_manifest.py check             # 清单有效时退出码为 0
+  python3 plugin_manifest.py bench [--repeat 20]   # 对比扫描元数据与读取清单的耗时
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import sysconfig
+import time
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+ENGINE_DIR = Path(__file__).parent.absolute()
+MANIFEST_FILE = ENGINE_DIR / '.plugin_manifest.json'
+ENV_MANIFEST = 'OVOS_PLUGIN_MANIFEST'
+MANIFEST_VERSION = 1
+# install-dev-full.py 的安装状态文件
+INSTALL_STATE_FILE = ENGINE_DIR / '.install_state.json'
+# 清单收录的 entry point 分组前缀
+PLUGIN_GROUP_PREFIXES = ('ovos', 'opm.', 'mycroft.', 'neon.', 'hivemind.')
+
+
+def fingerprint() -> Dict:
+    """当前解释器的安装状态；与清单中记录的不同时清单失效"""
+    try:
+        state = hashlib.sha256(INSTALL_STATE_FILE.read_bytes()).hexdigest()
+    except OSError:
+        state = None
+    paths = sysconfig.get_paths()
+    site_dirs = {}
+    for site_dir in sorted({paths['purelib'], paths['platlib']}):
+        try:
+            site_dirs[site_dir] = os.stat(site_dir).st_mtime_ns
+        except OSError:
+            site_dirs[site_dir] = None
+    return {'prefix': sys.prefix, 'install_state': state, 'site_dirs': site_dirs}
+
+
+def is_plugin_group(group: str) -> bool:
+    return group.startswith(PLUGIN_GROUP_PREFIXES)
+
+
+def scan_entry_points() -> Dict[str, List[Dict]]:
+    """扫描所有已安装发行版的插件 entry points"""
+    groups: Dict[str, List[Dict]] = {}
+    seen = set()
+    for dist in metadata.distributions():
+        dist_name = dist.metadata['Name']
+        for ep in dist.entry_points:
+            # 同一发行版出现在多个路径时（例如 editable 的 .egg-info 与 dist-info）只取第一个
+            key = (ep.group, ep.name, ep.value)
+            if not is_plugin_group(ep.group) or key in seen:
+                continue
+            seen.add(key)
+            groups.setdefault(ep.group, []).append({
+                'name': ep.name, 'value': ep.value,
+                'dist': dist_name, 'version': dist.version,
+            })
+    for entries in groups.values():
+        entries.sort(key=lambda e: (e['name'], e['value']))
+    return dict(sorted(groups.items()))
+
+
+def write_manifest(manifest_file: Path = MANIFEST_FILE) -> Dict:
+    """生成清单并原子写入"""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.executable,
+        'fingerprint': fingerprint(),
+        'groups': scan_entry_points(),
+    }
+    tmp_file = manifest_file.with_name(manifest_file.name + '.tmp')
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
+    return manifest
+
+
+def update_after_install():
+    """安装器在安装结束（并保存安装状态）后调用，重新生成清单；失败只告警"""
+    try:
+        manifest = write_manifest()
+    except Exception as e:
+        log_warn(f"无法生成插件清单: {e}")
+        return
+    plugins = sum(len(entries) for entries in manifest['groups'].values())
+    log_info(f"插件清单已更新: {plugins} 个插件，{len(manifest['groups'])} 个分组")
+
+
+def load_manifest(manifest_file: Path = MANIFEST_FILE, check: bool = True) -> Optional[Dict]:
+    """读取清单；不存在、损坏或（check 时）已失效返回 None"""
+    try:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    if check and manifest.get('fingerprint') != fingerprint():
+        return None
+    return manifest
+
+
+def ensure_manifest(manifest_file: Path = MANIFEST_FILE) -> Dict:
+    """返回有效的清单，失效时重新生成"""
+    return load_manifest(manifest_file) or write_manifest(manifest_file)
+
+
+def manifest_entry_points(manifest: Dict, group: str) -> List[metadata.EntryPoint]:
+    return [metadata.EntryPoint(e['name'], e['value'], group) for e in manifest['groups'].get(group, [])]
+
+
+def install_hook(manifest_file: Optional[str] = None) -> bool:
+    """
+    让 importlib.metadata.entry_points(group=...) 对插件分组直接返回清单内容
+
+    清单失效时不安装，返回 False。其他调用方式（不带 group、带 name 等）仍交给原函数。
+    清单返回的 EntryPoint 没有关联的 dist。
+    """
+    manifest_file = manifest_file or os.environ.get(ENV_MANIFEST)
+    manifest = load_manifest(Path(manifest_file)) if manifest_file else None
+    if manifest is None:
+        return False
+
+    def patch(module):
+        original = module.entry_points
+
+        def entry_points(**params):
+            group = params.get('group')
+            if set(params) == {'group'} and is_plugin_group(group):
+                eps = manifest_entry_points(manifest, group)
+                return metadata.EntryPoints(eps) if hasattr(metadata, 'EntryPoints') else eps
+            return original(**params)
+
+        entry_points.__wrapped__ = original
+        module.entry_points = entry_points
+
+    patch(metadata)
+    try:
+        import importlib_metadata  # ovos_plugin_manager 在可用时优先使用它
+    except ImportError:
+        pass
+    else:
+        patch(importlib_metadata)
+    return True
+
+
+def bench(repeat: int):
+    """对比扫描元数据与读取清单查找全部插件分组的耗时"""
+    manifest = ensure_manifest()
+    groups = list(manifest['groups'])
+    plugins = sum(len(entries) for entries in manifest['groups'].values())
+    log_info(f"{plugins} 个插件，{len(groups)} 个分组，重复 {repeat} 次取中位数")
+
+    def scan():
+        for group in groups:
+            if sys.version_info >= (3, 10):
+                metadata.entry_points(group=group)
+            else:
+                metadata.entry_points().get(group, [])
+
+    def from_manifest():
+        loaded = load_manifest()
+        for group in groups:
+            manifest_entry_points(loaded, group)
+
+    results = {}
+    for label, func in (('扫描元数据', scan), ('读取清单', from_manifest)):
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        results[label] = statistics.median(samples)
+        print(f"  {label:10} {results[label] * 1000:8.2f}ms")
+    if results['读取清单'] > 0:
+        log_success(f"读取清单快 {results['扫描元数据'] / results['读取清单']:.1f} 倍")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='插件 entry point 清单')
+    parser.add_argument('command', choices=['build', 'ensure', 'check', 'bench'], help='操作')
+    parser.add_argument('--repeat', type=int, default=20, help='bench 的重复次数 (默认: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        manifest = write_manifest()
+        plugins = sum(len(entries) for entries in manifest['groups'].values())
+        log_success(f"插件清单: {plugins} 个插件，{len(manifest['groups'])} 个分组 -> {MANIFEST_FILE}")
+    elif args.command == 'ensure':
+        ensure_manifest()
+        print(MANIFEST_FILE)
+    elif args.command == 'check':
+        return 0 if load_manifest() is not None else 1
+    else:
+        bench(args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
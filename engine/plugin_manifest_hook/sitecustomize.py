@@ -0,0 +1,39 @@
+"""
+服务启动时安装插件清单钩子（见 engine/plugin_manifest.py）
+
+bin/ovos-dev 在插件清单有效时导出 OVOS_PLUGIN_MANIFEST 并把本目录加入 PYTHONPATH。
+本文件会遮蔽解释器自带的 sitecustomize（例如 Debian 的），因此最后转交给它。
+"""
+
+import os
+import sys
+
+_HOOK_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _install_hook():
+    engine_dir = os.path.dirname(_HOOK_DIR)
+    sys.path.insert(0, engine_dir)
+    try:
+        import plugin_manifest
+        plugin_manifest.install_hook()
+    except Exception as e:  # 钩子出错时服务照常扫描元数据
+        print(f"plugin manifest hook disabled: {e}", file=sys.stderr)
+    finally:
+        sys.path.remove(engine_dir)
+        sys.modules.pop('plugin_manifest', None)
+
+
+def _chain():
+    """运行被本文件遮蔽的 sitecustomize"""
+    from importlib.machinery import PathFinder
+    from importlib.util import module_from_spec
+    path = [p for p in sys.path if os.path.abspath(p or '.') != _HOOK_DIR]
+    spec = PathFinder.find_spec('sitecustomize', path)
+    if spec is not None and spec.loader is not None:
+        spec.loader.exec_module(module_from_spec(spec))
+
+
+if os.environ.get('OVOS_PLUGIN_MANIFEST'):
+    _install_hook()
+_chain()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+requirements 解析
+
+- PEP 503 包名规范化（大小写、-/_/. 视为相同）
+- PEP 508 依赖字符串解析：包名、extras、版本约束、环境标记、"name @ url"
+- requirements 文件读取：注释、续行、-r/--requirement 递归包含、-c 约束文件、
+  -e 本地路径（包括 install-dev.py 约定的 "# -e ../path" 注释写法）
+
+优先使用 packaging 解析版本约束和环境标记；没有安装 packaging 时退回到
+内置的简单解析，环境标记一律视为适用。
+"""
+
+import re
+from pathlib import Path
+from typing import List, Optional, Set
+
+try:
+    from packaging.markers import InvalidMarker, Marker
+    from packaging.specifiers import InvalidSpecifier, SpecifierSet
+except ImportError:  # packaging 不可用时不评估环境标记
+    Marker = None
+    SpecifierSet = None
+
+_NAME_RE = re.compile(r'^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*')
+_EXTRAS_RE = re.compile(r'^\[([^\]]*)\]\s*')
+# install-dev.py / clean_requirements.py 把本地包写成注释: "# -e ../../ovos-utils"、"# ../../ovos-utils  # Local package"
+_COMMENTED_LOCAL_RE = re.compile(r'^#+\s*(?:-e\s+)?(\.\.?/\S+)')
+
+
+def normalize_name(name: str) -> str:
+    """PEP 503 包名规范化"""
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+class ParsedRequirement:
+    """一条 PEP 508 依赖"""
+
+    def __init__(self, name: str, extras: List[str], specifier: str,
+                 marker: Optional[str], url: Optional[str]):
+        self.name = name
+        self.key = normalize_name(name)
+        self.extras = extras
+        self.specifier = specifier
+        self.marker = marker
+        self.url = url
+
+    def applies(self) -> bool:
+        """环境标记是否适用于当前解释器（无法评估时视为适用）"""
+        if not self.marker or Marker is None:
+            return True
+        try:
+            return Marker(self.marker).evaluate({'extra': ''})
+        except InvalidMarker:
+            return True
+
+    def contains(self, version: str) -> Optional[bool]:
+        """version 是否满足版本约束；无法判断时返回 None"""
+        if not self.specifier:
+            return True
+        if SpecifierSet is None:
+            return None
+        try:
+            return SpecifierSet(self.specifier).contains(version, prereleases=True)
+        except (InvalidSpecifier, ValueError):
+            return None
+
+    def __str__(self):
+        extras = f"[{','.join(self.extras)}]" if self.extras else ''
+        if self.url:
+            text = f"{self.name}{extras} @ {self.url}"
+        else:
+            text = f"{self.name}{extras}{self.specifier}"
+        return f"{text}; {self.marker}" if self.marker else text
+
+    def __repr__(self):
+        return f"ParsedRequirement({str(self)!r})"
+
+
+def parse_requirement(text: str) -> Optional[ParsedRequirement]:
+    """解析一条 PEP 508 依赖字符串，无法解析时返回 None"""
+    text = text.split(' #', 1)[0].strip()
+    if not text or text.startswith(('#', '-')):
+        return None
+
+    m = _NAME_RE.match(text)
+    if not m:
+        return None
+    name = m.group(1)
+    rest = text[m.end():]
+
+    extras = []
+    m = _EXTRAS_RE.match(rest)
+    if m:
+        extras = [e.strip() for e in m.group(1).split(',') if e.strip()]
+        rest = rest[m.end():]
+
+    marker = None
+    if ';' in rest:
+        rest, marker = rest.split(';', 1)
+        marker = marker.strip() or None
+
+    url = None
+    rest = rest.strip()
+    if rest.startswith('@'):
+        url = rest[1:].strip()
+        specifier = ''
+    else:
+        specifier = rest.strip('() ').replace(' ', '')
+        if specifier and not re.match(r'^(===|==|!=|~=|<=|>=|<|>)', specifier):
+            return None
+
+    return ParsedRequirement(name, extras, specifier, marker, url)
+
+
+class RequirementsFile:
+    """一个 requirements 文件（含 -r 递归包含）的解析结果"""
+
+    def __init__(self):
+        self.requirements: List[ParsedRequirement] = []
+        self.local_paths: List[Path] = []   # -e 及注释形式的本地包路径（绝对路径）
+        self.files: List[Path] = []         # 读取过的所有文件，用于判断是否过期
+        self.missing: List[Path] = []       # 被引用但不存在的文件
+
+
+def read_requirements(req_file: Path, result: Optional[RequirementsFile] = None,
+                      _seen: Optional[Set[Path]] = None) -> RequirementsFile:
+    """读取 requirements 文件，递归跟随 -r 包含"""
+    result = result if result is not None else RequirementsFile()
+    seen = _seen if _seen is not None else set()
+    req_file = Path(req_file).absolute()
+
+    if req_file in seen:
+        return result
+    seen.add(req_file)
+
+    try:
+        content = req_file.read_text()
+    except OSError:
+        result.missing.append(req_file)
+        return result
+    result.files.append(req_file)
+
+    base = req_file.parent
+    for line in _logical_lines(content):
+        m = _COMMENTED_LOCAL_RE.match(line)
+        if m:
+            result.local_paths.append((base / m.group(1)).resolve())
+            continue
+
+        line = line.split(' #', 1)[0].strip()
+        if not line or line.startswith('#'):
+            continue
+
+        option, _, value = line.partition(' ')
+        value = value.strip()
+        if option in ('-r', '--requirement') or line.startswith('--requirement='):
+            value = value or line.split('=', 1)[1]
+            read_requirements(base / value, result, seen)
+        elif option in ('-e', '--editable'):
+            if value.startswith(('.', '/')):
+                result.local_paths.append((base / value.split('[', 1)[0].split('#', 1)[0]).resolve())
+            else:
+                req = parse_requirement(value.split('#egg=', 1)[-1])
+                if req:
+                    result.requirements.append(req)
+        elif line.startswith('-'):
+            continue  # -c、--index-url 等选项与依赖图无关
+        elif line.startswith(('.', '/')):
+            result.local_paths.append((base / line.split('[', 1)[0]).resolve())
+        else:
+            req = parse_requirement(line)
+            if req:
+                result.requirements.append(req)
+
+    return result
+
+
+def _logical_lines(content: str) -> List[str]:
+    """合并以反斜杠结尾的续行"""
+    lines = []
+    buf = ''
+    for raw in content.splitlines():
+        if raw.rstrip().endswith('\\'):
+            buf += raw.rstrip()[:-1] + ' '
+            continue
+        lines.append((buf + raw).strip())
+        buf = ''
+    if buf:
+        lines.append(buf.strip())
+    return lines
+
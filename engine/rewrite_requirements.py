@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+requirements / constraints 改写
+
+取代 update_requirements.py、clean_requirements.py 和 gen_constraints.py：三者各自遍历目录树、
+逐个文件就地改写，中途失败会留下改了一半的文件，每次运行都会改动所有文件的 mtime，
+使下游的安装缓存（install-dev-full.py 的安装状态、包索引）全部失效。
+
+这里只加载一次包索引，在内存中算出所有文件的新内容，全部计算完成后才写入；
+只写入内容确实变化的文件，每个文件通过临时文件 + rename 原子替换。
+
+识别的本地包引用（按 requirements 文件所在目录解析路径，路径失效时按目录名匹配）:
+  -e ../../ovos-utils[extras]           editable 本地路径
+  # -e ../../ovos-utils                 install-dev.py 约定的注释写法
+  # ../../ovos-utils  # Local package   clean_requirements.py 的旧输出
+  ovos-utils>=0.1                       与本地包同名的 PyPI 依赖
+
+模式:
+  editable-local    本地包引用统一改写为指向当前位置的 "-e 相对路径"（原 update_requirements.py）
+  pypi-pinned       改写为 "# -e 相对路径"（供 install-dev.py 使用）加上固定到本地声明版本的
+                    "包名==版本"（取代 clean_requirements.py 的注释写法）
+  constraints-only  不改 requirements 文件，为每个包生成 constraints.txt:
+                    "包名 @ file://绝对路径"（原 gen_constraints.py）
+
+同一文件中对同一个本地包的重复引用只保留第一个，因此两种模式可以互相转换且重复运行结果不变。
+带环境标记的依赖（ovos-utils>=0.1; python_version > "3.8"）保留原样并给出警告：
+"-e 路径" 不能带标记，改写会让条件依赖变成无条件依赖。
+
+用法:
+  python3 rewrite_requirements.py editable-local --dry-run     # 输出 unified diff，不写入
+  python3 rewrite_requirements.py pypi-pinned
+  python3 rewrite_requirements.py constraints-only ovos-core ovos-audio
+"""
+
+import argparse
+import difflib
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from package_index import PackageIndex, load_index
+from requirements_parser import normalize_name, parse_requirement
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+ENGINE_DIR = Path(__file__).parent.absolute()
+MODES = ('editable-local', 'pypi-pinned', 'constraints-only')
+CONSTRAINTS_FILE = 'constraints.txt'
+
+_EDITABLE_RE = re.compile(r'^(?:-e|--editable)[\s=]+(\S+)')
+_COMMENTED_RE = re.compile(r'^#+\s*(?:-e\s+)?(\.\.?/\S+)')
+_PATH_RE = re.compile(r'^(\.\.?/\S+)')
+# 旧包名与本地目录名不一致的常见情况（update_requirements.py 沿用下来的替换）
+_ALT_NAMES = (('-plugin-', '-server-'), ('-server-', '-plugin-'))
+
+
+class LocalRef(NamedTuple):
+    """requirements 文件中一行对本地包的引用"""
+    entry: Dict            # 包索引条目
+    extras: List[str]
+    comment: str           # 行尾注释（不含 #），改写时保留
+    marker: Optional[str] = None   # 环境标记；带标记的引用不改写
+
+
+class Edit(NamedTuple):
+    path: Path
+    old: Optional[str]     # None 表示新建文件
+    new: str
+
+
+class Rewriter:
+    """基于包索引在内存中计算所有改写"""
+
+    def __init__(self, index: PackageIndex):
+        self.index = index
+        self.by_path = {str(index.abspath(entry).resolve()): entry for entry in index}
+        self.by_name: Dict[str, Dict] = {}
+        for entry in index:
+            self.by_name.setdefault(normalize_name(entry['name']), entry)
+            self.by_name.setdefault(normalize_name(entry['dir']), entry)
+        self.warnings: List[str] = []
+
+    # -- 识别 ----------------------------------------------------------------
+
+    def _by_path(self, base: Path, target: str) -> Optional[Dict]:
+        target = target.split('#', 1)[0]
+        entry = self.by_path.get(str((base / target).resolve()))
+        # 路径已失效（包换了分组）时按最后一级目录名匹配
+        return entry or self.by_name.get(normalize_name(target.rstrip('/').rsplit('/', 1)[-1]))
+
+    def _by_name(self, key: str) -> Optional[Dict]:
+        entry = self.by_name.get(key)
+        for old, new in _ALT_NAMES:
+            if entry is None and old in key:
+                entry = self.by_name.get(key.replace(old, new))
+        return entry
+
+    def parse_line(self, line: str, path: Path) -> Optional[LocalRef]:
+        """path 文件中一行的本地包引用，不是本地包时返回 None"""
+        base = path.parent
+        stripped = line.strip()
+        comment = ''
+        m = _COMMENTED_RE.match(stripped)
+        if m:
+            target = m.group(1)
+        else:
+            if ' #' in stripped:
+                stripped, comment = (s.strip() for s in stripped.split(' #', 1))
+            m = _EDITABLE_RE.match(stripped) or _PATH_RE.match(stripped)
+            if m:
+                target = m.group(1)
+                if target.startswith('file://'):
+                    target = target[len('file://'):]
+                if not target.startswith(('.', '/')):
+                    return None
+            else:
+                req = parse_requirement(stripped)
+                if req is None or req.url:
+                    return None
+                entry = self._by_name(req.key)
+                return LocalRef(entry, req.extras, comment, req.marker) if entry else None
+
+        target_path, _, extras = target.partition('[')
+        entry = self._by_path(base, target_path)
+        if entry is None:
+            self.warnings.append(f"{path}: 无法识别的本地路径 {target}")
+            return None
+        extras = [e.strip() for e in extras.rstrip(']').split(',') if e.strip()]
+        return LocalRef(entry, extras, comment)
+
+    # -- 改写 ----------------------------------------------------------------
+
+    def relpath(self, entry: Dict, base: Path) -> str:
+        rel = os.path.relpath(self.index.abspath(entry), base)
+        return rel if rel.startswith('.') else f'./{rel}'
+
+    def render(self, ref: LocalRef, base: Path, mode: str) -> List[str]:
+        extras = f"[{','.join(ref.extras)}]" if ref.extras else ''
+        rel = self.relpath(ref.entry, base)
+        # 旧的注释写法留下的说明不再保留
+        comment = f"  # {ref.comment}" if ref.comment and 'Local package' not in ref.comment else ''
+        if mode == 'editable-local':
+            return [f"-e {rel}{extras}{comment}"]
+        version = self._version(ref.entry)
+        if version is None:
+            self.warnings.append(f"{ref.entry['name']}: 没有静态声明的版本，无法固定")
+        pin = f"=={version}" if version else ''
+        return [f"# -e {rel}{extras}", f"{ref.entry['name']}{extras}{pin}{comment}"]
+
+    @staticmethod
+    def _version(entry: Dict) -> Optional[str]:
+        return next((info['version'] for info in entry['metadata'] if info.get('version')), None)
+
+    def rewrite_file(self, path: Path, owner: Dict, mode: str) -> Tuple[str, str, List[LocalRef]]:
+        """(原内容, 新内容, 本地包引用)；constraints-only 模式下新内容与原内容相同"""
+        old = path.read_text()
+        base = path.parent
+        lines = []
+        refs = []
+        seen = set()
+        for raw in _logical_lines(old):
+            line = ' '.join(part.rstrip().rstrip('\\') for part in raw)
+            ref = self.parse_line(line, path)
+            if ref is None or ref.entry is owner:
+                lines.extend(raw)
+                continue
+            if ref.marker and mode != 'constraints-only':
+                self.warnings.append(f"{path}: {ref.entry['name']} 带环境标记 ({ref.marker})，保留原样")
+                lines.extend(raw)
+                continue
+            if ref.entry['path'] in seen:
+                continue  # 同一个本地包的重复引用
+            seen.add(ref.entry['path'])
+            refs.append(ref)
+            lines.extend(self.render(ref, base, mode) if mode != 'constraints-only' else raw)
+        if not lines:
+            return old, old, refs  # 空文件保持原样
+        new = '\n'.join(lines) + ('\n' if old.endswith('\n') else '')
+        return old, (old if mode == 'constraints-only' else new), refs
+
+    def constraints(self, entry: Dict, refs: List[LocalRef]) -> str:
+        lines = sorted({f"{ref.entry['name']} @ file://{self.index.abspath(ref.entry)}" for ref in refs})
+        return ''.join(line + '\n' for line in lines)
+
+    def plan(self, mode: str, entries: List[Dict]) -> List[Edit]:
+        """计算所有需要写入的文件；内容不变的文件不出现在结果中"""
+        edits = []
+        for entry in entries:
+            pkg_dir = self.index.abspath(entry)
+            refs = []
+            for rel in entry['requirement_files']:
+                old, new, file_refs = self.rewrite_file(pkg_dir / rel, entry, mode)
+                refs.extend(file_refs)
+                if new != old:
+                    edits.append(Edit(pkg_dir / rel, old, new))
+            if mode == 'constraints-only' and refs:
+                path = pkg_dir / CONSTRAINTS_FILE
+                old = path.read_text() if path.is_file() else None
+                new = self.constraints(entry, refs)
+                if new != old:
+                    edits.append(Edit(path, old, new))
+        return edits
+
+
+def _logical_lines(content: str) -> List[List[str]]:
+    """按反斜杠续行分组的原始行，改写时整组替换"""
+    groups = []
+    buf: List[str] = []
+    for raw in content.splitlines():
+        buf.append(raw)
+        if not raw.rstrip().endswith('\\'):
+            groups.append(buf)
+            buf = []
+    if buf:
+        groups.append(buf)
+    return groups
+
+
+def write_atomic(path: Path, content: str):
+    """写入同目录下的临时文件再 rename，保留原文件权限"""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, 'w') as f:
+            f.write(content)
+        if path.exists():
+            os.chmod(tmp, path.stat().st_mode & 0o7777)
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def show_diff(edits: List[Edit], engine_dir: Path):
+    for edit in edits:
+        rel = os.path.relpath(edit.path, engine_dir)
+        diff = difflib.unified_diff((edit.old or '').splitlines(keepends=True), edit.new.splitlines(keepends=True),
+                                    fromfile=f"a/{rel}" if edit.old is not None else '/dev/null',
+                                    tofile=f"b/{rel}")
+        sys.stdout.writelines(diff)
+
+
+def rewrite(mode: str, engine_dir: Path = ENGINE_DIR, packages: Optional[List[str]] = None,
+            dry_run: bool = False) -> int:
+    index = load_index(engine_dir)
+    log_info(f"包索引: {index.summary()}")
+    entries = list(index)
+    if packages:
+        entries = []
+        for name in packages:
+            entry = index.find(name)
+            if entry is None:
+                log_error(f"未知的包: {name}")
+                return 1
+            entries.append(entry)
+
+    rewriter = Rewriter(index)
+    try:
+        edits = rewriter.plan(mode, entries)
+    except OSError as e:
+        log_error(f"读取失败，未写入任何文件: {e}")
+        return 1
+    for warning in dict.fromkeys(rewriter.warnings):
+        log_warn(warning)
+
+    if dry_run:
+        show_diff(edits, engine_dir)
+        log_info(f"{mode}: {len(edits)} 个文件需要改写（dry run，未写入）")
+        return 0
+    for edit in edits:
+        write_atomic(edit.path, edit.new)
+        print(f"  {os.path.relpath(edit.path, engine_dir)}")
+    log_success(f"{mode}: 改写 {len(edits)} 个文件，其余文件未改动")
+    return 0
+
+
+def main(argv=None, mode: Optional[str] = None):
+    parser = argparse.ArgumentParser(description='改写 requirements / constraints 文件中的本地包引用')
+    if mode is None:
+        parser.add_argument('mode', choices=MODES, help='改写方式')
+    parser.add_argument('packages', nargs='*', help='只处理这些包（包名或目录名，默认全部）')
+    parser.add_argument('--engine-root', default=str(ENGINE_DIR), help='engine 目录 (默认: %(default)s)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='只输出 unified diff，不写入')
+    args = parser.parse_args(argv)
+    return rewrite(mode or args.mode, Path(args.engine_root), args.packages, args.dry_run)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+带剪枝的目录遍历
+
+在进入子目录之前就应用忽略规则（venv、.git、node_modules、build、*.egg-info、
+__pycache__ ...），并支持最大深度与"遇到包根目录即停止深入"，避免在 engine 下
+遍历数十万个无关文件。包索引和 dev.sh 都通过这里遍历目录树。
+
+忽略规则是 fnmatch 模式，匹配目录名；可以通过构造参数、环境变量
+OVOS_SCAN_IGNORE（逗号分隔）或命令行 --ignore 追加。
+
+用法:
+  python3 tree_scan.py . --name setup.py --max-depth 2 --stop-at-match
+  python3 tree_scan.py . --name 'requirements*.txt' --stats
+"""
+
+import argparse
+import fnmatch
+import os
+import sys
+import time
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+# 默认忽略的目录
+DEFAULT_IGNORE = (
+    '.git', 'venv', '.venv', 'node_modules', '__pycache__', 'build', 'dist',
+    '.tox', '.nox', '.eggs', '.mypy_cache', '.pytest_cache', '.ruff_cache',
+    '.wheelhouse', '.install_logs', 'test', 'tests', '*.egg-info', '*.dist-info',
+)
+ENV_IGNORE = 'OVOS_SCAN_IGNORE'
+
+# engine/<group>/<package> 布局下包根目录相对 engine 的深度
+PACKAGE_DEPTH = 2
+
+
+class ScanStats:
+    """遍历统计"""
+
+    def __init__(self):
+        self.dirs_visited = 0
+        self.dirs_pruned = 0
+        self.files_seen = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        return (f"遍历 {self.dirs_visited} 个目录（剪枝 {self.dirs_pruned} 个），"
+                f"{self.files_seen} 个文件，耗时 {self.elapsed * 1000:.0f}ms")
+
+
+class TreeScanner:
+    """按忽略规则和深度剪枝的 os.walk"""
+
+    def __init__(self, root, ignore: Iterable[str] = DEFAULT_IGNORE,
+                 extra_ignore: Iterable[str] = (), max_depth: Optional[int] = None,
+                 stop_at: Optional[Callable[[str, List[str]], bool]] = None):
+        """
+        root:         遍历的根目录
+        ignore:       忽略规则（fnmatch 模式，匹配目录名）
+        extra_ignore: 追加的忽略规则；环境变量 OVOS_SCAN_IGNORE 中的规则也会追加
+        max_depth:    最大深度（root 为 0），None 表示不限制
+        stop_at:      stop_at(相对路径, 文件名列表) 返回 True 时不再进入该目录的子目录
+        """
+        self.root = os.path.abspath(root)
+        env_ignore = [p.strip() for p in os.environ.get(ENV_IGNORE, '').split(',') if p.strip()]
+        patterns = list(ignore) + list(extra_ignore) + env_ignore
+        self._names = {p for p in patterns if not any(c in p for c in '*?[')}
+        self._globs = [p for p in patterns if p not in self._names]
+        self.max_depth = max_depth
+        self.stop_at = stop_at
+        self.stats = ScanStats()
+
+    def is_ignored(self, dirname: str) -> bool:
+        """目录名是否匹配忽略规则"""
+        if dirname in self._names:
+            return True
+        return any(fnmatch.fnmatch(dirname, p) for p in self._globs)
+
+    def subdirs(self, rel_path: str) -> List[str]:
+        """目录下未被忽略的子目录名（排序）"""
+        with os.scandir(os.path.join(self.root, rel_path)) as it:
+            return sorted(e.name for e in it if e.is_dir() and not self.is_ignored(e.name))
+
+    def walk(self) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """
+        与 os.walk 类似，但返回 (相对路径, 子目录名, 文件名)
+
+        子目录列表已去掉被忽略的目录并排序；调用方也可以像 os.walk 一样
+        就地修改子目录列表来进一步剪枝。
+        """
+        start = time.monotonic()
+        try:
+            for dirpath, dirnames, filenames in os.walk(self.root):
+                rel = os.path.relpath(dirpath, self.root)
+                depth = 0 if rel == '.' else rel.count(os.sep) + 1
+                self.stats.dirs_visited += 1
+                self.stats.files_seen += len(filenames)
+
+                kept = sorted(d for d in dirnames if not self.is_ignored(d))
+                self.stats.dirs_pruned += len(dirnames) - len(kept)
+
+                stop = ((self.max_depth is not None and depth >= self.max_depth)
+                        or (self.stop_at is not None and rel != '.' and self.stop_at(rel, filenames)))
+                if stop:
+                    kept = []
+
+                yield rel, kept, filenames
+                # 调用方可能就地修改了 kept，用它决定 os.walk 接下来进入哪些目录
+                dirnames[:] = kept
+        finally:
+            self.stats.elapsed += time.monotonic() - start
+
+    def find(self, patterns: Iterable[str]) -> List[str]:
+        """返回文件名匹配任一 fnmatch 模式的文件（相对路径）"""
+        patterns = list(patterns)
+        matches = []
+        for rel, _, filenames in self.walk():
+            for name in filenames:
+                if any(fnmatch.fnmatch(name, p) for p in patterns):
+                    matches.append(os.path.normpath(os.path.join(rel, name)))
+        return matches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='带剪枝的目录遍历，输出匹配的文件路径')
+    parser.add_argument('root', nargs='?', default='.', help='遍历的根目录 (默认: 当前目录)')
+    parser.add_argument('--name', action='append', default=[], required=True,
+                        help='匹配的文件名模式，可重复')
+    parser.add_argument('--ignore', action='append', default=[],
+                        help=f'追加的忽略目录模式，可重复（也可用 ${ENV_IGNORE}）')
+    parser.add_argument('--max-depth', type=int, default=None,
+                        help=f'最大目录深度；engine 下的包为 {PACKAGE_DEPTH}')
+    parser.add_argument('--stop-at-match', action='store_true',
+                        help='目录中有匹配文件时不再进入其子目录（例如包根目录）')
+    parser.add_argument('--stats', action='store_true', help='在 stderr 输出遍历统计')
+    args = parser.parse_args(argv)
+
+    def has_match(rel, filenames):
+        return any(fnmatch.fnmatch(f, p) for f in filenames for p in args.name)
+
+    scanner = TreeScanner(args.root, extra_ignore=args.ignore, max_depth=args.max_depth,
+                          stop_at=has_match if args.stop_at_match else None)
+    for path in scanner.find(args.name):
+        print(os.path.join(args.root, path) if args.root != '.' else './' + path)
+
+    if args.stats:
+        print(scanner.stats.summary(), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
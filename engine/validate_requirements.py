@@ -1,176 +1,362 @@
+#!/usr/bin/env python3
+"""
+Validate the local paths referenced by requirements and constraints files.
+
+Every requirements file of every package in the package index (requirements.txt at the
+package root, requirements/*.txt) plus constraints.txt is checked for:
+
+  missing-path     -e / --editable / bare ./path targets that do not exist
+  missing-include  -r / -c files that do not exist
+  not-a-package    -e targets that exist but have no setup.py or pyproject.toml
+
+Each unique target is resolved once (many packages point at the same ovos-utils checkout)
+and findings are printed as they are found. The text report is written to
+validation_errors.txt; --json and --sarif write machine-readable copies.
+
+Given file arguments, only those files are checked and the package index is not loaded,
+which keeps it fast enough for a pre-commit hook:
+
+  - repo: local
+    hooks:
+      - id: validate-requirements
+        name: validate requirements paths
+        entry: python3 engine/validate_requirements.py --no-report
+        language: system
+        files: (requirements.*|constraints)\\.txt$
+
+Usage:
+  python3 validate_requirements.py                      # all packages, text report
+  python3 validate_requirements.py --json - --no-report
+  python3 validate_requirements.py --sarif validation.sarif
+  python3 validate_requirements.py path/to/requirements.txt ...
+"""
+
+import argparse
+import json
 import os
-import re
+import sys
+import time
 from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from package_index import PACKAGE_MARKERS, load_index
+
+ENGINE_DIR = Path(__file__).parent.absolute()
+REPORT_FILE = ENGINE_DIR / 'validation_errors.txt'
+
+RULES = {
+    'missing-path': ('error', 'Local package path does not exist'),
+    'missing-include': ('error', 'Included requirements or constraints file does not exist'),
+    'not-a-package': ('warning', 'Editable path has no setup.py or pyproject.toml'),
+}
+
+
+class Finding(NamedTuple):
+    rule: str
+    file: str
+    line: int
+    target: str      # as written in the file, without extras
+    resolved: str    # absolute path
+
+    @property
+    def level(self) -> str:
+        return RULES[self.rule][0]
+
+    def __str__(self):
+        return f"{self.file}:{self.line}: {RULES[self.rule][1]}: {self.target} (abs: {self.resolved})"
+
+
+class PathTable:
+    """Memoized (exists, is package) lookups for reference targets."""
 
-def validate_requirements(root_dir, output_file='validation_errors.txt'):
-    errors = []
-    missing_packages = defaultdict(list)  # package_name -> list of (filepath, line_num, path)
-    
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        if os.path.basename(dirpath) == 'requirements':
-            req_dir = dirpath
-            for filename in os.listdir(req_dir):
-                if filename.endswith('.txt'):
-                    filepath = os.path.join(req_dir, filename)
-                    print(f"Validating {filepath}")
-                    with open(filepath, 'r') as f:
-                        lines = f.readlines()
-                    for line_num, line in enumerate(lines, 1):
-                        stripped = line.strip()
-                        if stripped.startswith('-e '):
-                            match = re.match(r'-e\s+(.+)', stripped)
-                            if match:
-                                path = match.group(1)
-                                
-                                # Handle [extras] syntax - check base package path
-                                if '[' in path and path.endswith(']'):
-                                    # Extract base path without extras
-                                    base_path = path.split('[')[0]
-                                    abs_path = os.path.abspath(os.path.join(req_dir, base_path))
-                                    check_path = base_path
-                                else:
-                                    abs_path = os.path.abspath(os.path.join(req_dir, path))
-                                    check_path = path
-                                
-                                if not os.path.exists(abs_path):
-                                    error_msg = f"{filepath}:{line_num}: Path {check_path} does not exist (abs: {abs_path})"
-                                    errors.append(error_msg)
-                                    
-                                    # Extract package name from path
-                                    if '/' in check_path:
-                                        package_name = check_path.split('/')[-1]
-                                    else:
-                                        package_name = check_path
-                                    
-                                    # Skip backup files with ~ suffix
-                                    if not package_name.endswith('~'):
-                                        missing_packages[package_name].append((filepath, line_num, check_path))
-                                else:
-                                    print(f"  OK: {check_path}")
-    
-    # Write detailed errors to file
+    def __init__(self):
+        self._table: Dict[str, Tuple[bool, bool]] = {}
+        self.lookups = 0
+
+    def lookup(self, path: str) -> Tuple[bool, bool]:
+        self.lookups += 1
+        result = self._table.get(path)
+        if result is None:
+            exists = os.path.exists(path)
+            is_package = exists and any(os.path.isfile(os.path.join(path, m)) for m in PACKAGE_MARKERS)
+            result = self._table[path] = (exists, is_package)
+        return result
+
+    def __len__(self):
+        return len(self._table)
+
+
+def references(filepath: str) -> Iterator[Tuple[int, str, str]]:
+    """(line number, kind, target) for each local reference: kind is 'editable', 'path' or 'include'."""
+    with open(filepath) as f:
+        for line_num, raw in enumerate(f, 1):
+            line = raw.split(' #', 1)[0].strip().rstrip('\\').strip()
+            if not line or line.startswith('#'):
+                continue
+            option, _, value = line.partition(' ')
+            if '=' in option and option.startswith('--'):
+                option, _, value = option.partition('=')
+            value = value.strip()
+            if option in ('-e', '--editable'):
+                if value.startswith('file:'):
+                    value = value[len('file://'):] if value.startswith('file://') else value[len('file:'):]
+                if value.startswith(('.', '/')):
+                    yield line_num, 'editable', value.split('#', 1)[0].split('[', 1)[0]
+            elif option in ('-r', '--requirement', '-c', '--constraint'):
+                if value:
+                    yield line_num, 'include', value
+            elif line.startswith(('./', '../', '/')):
+                yield line_num, 'path', line.split('[', 1)[0].split(';', 1)[0].strip()
+
+
+def validate_files(files: Iterable[str], table: PathTable) -> Iterator[Finding]:
+    """Findings for each file in turn; missing input files are reported as missing includes."""
+    for filepath in files:
+        try:
+            refs = list(references(filepath))
+        except OSError:
+            yield Finding('missing-include', filepath, 0, filepath, os.path.abspath(filepath))
+            continue
+        base = os.path.dirname(os.path.abspath(filepath))
+        for line_num, kind, target in refs:
+            resolved = os.path.normpath(os.path.join(base, target))
+            exists, is_package = table.lookup(resolved)
+            if not exists:
+                yield Finding('missing-include' if kind == 'include' else 'missing-path',
+                              filepath, line_num, target, resolved)
+            elif kind == 'editable' and not is_package:
+                yield Finding('not-a-package', filepath, line_num, target, resolved)
+
+
+def index_files(root_dir) -> List[str]:
+    """requirements files and constraints.txt of every package, plus those at the engine root."""
+    index = load_index(root_dir)
+    print(f"Package index: {index.summary()}", file=sys.stderr)
+    files = [str(f) for f in index.requirement_files()]
+    files += [str(index.abspath(entry) / entry['constraints_file']) for entry in index if entry.get('constraints_file')]
+    files += [str(Path(root_dir) / name) for name in ('requirements.txt', 'constraints.txt')
+              if (Path(root_dir) / name).is_file()]
+    return files
+
+
+def summarize(findings: List[Finding]) -> Dict:
+    """Statistics shared by the text report, the console summary and the JSON output."""
+    errors = [f for f in findings if f.level == 'error']
+    by_file = defaultdict(int)
+    by_subdir = defaultdict(int)
+    missing_packages = defaultdict(list)
+    for f in errors:
+        by_file[f.file] += 1
+        parts = f.file.split('/')
+        engine_index = next((i for i, part in enumerate(parts) if part.startswith('engine-')), -1)
+        if engine_index >= 0 and engine_index + 1 < len(parts):
+            by_subdir[parts[engine_index + 1]] += 1
+        package_name = f.target.rstrip('/').split('/')[-1]
+        # Skip backup files with ~ suffix
+        if f.rule == 'missing-path' and not package_name.endswith('~'):
+            missing_packages[package_name].append((f.file, f.line, f.target))
+    return {
+        'errors': len(errors),
+        'warnings': len(findings) - len(errors),
+        'backup_errors': sum(1 for f in errors if '~' in f.target),
+        'by_file': sorted(by_file.items(), key=lambda x: x[1], reverse=True),
+        'by_subdir': dict(sorted(by_subdir.items())),
+        'missing_packages': dict(sorted(missing_packages.items())),
+    }
+
+
+def write_report(output_file, findings: List[Finding], stats: Dict, generated_at: str):
     with open(output_file, 'w') as f:
         f.write("OVOS Requirements Validation Report\n")
         f.write("=" * 50 + "\n\n")
-        f.write(f"Generated on: {os.popen('date').read().strip()}\n\n")
-        
-        if errors:
-            f.write("DETAILED ERRORS:\n")
-            f.write("-" * 20 + "\n")
-            for error in errors:
-                f.write(f"{error}\n")
-            f.write("\n")
-            
-            # Add statistics to file
-            f.write("STATISTICS SUMMARY:\n")
-            f.write("-" * 20 + "\n")
-            f.write(f"Total errors: {len(errors)}\n")
-            
-            # Statistics by file
-            errors_by_file = defaultdict(int)
-            for error in errors:
-                filepath = error.split(':')[0]
-                errors_by_file[filepath] += 1
-            
-            f.write(f"Files with errors: {len(errors_by_file)}\n")
-            f.write("Top 10 files by error count:\n")
-            sorted_files = sorted(errors_by_file.items(), key=lambda x: x[1], reverse=True)
-            for filepath, count in sorted_files[:10]:
-                f.write(f"  - {filepath}: {count} errors\n")
-            f.write("\n")
-            
-            # Statistics by subdirectory
-            errors_by_subdir = defaultdict(int)
-            for filepath in errors_by_file.keys():
-                parts = filepath.split('/')
-                if 'engine-' in filepath:
-                    engine_index = next((i for i, part in enumerate(parts) if part.startswith('engine-')), -1)
-                    if engine_index >= 0 and engine_index + 1 < len(parts):
-                        subdir = parts[engine_index + 1]
-                        errors_by_subdir[subdir] += errors_by_file[filepath]
-            
-            f.write("Errors by subdirectory:\n")
-            for subdir in sorted(errors_by_subdir.keys()):
-                count = errors_by_subdir[subdir]
-                percentage = (count / len(errors)) * 100
-                f.write(f"  - {subdir}: {count} errors ({percentage:.1f}%)\n")
-            f.write("\n")
-            
-            f.write("MISSING PACKAGES SUMMARY:\n")
-            f.write("-" * 25 + "\n")
-            f.write(f"Total missing packages: {len(missing_packages)}\n\n")
-            
-            for package, locations in sorted(missing_packages.items()):
-                f.write(f"Package: {package}\n")
-                f.write(f"  Referenced in {len(locations)} location(s):\n")
-                for filepath, line_num, path in locations:
-                    f.write(f"    - {filepath}:{line_num} ({path})\n")
-                f.write("\n")
-        else:
+        f.write(f"Generated on: {generated_at}\n\n")
+
+        if not findings:
             f.write("All paths are valid! No errors found.\n")
-    
-    # Console output
-    print(f"\nValidation complete. Results written to {output_file}")
-    
-    if errors:
-        # Statistics by file
-        errors_by_file = defaultdict(int)
-        for error in errors:
-            filepath = error.split(':')[0]
-            errors_by_file[filepath] += 1
-        
-        # Statistics by subdirectory
-        errors_by_subdir = defaultdict(int)
-        for filepath in errors_by_file.keys():
-            parts = filepath.split('/')
-            if 'engine-' in filepath:
-                engine_index = next((i for i, part in enumerate(parts) if part.startswith('engine-')), -1)
-                if engine_index >= 0 and engine_index + 1 < len(parts):
-                    subdir = parts[engine_index + 1]
-                    errors_by_subdir[subdir] += errors_by_file[filepath]
-        
-        # Statistics by error type (backup files vs missing packages)
-        backup_errors = sum(1 for error in errors if '~' in error)
-        missing_package_errors = len(errors) - backup_errors
-        
-        print(f"\n{'='*60}")
-        print("VALIDATION STATISTICS SUMMARY")
-        print(f"{'='*60}")
-        print(f"Total errors: {len(errors)}")
-        print(f"  - Backup file errors: {backup_errors}")
-        print(f"  - Missing package errors: {missing_package_errors}")
-        print(f"Unique missing packages: {len(missing_packages)}")
-        print()
-        
+            return
+
+        f.write("DETAILED ERRORS:\n")
+        f.write("-" * 20 + "\n")
+        for finding in findings:
+            f.write(f"{finding}\n")
+        f.write("\n")
+
+        f.write("STATISTICS SUMMARY:\n")
+        f.write("-" * 20 + "\n")
+        f.write(f"Total errors: {stats['errors']}\n")
+        f.write(f"Total warnings: {stats['warnings']}\n")
+        f.write(f"Files with errors: {len(stats['by_file'])}\n")
+        f.write("Top 10 files by error count:\n")
+        for filepath, count in stats['by_file'][:10]:
+            f.write(f"  - {filepath}: {count} errors\n")
+        f.write("\n")
+
+        f.write("Errors by subdirectory:\n")
+        for subdir, count in stats['by_subdir'].items():
+            f.write(f"  - {subdir}: {count} errors ({count / stats['errors'] * 100:.1f}%)\n")
+        f.write("\n")
+
+        f.write("MISSING PACKAGES SUMMARY:\n")
+        f.write("-" * 25 + "\n")
+        f.write(f"Total missing packages: {len(stats['missing_packages'])}\n\n")
+        for package, locations in stats['missing_packages'].items():
+            f.write(f"Package: {package}\n")
+            f.write(f"  Referenced in {len(locations)} location(s):\n")
+            for filepath, line_num, path in locations:
+                f.write(f"    - {filepath}:{line_num} ({path})\n")
+            f.write("\n")
+
+
+def print_summary(stats: Dict):
+    print(f"\n{'='*60}")
+    print("VALIDATION STATISTICS SUMMARY")
+    print(f"{'='*60}")
+    print(f"Total errors: {stats['errors']}")
+    print(f"  - Backup file errors: {stats['backup_errors']}")
+    print(f"  - Missing package errors: {stats['errors'] - stats['backup_errors']}")
+    print(f"Total warnings: {stats['warnings']}")
+    print(f"Unique missing packages: {len(stats['missing_packages'])}")
+    print()
+
+    if stats['by_subdir']:
         print("Errors by subdirectory:")
-        for subdir in sorted(errors_by_subdir.keys()):
-            count = errors_by_subdir[subdir]
-            percentage = (count / len(errors)) * 100
-            print(f"  - {subdir}: {count} errors ({percentage:.1f}%)")
+        for subdir, count in stats['by_subdir'].items():
+            print(f"  - {subdir}: {count} errors ({count / stats['errors'] * 100:.1f}%)")
         print()
-        
-        print("Top 10 files with most errors:")
-        sorted_files = sorted(errors_by_file.items(), key=lambda x: x[1], reverse=True)
-        for filepath, count in sorted_files[:10]:
-            print(f"  - {filepath}: {count} errors")
-        print()
-        
+
+    print("Top 10 files with most errors:")
+    for filepath, count in stats['by_file'][:10]:
+        print(f"  - {filepath}: {count} errors")
+    print()
+
+    ref_counts = defaultdict(list)
+    for package, locations in stats['missing_packages'].items():
+        ref_counts[len(locations)].append(package)
+    if ref_counts:
         print("Missing packages by reference count:")
-        ref_counts = defaultdict(int)
-        for package, locations in missing_packages.items():
-            ref_counts[len(locations)] += 1
-        
-        for ref_count in sorted(ref_counts.keys(), reverse=True):
-            packages_with_this_count = [pkg for pkg, locs in missing_packages.items() if len(locs) == ref_count]
-            print(f"  - {ref_count} reference(s): {len(packages_with_this_count)} package(s)")
+        for ref_count in sorted(ref_counts, reverse=True):
+            packages = ref_counts[ref_count]
+            print(f"  - {ref_count} reference(s): {len(packages)} package(s)")
             if ref_count <= 3:  # Show details for packages with few references
-                for pkg in sorted(packages_with_this_count):
+                for pkg in sorted(packages):
                     print(f"    * {pkg}")
-        
-        print(f"\nDetailed report saved to {output_file}")
+
+
+def to_json(findings: List[Finding], stats: Dict, meta: Dict) -> Dict:
+    return {
+        **meta,
+        'findings': [{**f._asdict(), 'level': f.level} for f in findings],
+        'summary': {
+            'errors': stats['errors'],
+            'warnings': stats['warnings'],
+            'files_with_errors': dict(stats['by_file']),
+            'errors_by_subdir': stats['by_subdir'],
+            'missing_packages': {pkg: len(locs) for pkg, locs in stats['missing_packages'].items()},
+        },
+    }
+
+
+def to_sarif(findings: List[Finding], base_dir: Path) -> Dict:
+    """SARIF 2.1.0 log; file URIs are relative to base_dir when possible."""
+    def location(path):
+        rel = os.path.relpath(os.path.abspath(path), base_dir)
+        if rel.startswith('..'):
+            return {'uri': Path(path).absolute().as_uri()}
+        return {'uri': Path(rel).as_posix(), 'uriBaseId': 'SRCROOT'}
+
+    results = []
+    for f in findings:
+        region = {'startLine': f.line} if f.line else {}
+        results.append({
+            'ruleId': f.rule,
+            'level': f.level,
+            'message': {'text': f"{RULES[f.rule][1]}: {f.target}"},
+            'locations': [{'physicalLocation': {
+                'artifactLocation': location(f.file),
+                **({'region': region} if region else {}),
+            }}],
+        })
+    return {
+        'version': '2.1.0',
+        '$schema': 'https://json.schemastore.org/sarif-2.1.0.json',
+        'runs': [{
+            'tool': {'driver': {
+                'name': 'validate_requirements',
+                'rules': [{'id': rule, 'shortDescription': {'text': text},
+                           'defaultConfiguration': {'level': level}}
+                          for rule, (level, text) in RULES.items()],
+            }},
+            'originalUriBaseIds': {'SRCROOT': {'uri': base_dir.as_uri() + '/'}},
+            'results': results,
+        }],
+    }
+
+
+def _dump(data: Dict, output: str):
+    if output == '-':
+        json.dump(data, sys.stdout, indent=2)
+        print()
     else:
-        print("\nAll paths are valid!")
-        return True
+        with open(output, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def validate_requirements(root_dir=ENGINE_DIR, output_file: Optional[str] = str(REPORT_FILE),
+                          files: Optional[List[str]] = None, json_file: Optional[str] = None,
+                          sarif_file: Optional[str] = None, verbose: bool = False) -> bool:
+    """Validate files (default: every requirements/constraints file in the index); True if there are no errors."""
+    start = time.monotonic()
+    if files is None:
+        files = index_files(root_dir)
+    # console output goes to stderr when JSON/SARIF is written to stdout
+    console = sys.stderr if '-' in (json_file, sarif_file) else sys.stdout
+
+    table = PathTable()
+    findings = []
+    for finding in validate_files(files, table):
+        findings.append(finding)
+        if verbose or finding.level == 'error':
+            print(finding, file=console)
+    elapsed = time.monotonic() - start
+
+    stats = summarize(findings)
+    generated_at = time.strftime('%Y-%m-%dT%H:%M:%S%z')
+    print(f"Checked {len(files)} files: {table.lookups} references to {len(table)} unique targets "
+          f"in {elapsed * 1000:.0f}ms, {stats['errors']} errors, {stats['warnings']} warnings", file=console)
+
+    if output_file:
+        write_report(output_file, findings, stats, generated_at)
+        print(f"Detailed report saved to {output_file}", file=console)
+    if json_file:
+        _dump(to_json(findings, stats, {'generated_at': generated_at, 'files': len(files),
+                                        'references': table.lookups, 'targets': len(table)}), json_file)
+    if sarif_file:
+        _dump(to_sarif(findings, Path(root_dir).absolute().parent), sarif_file)
+
+    if stats['errors']:
+        if console is sys.stdout:
+            print_summary(stats)
+        return False
+    print("All paths are valid!", file=console)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate local paths in requirements and constraints files')
+    parser.add_argument('files', nargs='*', help='only check these files (default: every package in the index)')
+    parser.add_argument('--engine-root', default=str(ENGINE_DIR), help='engine directory (default: %(default)s)')
+    parser.add_argument('--report', default=str(REPORT_FILE), help='text report file (default: %(default)s)')
+    parser.add_argument('--no-report', action='store_true', help='do not write the text report')
+    parser.add_argument('--json', metavar='FILE', help="write findings as JSON ('-' for stdout)")
+    parser.add_argument('--sarif', metavar='FILE', help="write findings as SARIF 2.1.0 ('-' for stdout)")
+    parser.add_argument('-v', '--verbose', action='store_true', help='also print warnings as they are found')
+    args = parser.parse_args(argv)
+
+    ok = validate_requirements(args.engine_root, None if args.no_report else args.report,
+                               args.files or None, args.json, args.sarif, args.verbose)
+    return 0 if ok else 1
+
 
 if __name__ == '__main__':
-    validate_requirements('/home/pi/dev/norapy-dev/engine', 'validation_errors.txt')
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+venv 快照与恢复
+
+bin/ovos-dev 在 engine/venv 不存在时从头 python3 -m venv 再完整安装工作区；重刷系统或清理设备后
+结果与上次完全相同，却要重新等一次漫长的安装。
+
+snapshot: 把构建好的 venv 连同锁文件（requirements.lock）和安装状态（.install_state.json）
+打包为 engine/.venv_snapshots/ 下的 tar.gz，第一个成员是 manifest.json：
+
+  {"format": 1, "python": "3.11.7 cpython-311 linux_aarch64", "lock": "<锁文件 sha256>",
+   "engine": "/home/pi/dev/norapy-dev/engine", "venv": ".../engine/venv", "created": ...,
+   "install_seconds": 1312.4, "editables": [{"name": "ovos-core", "path": "engine-core/ovos-core"}]}
+
+restore: 选出 Python 版本/平台与锁文件都与当前一致的最新快照，解压到 engine 下的临时目录，
+把 venv 中记录的旧 engine/venv 路径（bin/ 的 shebang 和 activate、pyvenv.cfg、
+site-packages 中的 .pth、egg-link、__editable__ finder、direct_url.json）改写为当前位置，
+rename 到目标位置后用 venv 自己的解释器校验每个 editable 包都指向当前 checkout，
+校验失败时删除恢复的 venv。安装状态中的路径同样重定位。
+
+没有锁文件时快照只按 Python 版本/平台匹配（lock 为 null）。
+
+用法:
+  python3 venv_snapshot.py snapshot [--install-seconds N] [--keep 3]
+  python3 venv_snapshot.py restore [--auto | SNAPSHOT] [--force]
+  python3 venv_snapshot.py list
+  python3 venv_snapshot.py verify              # 在 venv 中运行，校验 editable 安装
+
+OVOS_VENV_SNAPSHOT_DIR 可以把快照放到 checkout 以外（例如重刷时保留的分区）。
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import time
+from importlib import util as importlib_util
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from lockfile import DEFAULT_LOCK_FILE, editable_location, environment_tag, installed_distributions, site_paths
+from requirements_parser import normalize_name
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+ENGINE_DIR = Path(__file__).parent.absolute()
+DEFAULT_VENV = ENGINE_DIR / 'venv'
+SNAPSHOT_DIR = Path(os.environ.get('OVOS_VENV_SNAPSHOT_DIR') or ENGINE_DIR / '.venv_snapshots')
+STATE_FILE = '.install_state.json'
+# 恢复后留在 venv 中的 manifest 副本，供 verify 使用
+VENV_MANIFEST = '.ovos_snapshot.json'
+FORMAT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def file_sha256(path: Path) -> Optional[str]:
+    if not path.is_file():
+        return None
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def site_packages(venv: Path) -> List[Path]:
+    return sorted(venv.glob('lib/python*/site-packages'))
+
+
+def venv_python(venv: Path) -> Path:
+    return venv / 'bin' / 'python'
+
+
+def _venv_query(venv: Path, code: str) -> str:
+    """在 venv 的解释器中执行 code，返回标准输出"""
+    result = subprocess.run([str(venv_python(venv)), '-c', code], cwd=str(ENGINE_DIR),
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SnapshotError(f"{venv_python(venv)} 无法运行: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+# ---------------------------------------------------------------------------
+# manifest
+# ---------------------------------------------------------------------------
+
+def read_manifest(archive: Path) -> Dict:
+    """只读取第一个成员（manifest.json），不解压整个快照"""
+    with tarfile.open(archive, 'r:gz') as tar:
+        member = tar.next()
+        if member is None or member.name != 'manifest.json':
+            raise SnapshotError(f"{archive.name}: 缺少 manifest.json")
+        return json.load(tar.extractfile(member))
+
+
+def snapshots(snapshot_dir: Path = SNAPSHOT_DIR) -> List[Tuple[Path, Dict]]:
+    """所有可读的快照，新的在前"""
+    found = []
+    for archive in snapshot_dir.glob('venv-*.tar.gz'):
+        try:
+            found.append((archive, read_manifest(archive)))
+        except (OSError, tarfile.TarError, ValueError, SnapshotError) as e:
+            log_warn(f"忽略无法读取的快照 {archive.name}: {e}")
+    return sorted(found, key=lambda item: item[1].get('created', ''), reverse=True)
+
+
+def matches(manifest: Dict, lock_file: Path = DEFAULT_LOCK_FILE) -> bool:
+    """快照与当前解释器和锁文件一致"""
+    return (manifest.get('format') == FORMAT_VERSION
+            and manifest.get('python') == environment_tag()
+            and manifest.get('lock') == file_sha256(lock_file))
+
+
+# ---------------------------------------------------------------------------
+# snapshot
+# ---------------------------------------------------------------------------
+
+def find_editables(venv: Path, engine_dir: Path) -> List[Dict[str, str]]:
+    """venv 中指向 engine 目录的 editable 安装"""
+    editables = []
+    for dist in installed_distributions(site_paths([str(p) for p in site_packages(venv)])).values():
+        location = editable_location(dist)
+        if location is None:
+            continue
+        try:
+            rel = Path(location).relative_to(engine_dir)
+        except ValueError:
+            log_warn(f"{dist.metadata['Name']} 从 engine 以外的 {location} 安装，恢复时不会重定位")
+            continue
+        editables.append({'name': dist.metadata['Name'], 'path': str(rel)})
+    return sorted(editables, key=lambda e: e['path'])
+
+
+def _add_bytes(tar: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(time.time())
+    tar.addfile(info, io.BytesIO(data))
+
+
+def snapshot(venv: Path = DEFAULT_VENV, engine_dir: Path = ENGINE_DIR, snapshot_dir: Path = SNAPSHOT_DIR,
+             install_seconds: Optional[float] = None, keep: int = 3) -> Path:
+    if not venv_python(venv).exists():
+        raise SnapshotError(f"{venv} 不是可用的虚拟环境")
+    start = time.monotonic()
+    lock_file = engine_dir / DEFAULT_LOCK_FILE.name
+    state_file = engine_dir / STATE_FILE
+    manifest = {
+        'format': FORMAT_VERSION,
+        # 用 venv 自己的解释器计算，与运行本脚本的解释器无关
+        'python': _venv_query(venv, 'import lockfile; print(lockfile.environment_tag())'),
+        'lock': file_sha256(lock_file),
+        'engine': str(engine_dir),
+        'venv': str(venv.absolute()),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'install_seconds': install_seconds,
+        'editables': find_editables(venv, engine_dir),
+    }
+    tag = re.sub(r'[^\w.]+', '-', manifest['python'])
+    archive = snapshot_dir / f"venv-{tag}-{(manifest['lock'] or 'nolock')[:12]}.tar.gz"
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    log_info(f"打包 {venv} -> {archive}（{len(manifest['editables'])} 个 editable 包）")
+
+    tmp = archive.with_name(archive.name + '.tmp')
+    try:
+        with tarfile.open(tmp, 'w:gz', compresslevel=6) as tar:
+            _add_bytes(tar, 'manifest.json', json.dumps(manifest, indent=2).encode())
+            if lock_file.is_file():
+                tar.add(lock_file, arcname=lock_file.name)
+            if state_file.is_file():
+                tar.add(state_file, arcname=STATE_FILE)
+            tar.add(venv, arcname='venv')
+        os.replace(tmp, archive)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    # 只保留最新的 keep 个快照
+    for old, _ in snapshots(snapshot_dir)[keep:]:
+        log_info(f"删除旧快照 {old.name}")
+        old.unlink()
+    size = archive.stat().st_size / (1 << 20)
+    log_success(f"快照已保存: {archive.name} ({size:.1f} MiB, {time.monotonic() - start:.1f}s)")
+    return archive
+
+
+# ---------------------------------------------------------------------------
+# restore
+# ---------------------------------------------------------------------------
+
+def _prefix_pattern(prefixes: List[Tuple[str, str]]) -> Tuple[re.Pattern, Dict[bytes, bytes]]:
+    # 长的前缀优先（venv 通常在 engine 目录下），并且只在路径分隔处匹配
+    mapping = {old.encode(): new.encode() for old, new in prefixes if old != new}
+    alternatives = b'|'.join(re.escape(old) for old in sorted(mapping, key=len, reverse=True))
+    return re.compile(rb'(?<![\w.-])(' + alternatives + rb')(?=[/"\'\s:]|$)'), mapping
+
+
+def relocation_targets(venv: Path) -> List[Path]:
+    """venv 中记录绝对路径的文本文件"""
+    targets = [venv / 'pyvenv.cfg']
+    for path in (venv / 'bin').iterdir():
+        if path.is_file() and not path.is_symlink():
+            with open(path, 'rb') as f:
+                if f.read(2) == b'#!' or path.name.startswith('activate'):
+                    targets.append(path)
+    for site_dir in site_packages(venv):
+        targets += site_dir.glob('*.pth')
+        targets += site_dir.glob('*.egg-link')
+        targets += site_dir.glob('__editable__*.py')
+        targets += site_dir.glob('*.dist-info/direct_url.json')
+    return targets
+
+
+def relocate_venv(venv: Path, prefixes: List[Tuple[str, str]]) -> int:
+    """把 venv 中的旧路径前缀改写为新路径，返回改写的文件数"""
+    pattern, mapping = _prefix_pattern(prefixes)
+    if not mapping:
+        return 0
+    changed = 0
+    for path in relocation_targets(venv):
+        if not path.is_file():
+            continue
+        data = path.read_bytes()
+        new = pattern.sub(lambda m: mapping[m.group(1)], data)
+        if new != data:
+            path.write_bytes(new)
+            changed += 1
+    return changed
+
+
+def relocate_state(state: Dict, prefixes: List[Tuple[str, str]], prefix: str) -> Dict:
+    """安装状态中的 venv 前缀和本地包路径换到当前位置"""
+    pattern, mapping = _prefix_pattern(prefixes)
+    for entry in state.get('packages', {}).values():
+        if mapping and entry.get('path'):
+            entry['path'] = pattern.sub(lambda m: mapping[m.group(1)], entry['path'].encode()).decode()
+    state['prefix'] = prefix
+    return state
+
+
+def _extract(tar: tarfile.TarFile, dest: Path):
+    # venv/bin/python 是指向系统解释器的绝对符号链接，'data' 过滤器会拒绝，使用 'tar'
+    if hasattr(tarfile, 'tar_filter'):
+        tar.extractall(dest, filter='tar')
+    else:
+        tar.extractall(dest)
+
+
+def restore(archive: Path, venv: Path = DEFAULT_VENV, engine_dir: Path = ENGINE_DIR, force: bool = False) -> bool:
+    start = time.monotonic()
+    manifest = read_manifest(archive)
+    if venv.exists() and not force:
+        log_error(f"{venv} 已存在（使用 --force 替换）")
+        return False
+    venv = venv.absolute()
+    work = venv.parent / f".venv-restore-{os.getpid()}"
+    # 被替换的 venv 放在 work 之外，直到恢复完全成功才删除
+    previous = venv.parent / f".venv-previous-{os.getpid()}"
+    for path in (work, previous):
+        if path.exists():
+            shutil.rmtree(path)
+    work.mkdir(parents=True)
+    moved_in = False
+    copied_lock = None
+    ok = False
+    try:
+        log_info(f"解压 {archive.name}（创建于 {manifest.get('created')}）...")
+        with tarfile.open(archive, 'r:gz') as tar:
+            _extract(tar, work)
+        prefixes = [(manifest['venv'], str(venv)), (manifest['engine'], str(engine_dir))]
+        changed = relocate_venv(work / 'venv', prefixes)
+        if changed:
+            log_info(f"重定位 {manifest['engine']} -> {engine_dir}: 改写 {changed} 个文件")
+
+        if venv.exists():
+            os.rename(venv, previous)
+        os.rename(work / 'venv', venv)
+        moved_in = True
+        (venv / VENV_MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+        if not verify_restored(venv):
+            log_error("校验失败，删除恢复的 venv")
+            return False
+
+        lock_file = engine_dir / DEFAULT_LOCK_FILE.name
+        if (work / lock_file.name).is_file() and not lock_file.exists():
+            shutil.copy2(work / lock_file.name, lock_file)
+            copied_lock = lock_file
+        # 安装状态最后原子替换：之前任何一步失败都不会改动它
+        state_file = work / STATE_FILE
+        if state_file.is_file():
+            prefix = _venv_query(venv, 'import sys; print(sys.prefix)')
+            state = relocate_state(json.loads(state_file.read_text()), prefixes, prefix)
+            tmp_file = engine_dir / f"{STATE_FILE}.tmp"
+            tmp_file.write_text(json.dumps(state, indent=2, sort_keys=True))
+            os.replace(tmp_file, engine_dir / STATE_FILE)
+        ok = True
+    except (OSError, tarfile.TarError, ValueError, KeyError, SnapshotError) as e:
+        log_error(f"恢复失败: {e}")
+        return False
+    finally:
+        if ok:
+            shutil.rmtree(previous, ignore_errors=True)
+        else:
+            _rollback(venv, previous, moved_in, copied_lock)
+        shutil.rmtree(work, ignore_errors=True)
+
+    elapsed = time.monotonic() - start
+    install_seconds = manifest.get('install_seconds')
+    if install_seconds:
+        log_success(f"已从快照恢复 {venv}，耗时 {elapsed:.1f}s（全新安装耗时 {install_seconds:.1f}s，"
+                    f"快 {install_seconds / max(elapsed, 0.1):.0f} 倍）")
+    else:
+        log_success(f"已从快照恢复 {venv}，耗时 {elapsed:.1f}s")
+    return True
+
+
+def _rollback(venv: Path, previous: Path, moved_in: bool, copied_lock: Optional[Path]):
+    """恢复失败时删除恢复的 venv，放回原来的 venv"""
+    if copied_lock is not None:
+        copied_lock.unlink(missing_ok=True)
+    if moved_in:
+        shutil.rmtree(venv, ignore_errors=True)
+    if previous.exists():
+        try:
+            os.rename(previous, venv)
+        except OSError as e:
+            log_error(f"无法放回原来的 venv，它保留在 {previous}: {e}")
+
+
+def verify_restored(venv: Path) -> bool:
+    """用 venv 自己的解释器运行 verify"""
+    return subprocess.run([str(venv_python(venv)), str(Path(__file__).absolute()), 'verify',
+                           '--venv', str(venv)]).returncode == 0
+
+
+# ---------------------------------------------------------------------------
+# verify（在恢复的 venv 中运行）
+# ---------------------------------------------------------------------------
+
+def _module_origin(name: str) -> Optional[str]:
+    try:
+        spec = importlib_util.find_spec(name)
+    except (ImportError, ValueError):
+        return None
+    if spec is None:
+        return None
+    if spec.origin and spec.has_location:
+        return spec.origin
+    return next(iter(spec.submodule_search_locations or []), None)
+
+
+def verify(venv: Path, engine_dir: Path = ENGINE_DIR) -> List[str]:
+    """校验 editable 包指向当前 checkout 且可以被找到，返回问题列表"""
+    manifest = json.loads((venv / VENV_MANIFEST).read_text())
+    problems = []
+    if os.path.realpath(sys.prefix) != os.path.realpath(venv):
+        problems.append(f"当前解释器不属于 {venv}（sys.prefix={sys.prefix}）")
+    if manifest.get('python') != environment_tag():
+        problems.append(f"快照生成于 {manifest.get('python')}，当前为 {environment_tag()}")
+
+    installed = installed_distributions()
+    for editable in manifest.get('editables', []):
+        path = engine_dir / editable['path']
+        dist = installed.get(normalize_name(editable['name']))
+        if not path.is_dir():
+            problems.append(f"{editable['name']}: 源码目录不存在 {path}")
+        elif dist is None:
+            problems.append(f"{editable['name']}: 未安装")
+        elif editable_location(dist) != os.path.normpath(path):
+            problems.append(f"{editable['name']}: editable 安装指向 {editable_location(dist)}，应为 {path}")
+        else:
+            # 顶层模块必须从当前 checkout 导入（只查找，不执行包代码）
+            for top in (dist.read_text('top_level.txt') or '').split():
+                origin = _module_origin(top)
+                if origin is None or not os.path.realpath(origin).startswith(os.path.realpath(path) + os.sep):
+                    problems.append(f"{editable['name']}: 模块 {top} 解析到 {origin}，不在 {path} 中")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='OVOS venv 快照与恢复')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('snapshot', help='打包 venv、锁文件和安装状态')
+    p.add_argument('--install-seconds', type=float, help='构建这个 venv 的全新安装耗时，恢复时用于对比')
+    p.add_argument('--keep', type=int, default=3, help='保留最新的 N 个快照 (默认: %(default)s)')
+
+    p = sub.add_parser('restore', help='从快照恢复 venv')
+    p.add_argument('snapshot', nargs='?', help='快照文件（默认: 与当前解释器和锁文件一致的最新快照）')
+    p.add_argument('--auto', action='store_true', help='没有匹配的快照时安静地以退出码 1 结束')
+    p.add_argument('--force', action='store_true', help='替换已存在的 venv')
+
+    sub.add_parser('list', help='列出快照')
+
+    sub.add_parser('verify', help='在 venv 中校验 editable 安装')
+
+    for p in sub.choices.values():
+        p.add_argument('--venv', default=str(DEFAULT_VENV), help='虚拟环境目录 (默认: %(default)s)')
+        p.add_argument('--snapshot-dir', default=str(SNAPSHOT_DIR), help='快照目录 (默认: %(default)s)')
+    args = parser.parse_args(argv)
+    venv = Path(args.venv).absolute()
+    snapshot_dir = Path(args.snapshot_dir)
+
+    if args.command == 'snapshot':
+        try:
+            snapshot(venv, ENGINE_DIR, snapshot_dir, args.install_seconds, args.keep)
+        except (OSError, tarfile.TarError, SnapshotError) as e:
+            log_error(f"无法创建快照: {e}")
+            return 1
+        return 0
+
+    if args.command == 'restore':
+        if args.snapshot:
+            archive = Path(args.snapshot)
+        else:
+            archive = next((a for a, manifest in snapshots(snapshot_dir) if matches(manifest)), None)
+            if archive is None:
+                (log_info if args.auto else log_error)(
+                    f"没有与 {environment_tag()} 和当前锁文件匹配的快照 ({snapshot_dir})")
+                return 1
+        return 0 if restore(archive, venv, ENGINE_DIR, args.force) else 1
+
+    if args.command == 'list':
+        found = snapshots(snapshot_dir)
+        if not found:
+            log_info(f"没有快照 ({snapshot_dir})")
+        for archive, manifest in found:
+            mark = f"{GREEN}*{NC}" if matches(manifest) else ' '
+            print(f"{mark} {archive.name}  {manifest.get('created')}  {manifest.get('python')}  "
+                  f"{len(manifest.get('editables', []))} editable  "
+                  f"{archive.stat().st_size / (1 << 20):.1f} MiB")
+        return 0
+
+    if args.command == 'verify':
+        try:
+            problems = verify(venv)
+        except (OSError, ValueError) as e:
+            log_error(f"无法校验 {venv}: {e}")
+            return 1
+        for problem in problems:
+            log_error(problem)
+        if not problems:
+            log_success(f"{venv}: editable 安装均指向 {ENGINE_DIR}")
+        return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
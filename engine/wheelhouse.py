@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+本地 wheelhouse 缓存
+
+收集所有本地包的第三方依赖，一次性下载或构建成 wheel 放进共享目录。
+之后各安装脚本（install-dev.py、install-workspaces.py、install-dev-full.py、dev.sh）
+优先从该目录离线安装（--no-index --find-links），不再为每个新 venv 重复下载和
+在 ARM 上从源码编译 numpy、onnxruntime、fann2、webrtcvad 等重量级依赖。
+本地包的构建依赖（[build-system].requires，默认 setuptools、wheel）也放进 wheelhouse，
+离线时 pip 的隔离构建环境同样从这里安装。
+
+目录选择顺序: 命令行参数 > 环境变量 OVOS_WHEELHOUSE > engine/.wheelhouse
+
+构建 wheelhouse:
+  python3 install-dev-full.py wheelhouse
+
+shell 脚本获取 pip 参数:
+  python3 wheelhouse.py pip-args PKG_DIR [PKG_DIR ...]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+    from packaging.version import InvalidVersion, Version
+except ImportError:  # packaging 不可用时只按包名匹配
+    Requirement = None
+
+from package_index import load_index, parse_build_requires
+from requirements_parser import normalize_name
+
+# Colors
+GREEN = '\033[0;32m'
+BLUE = '\033[0;34m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+def log_info(msg):
+    print(f"{BLUE}ℹ{NC} {msg}")
+
+def log_success(msg):
+    print(f"{GREEN}✓{NC} {msg}")
+
+def log_error(msg):
+    print(f"{RED}✗{NC} {msg}")
+
+def log_warn(msg):
+    print(f"{YELLOW}⚠{NC} {msg}")
+
+DEFAULT_WHEELHOUSE = Path(__file__).parent.absolute() / '.wheelhouse'
+ENV_WHEELHOUSE = 'OVOS_WHEELHOUSE'
+
+
+def get_wheelhouse_dir(path: Optional[str] = None) -> Path:
+    """返回 wheelhouse 目录（不保证存在）"""
+    if path:
+        return Path(path).absolute()
+    if os.environ.get(ENV_WHEELHOUSE):
+        return Path(os.environ[ENV_WHEELHOUSE]).absolute()
+    return DEFAULT_WHEELHOUSE
+
+
+def find_wheelhouse(path: Optional[str] = None) -> Optional['Wheelhouse']:
+    """返回可用于安装的 wheelhouse；目录不存在或为空时返回 None"""
+    wheel_dir = get_wheelhouse_dir(path)
+    if wheel_dir.is_dir() and any(wheel_dir.glob('*.whl')):
+        return Wheelhouse(wheel_dir)
+    return None
+
+
+def requirement_files(pkg_dir: Path) -> List[Path]:
+    """包目录下的 requirements 文件"""
+    files = [pkg_dir / 'requirements.txt']
+    req_dir = pkg_dir / 'requirements'
+    if req_dir.is_dir():
+        files.extend(sorted(req_dir.glob('*.txt')))
+    return [f for f in files if f.is_file()]
+
+
+def parse_requirement_line(line: str) -> Optional[str]:
+    """
+    从 requirements 文件的一行中取出第三方依赖
+
+    跳过注释、pip 选项（-e/-r/-c/--xxx）和 URL/本地路径形式的依赖。
+    """
+    line = line.split(' #', 1)[0].strip()
+    if not line or line.startswith('#') or line.startswith('-'):
+        return None
+    if '://' in line or line.startswith(('.', '/')) or ' @ ' in line:
+        return None
+    return line
+
+
+def requirement_name(requirement: str) -> str:
+    """requirement 字符串中的规范化包名"""
+    return normalize_name(re.split(r'[\s<>=!~;\[(]', requirement, maxsplit=1)[0])
+
+
+def collect_requirements(pkg_dirs: Iterable[Path], local_names: Set[str],
+                         extra: Iterable[str] = ()) -> List[str]:
+    """
+    收集一组包的第三方依赖
+
+    pkg_dirs 中每个包的 requirements 文件加上 extra 中的依赖，排除本地包
+    （local_names 为规范化后的包名）和当前环境标记不适用的依赖。
+    """
+    requirements = set()
+    for pkg_dir in pkg_dirs:
+        for req_file in requirement_files(Path(pkg_dir)):
+            try:
+                lines = req_file.read_text().splitlines()
+            except OSError:
+                continue
+            for line in lines:
+                req = parse_requirement_line(line)
+                if req:
+                    requirements.add(req)
+    for req in extra:
+        req = parse_requirement_line(req)
+        if req:
+            requirements.add(req)
+
+    result = []
+    for req in sorted(requirements):
+        if requirement_name(req) in local_names:
+            continue
+        if Requirement is not None:
+            try:
+                parsed = Requirement(req)
+            except InvalidRequirement:
+                continue
+            if parsed.marker is not None and not parsed.marker.evaluate():
+                continue
+        result.append(req)
+    return result
+
+
+class Wheelhouse:
+    """共享 wheel 目录"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def wheels(self) -> Dict[str, List[str]]:
+        """{规范化包名: [版本, ...]}，从 wheel 文件名中解析"""
+        found: Dict[str, List[str]] = {}
+        if not self.path.is_dir():
+            return found
+        for wheel in self.path.glob('*.whl'):
+            parts = wheel.name[:-len('.whl')].split('-')
+            if len(parts) >= 5:
+                found.setdefault(normalize_name(parts[0]), []).append(parts[1])
+        return found
+
+    def split(self, requirements: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """把依赖分成 (wheelhouse 已有, 缺失) 两组"""
+        wheels = self.wheels()
+        hits, misses = [], []
+        for req in requirements:
+            if self._satisfies(req, wheels):
+                hits.append(req)
+            else:
+                misses.append(req)
+        return hits, misses
+
+    @staticmethod
+    def _satisfies(req: str, wheels: Dict[str, List[str]]) -> bool:
+        versions = wheels.get(requirement_name(req))
+        if not versions:
+            return False
+        if Requirement is None:
+            return True
+        try:
+            specifier = Requirement(req).specifier
+        except InvalidRequirement:
+            return True
+        for version in versions:
+            try:
+                if specifier.contains(Version(version), prereleases=True):
+                    return True
+            except InvalidVersion:
+                continue
+        return False
+
+    def build(self, requirements: List[str]) -> bool:
+        """下载或构建缺失的 wheel（包括其传递依赖）"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        start = time.monotonic()
+        hits, misses = self.split(requirements)
+        log_info(f"wheelhouse {self.path}: 命中 {len(hits)}，缺失 {len(misses)}")
+
+        if not misses:
+            log_success("wheelhouse 已是最新")
+            return True
+
+        with tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='wheelhouse-', delete=False) as f:
+            f.write(''.join(req + '\n' for req in misses))
+            req_file = f.name
+        try:
+            cmd = [sys.executable, '-m', 'pip', 'wheel',
+                   '--wheel-dir', str(self.path), '--find-links', str(self.path),
+                   '-r', req_file]
+            result = subprocess.run(cmd)
+        finally:
+            os.unlink(req_file)
+
+        elapsed = time.monotonic() - start
+        _, still_missing = self.split(requirements)
+        if result.returncode != 0 or still_missing:
+            log_error(f"wheelhouse 构建未完成（{elapsed:.1f}s），仍缺失 {len(still_missing)} 个依赖:")
+            for req in still_missing:
+                print(f"  - {req}")
+            return False
+
+        log_success(f"wheelhouse 构建完成，新增 {len(misses)} 个依赖，耗时 {elapsed:.1f}s")
+        return True
+
+    def pip_args(self, requirements: Optional[List[str]] = None) -> List[str]:
+        """
+        返回安装时使用的 pip 参数
+
+        所有依赖都在 wheelhouse 中时完全离线安装（--no-index）；
+        有缺失时仍优先使用 wheelhouse，但允许缺失的部分从索引下载。
+        """
+        args = ['--find-links', str(self.path)]
+        if requirements is None:
+            return ['--no-index'] + args
+
+        hits, misses = self.split(requirements)
+        log_info(f"wheelhouse {self.path}: 命中 {len(hits)}，缺失 {len(misses)}")
+        if misses:
+            log_warn(f"以下依赖不在 wheelhouse 中，将从索引下载: {', '.join(misses[:10])}"
+                     + (' ...' if len(misses) > 10 else ''))
+            return args
+        return ['--no-index'] + args
+
+
+def local_packages(pkg_dirs: Iterable[Path]) -> Tuple[Set[str], List[Dict], List[Path]]:
+    """
+    (本地包的规范化发行版名, pkg_dirs 对应的包索引条目, 不在索引中的 pkg_dirs)
+
+    发行版名取自包索引中 engine 下所有包的 name（可能与目录名不同）；
+    不在索引中的 pkg_dirs 退回使用目录名。
+    """
+    index = load_index(Path(__file__).parent.absolute())
+    names = {normalize_name(entry['name']) for entry in index}
+    by_path = {str(index.abspath(entry).resolve()): entry for entry in index}
+    entries, unindexed = [], []
+    for pkg_dir in pkg_dirs:
+        entry = by_path.get(str(Path(pkg_dir).resolve()))
+        if entry is not None:
+            entries.append(entry)
+        else:
+            names.add(normalize_name(Path(pkg_dir).name))
+            unindexed.append(Path(pkg_dir))
+    return names, entries, unindexed
+
+
+def pip_args_for_packages(pkg_dirs: List[Path], wheelhouse: Optional[str] = None) -> List[str]:
+    """
+    给一组本地包计算安装用的 wheelhouse pip 参数；没有可用 wheelhouse 时返回空列表
+
+    除 requirements 文件外，还检查 setup.py install_requires 和 pyproject [project].dependencies
+    中声明的依赖（包索引中的 dependencies），以及隔离构建这些包需要的构建依赖
+    （[build-system].requires），与 install-dev-full.collect_third_party 一致。
+    """
+    wh = find_wheelhouse(wheelhouse)
+    if wh is None:
+        return []
+    local_names, entries, unindexed = local_packages(pkg_dirs)
+    extra = [dep for entry in entries for info in entry['metadata'] for dep in info['dependencies']]
+    extra += [req for entry in entries for req in entry['build_requires']]
+    extra += [req for pkg_dir in unindexed for req in parse_build_requires(pkg_dir)]
+    return wh.pip_args(collect_requirements(pkg_dirs, local_names, extra))
+
+
+def main(argv=None):
+    """命令行入口，供 shell 脚本查询 pip 参数"""
+    parser = argparse.ArgumentParser(description='OVOS 本地 wheelhouse 工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_args = sub.add_parser('pip-args', help='输出安装指定包时应追加的 pip 参数（每行一个）')
+    p_args.add_argument('packages', nargs='+', help='包目录')
+    p_args.add_argument('--wheelhouse', help=f'wheelhouse 目录 (默认: ${ENV_WHEELHOUSE} 或 {DEFAULT_WHEELHOUSE})')
+    args = parser.parse_args(argv)
+
+    if args.command == 'pip-args':
+        # 日志写到 stderr，stdout 只保留参数
+        stdout = sys.stdout
+        sys.stdout = sys.stderr
+        try:
+            pip_args = pip_args_for_packages([Path(p).resolve() for p in args.packages], args.wheelhouse)
+        finally:
+            sys.stdout = stdout
+        for arg in pip_args:
+            print(arg)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
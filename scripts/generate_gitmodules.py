@@ -1,7 +1,20 @@
 #!/usr/bin/env python3
-import os, subprocess, sys, time
+# Regenerate .gitmodules from the gitlinks in the index.
+# Each submodule's origin URL and HEAD are read straight from its .git/config and
+# refs (falling back to git only when that is not possible), in a thread pool.
+import argparse, os, subprocess, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+from submodules import common_dir_of, git_dir_of, is_checked_out, read_head, remote_urls, url_rewrites_configured
+
+parser = argparse.ArgumentParser(description='Regenerate .gitmodules from the gitlinks in the index')
+parser.add_argument('-j', '--jobs', type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                    help='parallel submodule inspections (default: %(default)s)')
+args = parser.parse_args()
+
 repo = os.path.abspath(os.getcwd())
 print('repo:', repo)
+start = time.monotonic()
 try:
     out = subprocess.check_output(['git','ls-files','-s'], text=True)
 except subprocess.CalledProcessError as e:
@@ -16,36 +29,70 @@ for line in out.splitlines():
 print(f'Found {len(paths)} gitlink paths')
 if not paths:
     sys.exit(0)
+
+
+def git_url(gp):
+    try:
+        return subprocess.check_output(['git','-C',gp,'remote','get-url','origin'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except subprocess.CalledProcessError:
+        try:
+            rv = subprocess.check_output(['git','-C',gp,'remote','-v'], text=True).strip()
+            if rv:
+                return rv.splitlines()[0].split()[1]
+        except Exception:
+            pass
+    return None
+
+
+def git_sha(gp):
+    try:
+        return subprocess.check_output(['git','-C',gp,'rev-parse','HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def inspect(p):
+    """(path, is repo, url, sha, used git) for one gitlink path."""
+    gp = os.path.join(repo, p)
+    if not (os.path.isdir(gp) and is_checked_out(gp)):
+        return p, False, None, None, False
+    try:
+        git_dir = git_dir_of(gp)
+        common_dir = common_dir_of(git_dir)
+        config_file = os.path.join(common_dir, 'config')
+        if url_rewrites_configured(config_file):
+            raise ValueError('url rewrites configured')
+        urls = remote_urls(config_file)
+        # same choice as `git remote get-url origin`, then the first line of `git remote -v`
+        url = urls.get('origin') or (urls[sorted(urls)[0]] if urls else None)
+        sha = read_head(git_dir, common_dir)
+        return p, True, url, sha, False
+    except (OSError, ValueError, UnicodeDecodeError):
+        return p, True, git_url(gp), git_sha(gp), True
+
+
 # backup existing .gitmodules
 if os.path.exists('.gitmodules'):
     bak = f'.gitmodules.bak.{int(time.time())}'
     os.rename('.gitmodules', bak)
     print('Backed up existing .gitmodules ->', bak)
 entries = []
-for p in paths:
-    print('Processing', p)
-    gp = os.path.join(repo, p)
-    if os.path.isdir(gp) and (os.path.isdir(os.path.join(gp, '.git')) or os.path.isfile(os.path.join(gp, '.git'))):
-        url = None
-        try:
-            url = subprocess.check_output(['git','-C',gp,'remote','get-url','origin'], text=True).strip()
-        except subprocess.CalledProcessError:
-            try:
-                rv = subprocess.check_output(['git','-C',gp,'remote','-v'], text=True).strip()
-                if rv:
-                    url = rv.splitlines()[0].split()[1]
-            except Exception:
-                url = None
-        sha = None
-        try:
-            sha = subprocess.check_output(['git','-C',gp,'rev-parse','HEAD'], text=True).strip()
-        except Exception:
-            sha = None
+via_git = 0
+with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+    # map() yields in input order, so the output is the same as a serial run
+    for p, is_repo, url, sha, used_git in pool.map(inspect, paths):
+        print('Processing', p)
+        if not is_repo:
+            print('  -> not a git repo, skipping')
+            continue
+        via_git += used_git
         print('  url=', url or '<no-remote>', ' sha=', sha or '<no-head>')
         if url:
             entries.append((p, url))
-    else:
-        print('  -> not a git repo, skipping')
+print(f'Inspected {len(paths)} paths in {time.monotonic() - start:.2f}s '
+      f'({via_git} needed git, {args.jobs} workers)')
 # write .gitmodules
 with open('.gitmodules', 'w') as f:
     f.write('# Generated .gitmodules\n')
@@ -65,4 +112,4 @@ except subprocess.CalledProcessError:
 # init submodules
 subprocess.call(['git','submodule','init','--recursive'])
 subprocess.call(['git','submodule','status','--recursive'])
-print('Done')
+print(f'Done in {time.monotonic() - start:.2f}s')
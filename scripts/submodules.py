@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# Parallel maintenance for the submodules listed in .gitmodules.
+#
+# Replaces the serial loop from engine/需求.md
+#   for gitdir in $(find engine -name ".git" ...); do git reset --hard && git clean -fd; done
+# with a bounded worker pool over the .gitmodules list (see generate_gitmodules.py),
+# a live progress line and a failure summary.
+#
+# Actions run per submodule in this order, whichever are given:
+#   bootstrap clone a missing submodule at the recorded commit: shallow (--depth, default 1),
+#             blobless partial clone (--clone blobless) or full; from --mirror if given
+#   fetch     git fetch origin (plus the recorded commit if it is still missing)
+#   checkout  detach HEAD at the commit recorded in the superproject index
+#   reset     git reset --hard
+#   clean     git clean -fd
+#   status    report missing checkouts, HEAD != recorded commit and local changes
+#   mirror    push the checked-out submodule into a bare repo under --mirror (for offline bootstraps)
+# 'sync' is shorthand for fetch checkout reset clean.
+#
+# Usage:
+#   python3 scripts/submodules.py status
+#   python3 scripts/submodules.py reset clean --group engine-skills
+#   python3 scripts/submodules.py sync -j 16
+#   python3 scripts/submodules.py bootstrap --workspace core --clone blobless
+#   python3 scripts/submodules.py mirror --mirror /srv/ovos-mirror      # on a machine with full checkouts
+#   python3 scripts/submodules.py bootstrap --mirror /srv/ovos-mirror    # on the device, offline
+import argparse, ast, os, re, shutil, subprocess, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ACTIONS = ('bootstrap', 'fetch', 'checkout', 'reset', 'clean', 'status', 'mirror')
+ALIASES = {'sync': ('fetch', 'checkout', 'reset', 'clean')}
+CLONE_MODES = ('shallow', 'blobless', 'full')
+DEFAULT_JOBS = 8
+# WORKSPACES (install-workspaces.py) lists packages relative to engine/
+WORKSPACES_FILE = os.path.join('engine', 'install-workspaces.py')
+
+_SECTION = re.compile(r'^\[\s*([\w.-]+)(?:\s+"((?:[^"\\]|\\.)*)")?\s*\]')
+
+
+# ---------------------------------------------------------------------------
+# reading git metadata without starting git
+# ---------------------------------------------------------------------------
+
+def read_config(config_file):
+    """{(section, subsection): {key: first value}} from a git config style file (.git/config, .gitmodules)."""
+    sections = {}
+    current = None
+    with open(config_file) as f:
+        for raw in f:
+            line = raw.strip()
+            if not line or line[0] in '#;':
+                continue
+            m = _SECTION.match(line)
+            if m:
+                current = sections.setdefault((m.group(1).lower(), m.group(2)), {})
+                line = line[m.end():].strip()
+                if not line:
+                    continue
+            if current is None or '=' not in line:
+                continue
+            key, value = (s.strip() for s in line.split('=', 1))
+            if value.startswith('"') and value.endswith('"'):
+                value = value[1:-1]
+            current.setdefault(key.lower(), value)
+    return sections
+
+
+def remote_urls(config_file):
+    """{remote name: url} from a git config file, in file order."""
+    return {sub: values['url'] for (section, sub), values in read_config(config_file).items()
+            if section == 'remote' and sub is not None and 'url' in values}
+
+
+def git_dir_of(gp):
+    """The repo's git dir (a .git directory or the target of a 'gitdir:' file)."""
+    dot_git = os.path.join(gp, '.git')
+    if os.path.isdir(dot_git):
+        return dot_git
+    with open(dot_git) as f:
+        content = f.read().strip()
+    if not content.startswith('gitdir:'):
+        raise ValueError('unrecognised .git file')
+    return os.path.normpath(os.path.join(gp, content[len('gitdir:'):].strip()))
+
+
+def common_dir_of(git_dir):
+    """Worktree git dirs keep config and refs in their common dir."""
+    try:
+        with open(os.path.join(git_dir, 'commondir')) as f:
+            return os.path.normpath(os.path.join(git_dir, f.read().strip()))
+    except FileNotFoundError:
+        return git_dir
+
+
+def url_rewrites_configured(config_file):
+    """url.<base>.insteadOf and include directives change what git reports; leave those to git."""
+    files = [config_file, os.path.expanduser('~/.gitconfig'),
+             os.path.join(os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config'), 'git', 'config')]
+    for name in files:
+        try:
+            with open(name) as f:
+                text = f.read().lower()
+        except OSError:
+            continue
+        if 'insteadof' in text or '[include' in text:
+            return True
+    return False
+
+
+def read_head(git_dir, common_dir=None):
+    """SHA that HEAD points to, or None for an unborn branch."""
+    common_dir = common_dir or common_dir_of(git_dir)
+    with open(os.path.join(git_dir, 'HEAD')) as f:
+        head = f.read().strip()
+    if not head.startswith('ref:'):
+        return head  # detached HEAD
+    ref = head[len('ref:'):].strip()
+    for base in (git_dir, common_dir):
+        try:
+            with open(os.path.join(base, ref)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            pass
+    try:
+        with open(os.path.join(common_dir, 'packed-refs')) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1] == ref:
+                    return parts[0]
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def is_checked_out(gp):
+    dot_git = os.path.join(gp, '.git')
+    return os.path.isdir(dot_git) or os.path.isfile(dot_git)
+
+
+# ---------------------------------------------------------------------------
+# the submodule list
+# ---------------------------------------------------------------------------
+
+def read_gitmodules(repo):
+    """[(path, url)] from .gitmodules, in file order."""
+    modules = []
+    for (section, _), values in read_config(os.path.join(repo, '.gitmodules')).items():
+        if section == 'submodule' and 'path' in values:
+            modules.append((values['path'], values.get('url')))
+    return modules
+
+
+def recorded_commits(repo):
+    """{path: SHA} of the gitlinks in the superproject index (what `git submodule update` checks out)."""
+    out = subprocess.check_output(['git', '-C', repo, 'ls-files', '-s'], text=True)
+    commits = {}
+    for line in out.splitlines():
+        if line.startswith('160000'):
+            meta, path = line.split('\t', 1)
+            commits[path] = meta.split()[1]
+    return commits
+
+
+def group_of(path):
+    """Engine group of a submodule path: engine/engine-skills/foo -> engine-skills."""
+    parts = path.split('/')
+    return parts[1] if len(parts) > 2 and parts[0] == 'engine' else parts[0]
+
+
+def workspace_paths(repo, names):
+    """Package paths of the named workspaces, read from WORKSPACES without importing the installer."""
+    with open(os.path.join(repo, WORKSPACES_FILE)) as f:
+        tree = ast.parse(f.read())
+    workspaces = next(ast.literal_eval(node.value) for node in tree.body if isinstance(node, ast.Assign)
+                      and any(isinstance(t, ast.Name) and t.id == 'WORKSPACES' for t in node.targets))
+    unknown = [name for name in names if name not in workspaces]
+    if unknown:
+        raise ValueError(f'unknown workspace {", ".join(unknown)} (known: {", ".join(workspaces)})')
+    return [f'engine/{pkg}' for name in names for pkg in workspaces[name]['packages']]
+
+
+def select(modules, groups=None, paths=None):
+    selected = []
+    for path, url in modules:
+        if groups and group_of(path) not in groups:
+            continue
+        if paths and not any(path == p.rstrip('/') or path.startswith(p.rstrip('/') + '/') for p in paths):
+            continue
+        selected.append((path, url))
+    return selected
+
+
+# ---------------------------------------------------------------------------
+# per-submodule work
+# ---------------------------------------------------------------------------
+
+class GitFailed(Exception):
+    def __init__(self, action, message):
+        super().__init__(message)
+        self.action = action
+
+
+def git(gp, action, *args):
+    result = subprocess.run(['git', '-C', gp, *args], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, stdin=subprocess.DEVNULL,
+                            env=dict(os.environ, GIT_TERMINAL_PROMPT='0'))
+    if result.returncode != 0:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        raise GitFailed(action, lines[-1] if lines else f'git {args[0]} exited with {result.returncode}')
+    return result.stdout
+
+
+def has_commit(gp, sha):
+    return subprocess.run(['git', '-C', gp, 'cat-file', '-e', f'{sha}^{{commit}}'],
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+
+def mirror_name(url, path):
+    """Bare repo name in a mirror dir: the last component of the URL (or path), with .git."""
+    name = (url or path).rstrip('/').rsplit('/', 1)[-1].rsplit(':', 1)[-1]
+    return name if name.endswith('.git') else name + '.git'
+
+
+class Bootstrap:
+    """Clones missing submodules pinned to their recorded commit."""
+
+    def __init__(self, mode='shallow', depth=1, mirror=None):
+        self.mode = mode
+        self.depth = depth
+        self.mirror = os.path.abspath(mirror) if mirror else None
+
+    def source(self, url, path):
+        if not self.mirror:
+            return url
+        bare = os.path.join(self.mirror, mirror_name(url, path))
+        if not os.path.isdir(bare):
+            raise GitFailed('bootstrap', f'{mirror_name(url, path)} not found in mirror {self.mirror}')
+        # file:// rather than a plain path, so the fetch goes through upload-pack and honours --depth/--filter
+        return 'file://' + bare
+
+    def clone(self, gp, url, path, recorded):
+        if not url:
+            raise GitFailed('bootstrap', 'no url in .gitmodules')
+        if os.path.isdir(gp) and os.listdir(gp):
+            raise GitFailed('bootstrap', f'{path} exists and is not empty')
+        os.makedirs(gp, exist_ok=True)
+        try:
+            git(gp, 'bootstrap', 'init', '--quiet')
+            git(gp, 'bootstrap', 'remote', 'add', 'origin', self.source(url, path))
+            args = {'shallow': [f'--depth={self.depth}'], 'blobless': ['--filter=blob:none'], 'full': []}[self.mode]
+            # fetching a single commit by SHA needs no branch to point at it (GitHub and protocol v2 allow it)
+            git(gp, 'bootstrap', 'fetch', '--quiet', *args, 'origin', recorded or 'HEAD')
+            # a blobless checkout fetches its blobs from origin, so switch origin to the real URL only afterwards
+            git(gp, 'bootstrap', 'checkout', '--quiet', '--detach', recorded or 'FETCH_HEAD')
+            git(gp, 'bootstrap', 'remote', 'set-url', 'origin', url)
+        except GitFailed:
+            shutil.rmtree(os.path.join(gp, '.git'), ignore_errors=True)
+            raise
+
+
+def mirror_to(gp, url, path, recorded, mirror):
+    """Push branches, tags, HEAD and the recorded commit into <mirror>/<name>.git."""
+    bare = os.path.join(os.path.abspath(mirror), mirror_name(url, path))
+    if not os.path.isdir(bare):
+        os.makedirs(bare)
+        git(bare, 'mirror', 'init', '--quiet', '--bare')
+        # allow blobless bootstraps from the mirror
+        git(bare, 'mirror', 'config', 'uploadpack.allowFilter', 'true')
+    refspecs = ['+refs/heads/*:refs/heads/*', '+refs/tags/*:refs/tags/*']
+    # submodules usually sit on a detached HEAD that no branch points at; keep those commits reachable
+    for sha in {read_head(git_dir_of(gp)), recorded}:
+        if sha and has_commit(gp, sha):
+            refspecs.append(f'+{sha}:refs/pinned/{sha}')
+    git(gp, 'mirror', 'push', '--quiet', bare, *refspecs)
+
+
+def process(repo, path, url, recorded, actions, bootstrap=None, mirror=None):
+    """Run the actions on one submodule; returns (path, outcome, detail)."""
+    gp = os.path.join(repo, path)
+    cloned = False
+    try:
+        if not is_checked_out(gp):
+            if 'bootstrap' not in actions:
+                return path, 'missing', 'not checked out'
+            (bootstrap or Bootstrap()).clone(gp, url, path, recorded)
+            cloned = True
+        if 'fetch' in actions:
+            git(gp, 'fetch', 'fetch', '--quiet', '--prune', 'origin')
+            if recorded and not has_commit(gp, recorded):
+                git(gp, 'fetch', 'fetch', '--quiet', 'origin', recorded)
+        if 'checkout' in actions:
+            if not recorded:
+                raise GitFailed('checkout', 'no commit recorded in the superproject index')
+            git(gp, 'checkout', 'checkout', '--quiet', '--detach', recorded)
+        if 'reset' in actions:
+            git(gp, 'reset', 'reset', '--quiet', '--hard')
+        if 'clean' in actions:
+            git(gp, 'clean', 'clean', '--quiet', '-fd')
+        if 'status' in actions:
+            notes = []
+            try:
+                head = read_head(git_dir_of(gp))
+            except (OSError, ValueError):
+                head = git(gp, 'status', 'rev-parse', 'HEAD').strip()
+            if recorded and head != recorded:
+                notes.append(f'HEAD {(head or "unborn")[:10]} != recorded {recorded[:10]}')
+            changes = git(gp, 'status', 'status', '--porcelain').splitlines()
+            if changes:
+                notes.append(f'{len(changes)} local change{"s" if len(changes) != 1 else ""}')
+            if notes:
+                return path, 'changed', ', '.join(notes)
+        if 'mirror' in actions:
+            mirror_to(gp, url, path, recorded, mirror)
+        return path, 'cloned' if cloned else 'ok', ''
+    except GitFailed as e:
+        return path, 'failed', f'{e.action}: {e}'
+
+
+class Progress:
+    """A single status line, redrawn in place on a terminal."""
+
+    def __init__(self, total, stream=sys.stderr):
+        self.total = total
+        self.done = 0
+        self.counts = {}
+        self.stream = stream
+        self.live = stream.isatty()
+        self.lock = threading.Lock()
+
+    def update(self, path, outcome):
+        with self.lock:
+            self.done += 1
+            self.counts[outcome] = self.counts.get(outcome, 0) + 1
+            if self.live:
+                counts = ' '.join(f'{k} {v}' for k, v in sorted(self.counts.items()))
+                line = f'[{self.done:>{len(str(self.total))}}/{self.total}] {counts}  {path}'
+                width = 120
+                try:
+                    width = os.get_terminal_size(self.stream.fileno()).columns
+                except OSError:
+                    pass
+                self.stream.write('\r\033[K' + line[:width - 1])
+                self.stream.flush()
+
+    def finish(self):
+        if self.live:
+            self.stream.write('\r\033[K')
+            self.stream.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run git maintenance across the submodules in .gitmodules')
+    parser.add_argument('actions', nargs='+', choices=ACTIONS + tuple(ALIASES),
+                        help='what to do; sync = fetch checkout reset clean')
+    parser.add_argument('-g', '--group', action='append', default=[],
+                        help='only submodules in this engine group, e.g. engine-skills (repeatable)')
+    parser.add_argument('-p', '--path', action='append', default=[],
+                        help='only submodules at or below this path (repeatable)')
+    parser.add_argument('-w', '--workspace', action='append', default=[],
+                        help='only submodules of this install-workspaces.py workspace, e.g. core (repeatable)')
+    parser.add_argument('--clone', choices=CLONE_MODES, default='shallow',
+                        help='bootstrap clone type (default: %(default)s)')
+    parser.add_argument('--depth', type=int, default=1, help='history depth of shallow clones (default: %(default)s)')
+    parser.add_argument('--mirror', help='directory of bare repos: bootstrap source, or mirror target')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='parallel submodules (default: %(default)s)')
+    parser.add_argument('--repo', default='.', help='superproject root (default: current directory)')
+    args = parser.parse_args(argv)
+
+    actions = set()
+    for action in args.actions:
+        actions.update(ALIASES.get(action, (action,)))
+
+    if 'mirror' in actions and not args.mirror:
+        parser.error('mirror needs --mirror DIR')
+
+    repo = os.path.abspath(args.repo)
+    start = time.monotonic()
+    try:
+        modules = read_gitmodules(repo)
+        recorded = recorded_commits(repo)
+        paths = args.path + (workspace_paths(repo, args.workspace) if args.workspace else [])
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        print(f'Cannot read the submodule list: {e}')
+        return 1
+    modules = select(modules, set(args.group), paths)
+    if not modules:
+        print('No submodules selected')
+        return 1
+    order = [a for a in ACTIONS if a in actions]
+    print(f'{" ".join(order)}: {len(modules)} submodules, {args.jobs} workers')
+    bootstrap = Bootstrap(args.clone, args.depth, args.mirror)
+
+    results = {}
+    progress = Progress(len(modules))
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = [pool.submit(process, repo, path, url, recorded.get(path), actions, bootstrap, args.mirror)
+                   for path, url in modules]
+        for future in as_completed(futures):
+            path, outcome, detail = future.result()
+            results[path] = (outcome, detail)
+            progress.update(path, outcome)
+    progress.finish()
+
+    counts = {}
+    for path, _ in modules:
+        outcome, detail = results[path]
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if outcome in ('changed', 'missing') and 'status' in actions:
+            print(f'  {outcome:8} {path}  {detail}')
+    failed = [(path, results[path][1]) for path, _ in modules if results[path][0] == 'failed']
+    if failed:
+        print(f'\nFailed ({len(failed)}):')
+        for path, detail in failed:
+            print(f'  {path}: {detail}')
+    summary = ', '.join(f'{v} {k}' for k, v in sorted(counts.items()))
+    print(f'\nDone in {time.monotonic() - start:.1f}s: {summary}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())